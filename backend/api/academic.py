@@ -5,6 +5,7 @@ from core.database import get_db
 from core.security import get_current_active_user
 from models.academic import Course
 from schemas.academic import PaginatedCourses, Course as CourseSchema
+from services.search import search_filter, search_rank
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
@@ -21,10 +22,11 @@ def read_courses(
     skip = (page - 1) * limit
     query = db.query(Course)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter((Course.code.ilike(search_term)) | (Course.title.ilike(search_term)))
+        query = query.filter(search_filter(db, (Course.code, Course.title), search))
     total = query.count()
-    if sort_by == "code":
+    if sort_by == "relevance" and search:
+        query = query.order_by(search_rank((Course.code, Course.title), search), Course.code.asc())
+    elif sort_by == "code":
         if sort_order == "asc":
             query = query.order_by(Course.code.asc())
         else:
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Body, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc, case
+from sqlalchemy import func, desc, asc
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 import json
@@ -25,6 +25,17 @@ from services.indexing_service import index_all_data, reindex_schedules_backgrou
 from core.constants import TIME_SLOTS
 
 from services.cp_sat_scheduler import CpSatAutoScheduler
+from services.scheduler_portfolio import MAX_SEEDS, run_portfolio
+from services import scheduler_jobs
+from services.scheduler_what_if import MAX_SCENARIOS, WhatIfScenario, run_what_if
+from services.capacity_check import ScheduleInfeasibleError
+from services.scheduler_shards import run_sharded
+from services.schedule_query import schedule_page
+from services.schedule_view import refresh_schedule_view, sync_schedule_view
+from services.search import search_filter, search_rank
+from services.eager_loading import SECTION_RESPONSE
+from services.schedule_versions import save_version, list_versions, diff_versions, restore_version, load_placements
+from models.schedule import ScheduleVersion
 
 class BulkDeleteRequest(BaseModel):
     ids: List[int]
@@ -57,36 +68,39 @@ def search_users(
     db: Session = Depends(get_db)
 ):
     results = []
-    search_term = f"%{q}%"
     
-    # Search Teachers
-    teachers = db.query(Teacher).join(User).filter(
-        (Teacher.name.ilike(search_term)) | (User.email.ilike(search_term)) | (Teacher.initial.ilike(search_term))
-    ).limit(limit).all()
+    # Search Teachers, best matches first
+    teacher_rank = search_rank((Teacher.name, Teacher.initial, User.email), q)
+    teachers = db.query(Teacher, teacher_rank).join(User).filter(
+        search_filter(db, (Teacher.name, Teacher.initial), q) | search_filter(db, (User.email,), q)
+    ).order_by(teacher_rank, Teacher.name).limit(limit).all()
     
-    for t in teachers:
+    for t, rank in teachers:
         results.append({
             "id": t.user_id,
             "name": t.name,
             "email": t.user.email,
-            "role": "TEACHER"
+            "role": "TEACHER",
+            "rank": rank
         })
         
     # Search Students
-    students = db.query(Student).join(User).filter(
-        (Student.name.ilike(search_term)) | (User.email.ilike(search_term)) | (Student.nsu_id.ilike(search_term))
-    ).limit(limit).all()
+    student_rank = search_rank((Student.name, Student.nsu_id, User.email), q)
+    students = db.query(Student, student_rank).join(User).filter(
+        search_filter(db, (Student.name, Student.nsu_id), q) | search_filter(db, (User.email,), q)
+    ).order_by(student_rank, Student.name).limit(limit).all()
     
-    for s in students:
+    for s, rank in students:
         results.append({
             "id": s.user_id,
             "name": s.name,
             "email": s.user.email,
-            "role": "STUDENT"
+            "role": "STUDENT",
+            "rank": rank
         })
         
-    # Sort by name and limit total
-    results.sort(key=lambda x: (x['name'] or "").lower())
+    # Sort by relevance, then name, and limit total
+    results.sort(key=lambda x: (x['rank'], (x['name'] or "").lower()))
     return results[:limit]
 
 # --- Room Management ---
@@ -127,14 +141,15 @@ def read_rooms(
     
     # Search
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(Room.room_number.ilike(search_term))
+        query = query.filter(search_filter(db, (Room.room_number,), search))
     
     # Calculate total
     total = query.count()
 
     # Sort
-    if hasattr(Room, sort_by):
+    if sort_by == 'relevance' and search:
+        query = query.order_by(search_rank((Room.room_number,), search), asc(Room.room_number), Room.id.asc())
+    elif hasattr(Room, sort_by):
         column = getattr(Room, sort_by)
         if sort_order == 'desc':
             query = query.order_by(desc(column), Room.id.asc())
@@ -155,6 +170,7 @@ def update_room(room_id: int, room: RoomCreate, background_tasks: BackgroundTask
     for key, value in room.model_dump().items():
         setattr(db_room, key, value)
     
+    sync_schedule_view(db, room_ids=[room_id])
     db.commit()
     db.refresh(db_room)
 
@@ -176,6 +192,7 @@ def delete_room(room_id: int, background_tasks: BackgroundTasks, db: Session = D
     if not db_room:
         raise HTTPException(status_code=404, detail="Room not found")
     db.delete(db_room)
+    sync_schedule_view(db, room_ids=[room_id])
     db.commit()
 
     # RAG Delete
@@ -271,11 +288,7 @@ def read_courses(
     
     # Search
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Course.code.ilike(search_term)) | 
-            (Course.title.ilike(search_term))
-        )
+        query = query.filter(search_filter(db, (Course.code, Course.title), search))
     
     # Calculate total before grouping (for accurate pagination count)
     total = query.count()
@@ -288,6 +301,8 @@ def read_courses(
             query = query.order_by(func.count(Section.id).desc(), Course.id.asc())
         else:
             query = query.order_by(func.count(Section.id).asc(), Course.id.asc())
+    elif sort_by == 'relevance' and search:
+        query = query.order_by(search_rank((Course.code, Course.title), search), asc(Course.code), Course.id.asc())
     else:
         # Default columns
         if hasattr(Course, sort_by):
@@ -339,6 +354,7 @@ def update_course(course_id: int, course: CourseCreate, background_tasks: Backgr
         if key != 'sections_count': # Skip sections_count as it's not a column
             setattr(db_course, key, value)
     
+    sync_schedule_view(db, course_ids=[course_id])
     db.commit()
     db.refresh(db_course)
     # Explicitly expire the sections relationship to ensure the count is updated in the response
@@ -362,6 +378,7 @@ def delete_course(course_id: int, background_tasks: BackgroundTasks, db: Session
     if not db_course:
         raise HTTPException(status_code=404, detail="Course not found")
     db.delete(db_course)
+    sync_schedule_view(db, course_ids=[course_id])
     db.commit()
 
     # RAG Delete
@@ -485,17 +502,15 @@ def read_teachers(
     
     # Search
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Teacher.name.ilike(search_term)) | 
-            (Teacher.initial.ilike(search_term))
-        )
+        query = query.filter(search_filter(db, (Teacher.name, Teacher.initial), search))
     
     # Calculate total
     total = query.count()
 
     # Sort
-    if hasattr(Teacher, sort_by):
+    if sort_by == 'relevance' and search:
+        query = query.order_by(search_rank((Teacher.name, Teacher.initial), search), asc(Teacher.initial), Teacher.id.asc())
+    elif hasattr(Teacher, sort_by):
         column = getattr(Teacher, sort_by)
         if sort_order == 'desc':
             query = query.order_by(desc(column), Teacher.id.asc())
@@ -530,6 +545,7 @@ def update_teacher(teacher_id: int, teacher_update: TeacherUpdate, background_ta
     if teacher_update.department:
         db_teacher.department = teacher_update.department
     
+    sync_schedule_view(db, teacher_ids=[teacher_id])
     db.commit()
     db.refresh(db_teacher)
 
@@ -585,6 +601,7 @@ def delete_teacher(teacher_id: int, background_tasks: BackgroundTasks, db: Sessi
     if db_user:
         db.delete(db_user)
         
+    sync_schedule_view(db, teacher_ids=[teacher_id])
     db.commit()
 
     # RAG Delete
@@ -728,10 +745,52 @@ def delete_admin(admin_id: int, db: Session = Depends(get_db), current_user: Use
 # --- Scheduler ---
 
 @router.post("/schedule/auto")
-def run_auto_scheduler(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def run_auto_scheduler(
+    background_tasks: BackgroundTasks,
+    seeds: int = 1,             # more than 1 runs a parallel portfolio of CP-SAT seeds
+    include_auto: bool = False, # also run AutoScheduler in the portfolio
+    local_search: bool = False, # spend the last part of the time budget on local search
+    warm_start: bool = False,   # keep still-feasible placements of the current schedule
+    warm_start_version: Optional[int] = None, # ... or of a stored version instead
+    shards: int = 1,            # more than 1 solves department/building shards in parallel
+    db: Session = Depends(get_db)
+):
     # ... checks ...
-    scheduler = CpSatAutoScheduler(time_limit_seconds=30.0, seed=1)
-    result = scheduler.run(db, rebuild=True)
+    if seeds < 1:
+        raise HTTPException(status_code=400, detail="seeds must be at least 1")
+    if seeds > MAX_SEEDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SEEDS} seeds per run")
+    if shards < 1:
+        raise HTTPException(status_code=400, detail="shards must be at least 1")
+    if shards > 1 and (seeds > 1 or include_auto or warm_start or warm_start_version is not None):
+        raise HTTPException(status_code=400, detail="Sharded runs cannot be combined with a portfolio or a warm start")
+    placements = warm_start_placements(db, warm_start, warm_start_version)
+
+    portfolio = None
+    try:
+        if shards > 1:
+            result = run_sharded(db, shards=shards, time_limit_seconds=30.0, seed=1, local_search=local_search)
+        elif seeds > 1 or include_auto:
+            # Portfolio: every entry solves an in-memory snapshot in its own process, only the best is written
+            best, runs = run_portfolio(db, seeds=seeds, include_auto=include_auto, time_limit_seconds=30.0, local_search=local_search,
+                                       warm_start=placements)
+            result = best.result
+            portfolio = {
+                "engine": best.engine,
+                "seed": best.seed,
+                "runs": [
+                    {"engine": r.engine, "seed": r.seed, "overall_score": r.result.quality.overall_score, "assigned_tba": r.result.assigned_tba}
+                    for r in runs
+                ],
+            }
+        else:
+            scheduler = CpSatAutoScheduler(time_limit_seconds=30.0, seed=1, local_search=local_search, warm_start=placements)
+            result = scheduler.run(db, rebuild=True)
+    except ScheduleInfeasibleError as e:
+        # Raised before anything is deleted: the current schedule is untouched
+        raise HTTPException(status_code=422, detail={"message": str(e), **e.report.to_dict()})
+
+    version = save_version(db, result, source="sharded" if shards > 1 else "portfolio" if portfolio else "cp_sat")
     
     # Trigger RAG Update
     # from services.indexing_service import index_all_data
@@ -739,11 +798,247 @@ def run_auto_scheduler(background_tasks: BackgroundTasks, db: Session = Depends(
 
     return {
         "message": "Auto-scheduling completed.",
+        **run_result_payload(result),
+        "portfolio": portfolio,
+        "version_id": version.id,
+    }
+
+def warm_start_placements(db: Session, warm_start: bool, version_id: Optional[int]):
+    # None when no warm start was asked for; 404 for an unknown version
+    if version_id is not None:
+        if not db.query(ScheduleVersion.id).filter(ScheduleVersion.id == version_id).first():
+            raise HTTPException(status_code=404, detail="Schedule version not found")
+        return load_placements(db, version_id)
+    return load_placements(db) if warm_start else None
+
+@router.get("/schedule/capacity")
+def read_schedule_capacity(db: Session = Depends(get_db)):
+    """
+    Supply/demand check of rooms, teacher quota and adjunct days, without solving.
+    Fatal bottlenecks make /schedule/auto fail with 422.
+    """
+    return CpSatAutoScheduler().capacity_report(db).to_dict()
+
+@router.post("/schedule/jobs", status_code=status.HTTP_202_ACCEPTED)
+def submit_scheduler_job(
+    seed: int = 1,
+    time_limit_seconds: float = 30.0,
+    local_search: bool = False,
+    warm_start: bool = False,
+    warm_start_version: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Starts CpSatAutoScheduler in a separate process and returns immediately.
+    Poll GET /admin/schedule/jobs/{job_id} for phase, progress and the result.
+    """
+    if time_limit_seconds <= 0:
+        raise HTTPException(status_code=400, detail="time_limit_seconds must be positive")
+    try:
+        job = scheduler_jobs.submit_job(seed=seed, time_limit_seconds=time_limit_seconds, local_search=local_search,
+                                        warm_start=warm_start_placements(db, warm_start, warm_start_version))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return scheduler_job_payload(job)
+
+@router.get("/schedule/jobs")
+def list_scheduler_jobs():
+    return [scheduler_job_payload(job) for job in scheduler_jobs.list_jobs()]
+
+@router.get("/schedule/jobs/{job_id}")
+def get_scheduler_job(job_id: str):
+    job = scheduler_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return scheduler_job_payload(job)
+
+@router.post("/schedule/jobs/{job_id}/cancel")
+def cancel_scheduler_job(job_id: str):
+    job = scheduler_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not scheduler_jobs.cancel_job(job_id):
+        job = scheduler_jobs.get_job(job_id)
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    return scheduler_job_payload(scheduler_jobs.get_job(job_id))
+
+def scheduler_job_payload(job) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "phase": job.phase,
+        "progress": dict(job.progress),
+        "seed": job.seed,
+        "time_limit_seconds": job.time_limit_seconds,
+        "local_search": job.local_search,
+        "warm_start": job.warm_start,
+        "submitted_at": job.submitted_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "result": run_result_payload(job.result) if job.result else None,
+        "version_id": job.version_id,
+    }
+
+class ScheduleRepairRequest(BaseModel):
+    teacher_ids: List[int] = []  # withdrawn teachers
+    room_ids: List[int] = []     # offline rooms
+
+@router.post("/schedule/repair")
+def repair_schedule(request: ScheduleRepairRequest, db: Session = Depends(get_db)):
+    """
+    Re-places only the sections that lost their teacher or room; everything else stays as scheduled.
+    """
+    scheduler = CpSatAutoScheduler(seed=1)
+    result = scheduler.repair(db, teacher_ids=request.teacher_ids, room_ids=request.room_ids)
+    version = save_version(db, result, source="repair")
+    return {
+        "message": "Schedule repaired.",
+        **run_result_payload(result),
+        "version_id": version.id,
+    }
+
+class WhatIfCoursePreference(BaseModel):
+    course_id: int
+    section_count: int = 1
+
+class WhatIfTiming(BaseModel):
+    day: str
+    start_time: str  # "HH:MM"
+    end_time: str
+
+class WhatIfTeacher(BaseModel):
+    initial: str
+    name: Optional[str] = None
+    department: Optional[str] = None
+    faculty_type: Optional[str] = "Permanent"
+    preferences: List[WhatIfCoursePreference] = []
+    timings: List[WhatIfTiming] = []
+
+class WhatIfScenarioRequest(BaseModel):
+    name: str = "scenario"
+    engine: str = "cp_sat"  # cp_sat or auto
+    seed: int = 1
+    remove_room_ids: List[int] = []
+    remove_teacher_ids: List[int] = []
+    add_rooms: List[RoomCreate] = []
+    add_teachers: List[WhatIfTeacher] = []
+    warm_start: bool = False  # start from the current schedule
+
+class WhatIfRequest(BaseModel):
+    scenarios: List[WhatIfScenarioRequest]
+    time_limit_seconds: float = 30.0
+    include_plan: bool = True
+
+@router.post("/schedule/what-if")
+def run_what_if_scenarios(request: WhatIfRequest, db: Session = Depends(get_db)):
+    """
+    Dry run: solves each scenario on an in-memory copy of the current inputs and returns the
+    proposed plan and quality. Nothing is written to the database.
+    """
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="At least one scenario is required")
+    if len(request.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios per request")
+    if request.time_limit_seconds <= 0:
+        raise HTTPException(status_code=400, detail="time_limit_seconds must be positive")
+
+    scenarios = [WhatIfScenario(**scenario.model_dump()) for scenario in request.scenarios]
+    try:
+        outcomes = run_what_if(db, scenarios, time_limit_seconds=request.time_limit_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return [
+        {
+            "scenario": outcome.scenario,
+            "engine": outcome.engine,
+            "seed": outcome.seed,
+            "feasible": True,
+            **run_result_payload(outcome.result),
+            "plan": outcome.plan if request.include_plan else None,
+        }
+        if outcome.result is not None else
+        {
+            "scenario": outcome.scenario,
+            "engine": outcome.engine,
+            "seed": outcome.seed,
+            "feasible": False,
+            "capacity": outcome.capacity,
+        }
+        for outcome in outcomes
+    ]
+
+class ScheduleVersionCreate(BaseModel):
+    label: Optional[str] = None
+
+@router.get("/schedule/versions")
+def read_schedule_versions(limit: int = 50, db: Session = Depends(get_db)):
+    """
+    Saved schedules, newest first. Every auto-schedule, job and repair run saves one.
+    """
+    return [schedule_version_payload(version, rows) for version, rows in list_versions(db, limit=limit)]
+
+@router.post("/schedule/versions")
+def create_schedule_version(request: ScheduleVersionCreate, db: Session = Depends(get_db)):
+    """
+    Saves the current schedule (e.g. after manual edits) as a version.
+    """
+    version = save_version(db, source="manual", label=request.label)
+    return schedule_version_payload(version)
+
+@router.get("/schedule/versions/diff")
+def diff_schedule_versions(from_id: int, to_id: int, db: Session = Depends(get_db)):
+    for version_id in (from_id, to_id):
+        if not db.get(ScheduleVersion, version_id):
+            raise HTTPException(status_code=404, detail=f"Schedule version {version_id} not found")
+    return diff_versions(db, from_id, to_id)
+
+@router.post("/schedule/versions/{version_id}/restore")
+def restore_schedule_version(version_id: int, db: Session = Depends(get_db)):
+    """
+    Rolls the live schedule back to a saved version without re-solving.
+    """
+    version = db.get(ScheduleVersion, version_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Schedule version not found")
+    try:
+        counts = restore_version(db, version_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to restore schedule: {str(e)}")
+    return {
+        "message": f"Schedule version {version_id} restored.",
+        **counts,
+        "version": schedule_version_payload(version),
+    }
+
+def schedule_version_payload(version, rows: Optional[int] = None) -> dict:
+    return {
+        "id": version.id,
+        "label": version.label,
+        "source": version.source,
+        "created_at": version.created_at,
+        "rows": rows,
+        "total_sections": version.total_sections,
+        "total_scheduled": version.total_scheduled,
+        "assigned_non_tba": version.assigned_non_tba,
+        "assigned_tba": version.assigned_tba,
+        "quality": {
+            "mean_score": version.mean_score,
+            "min_score": version.min_score,
+            "variance": version.variance,
+            "overall_score": version.overall_score,
+        },
+    }
+
+def run_result_payload(result) -> dict:
+    return {
         "total_scheduled": result.total_scheduled,
         "total_sections": result.total_sections,
         "assigned_non_tba": result.assigned_non_tba,
         "assigned_tba": result.assigned_tba,
         "unscheduled": result.unscheduled,
+        "solver_status": result.solver_status,
         "quality": {
             "mean_score": result.quality.mean_score,
             "min_score": result.quality.min_score,
@@ -751,6 +1046,12 @@ def run_auto_scheduler(background_tasks: BackgroundTasks, db: Session = Depends(
             "overall_score": result.quality.overall_score,
             "teacher_scores": result.quality.teacher_scores
         },
+        "profile": {
+            "timings": result.timings,
+            "counters": result.counters,
+        },
+        "bottlenecks": result.bottlenecks,
+        "churn": result.churn,
     }
 
 
@@ -762,81 +1063,25 @@ def read_schedules(
     search: str = "", 
     sort_by: str = "day", 
     sort_order: str = "asc", 
+    cursor: Optional[str] = None,
+    total: str = "cached",
     db: Session = Depends(get_db)
 ):
     """
     Returns all class schedules with pagination, search, and sorting.
+    Pass the returned next_cursor as `cursor` for the following page; `total` is one of
+    exact, cached, estimate or none (see services.schedule_query.count_schedules).
     """
-    skip = (page - 1) * limit
-    query = db.query(ClassSchedule).join(Section).join(Course).join(Room).outerjoin(Teacher, Section.teacher_id == Teacher.id)
-    
-    # Search
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Course.code.ilike(search_term)) | 
-            (Course.title.ilike(search_term)) |
-            (Room.room_number.ilike(search_term)) |
-            (Teacher.initial.ilike(search_term))
-        )
-    
-    # Calculate total
-    total = query.count()
-
-    # Sort
-    sort_keys = [k.strip() for k in sort_by.split(',')]
-    sort_orders = [o.strip() for o in sort_order.split(',')]
-    
-    order_criteria = []
-    
-    for i, key in enumerate(sort_keys):
-        direction = sort_orders[i] if i < len(sort_orders) else 'asc'
-        
-        column = None
-        if key == 'course':
-            column = Course.code
-        elif key == 'section':
-            column = Section.section_number
-        elif key == 'faculty':
-            column = Teacher.initial
-        elif key == 'room':
-            column = Room.room_number
-        elif key == 'availability':
-            column = ClassSchedule.availability
-        elif key == 'day':
-            column = case(
-                (ClassSchedule.day == 'ST', 0),
-                (ClassSchedule.day == 'Sunday', 0),
-                (ClassSchedule.day == 'MW', 1),
-                (ClassSchedule.day == 'Monday', 1),
-                (ClassSchedule.day == 'Tuesday', 2),
-                (ClassSchedule.day == 'Wednesday', 3),
-                (ClassSchedule.day == 'RA', 4),
-                (ClassSchedule.day == 'Thursday', 4),
-                (ClassSchedule.day == 'Friday', 5),
-                (ClassSchedule.day == 'Saturday', 6),
-                else_=7
-            )
-        elif key == 'time':
-            column = ClassSchedule.time_slot_id
-        
-        if column is not None:
-            if direction == 'desc':
-                order_criteria.append(desc(column))
-            else:
-                order_criteria.append(asc(column))
-
-    # Always add tie-breakers
-    order_criteria.extend([ClassSchedule.time_slot_id.asc(), ClassSchedule.id.asc()])
-    
-    query = query.order_by(*order_criteria)
-
-    schedules = query.offset(skip).limit(limit).all()
-    return {"items": schedules, "total": total, "page": page, "size": limit}
+    try:
+        result = schedule_page(db, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+                               cursor=cursor, page=page, total=total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": result.items, "total": result.total, "page": page, "size": limit, "next_cursor": result.next_cursor}
 
 @router.get("/sections", response_model=List[SectionSchema])
 def read_all_sections(db: Session = Depends(get_db)):
-    return db.query(Section).all()
+    return db.query(Section).options(*SECTION_RESPONSE).all()
 
 @router.post("/schedules", response_model=ClassScheduleSchema)
 def create_schedule(schedule: ClassScheduleCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
@@ -970,6 +1215,9 @@ def create_schedule(schedule: ClassScheduleCreate, background_tasks: BackgroundT
             }
         )
 
+    # The section's teacher may have changed too, so all its rows are re-derived
+    sync_schedule_view(db, section_ids=[schedule.section_id])
+    db.commit()
     return created_schedules[0]
 
 @router.get("/teacher-assignments", response_model=List[TeacherAssignmentInfo])
@@ -997,6 +1245,7 @@ def get_teacher_assignments(db: Session = Depends(get_db)):
 @router.post("/rooms/bulk-delete")
 def delete_rooms_bulk(request: BulkDeleteRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db.query(Room).filter(Room.id.in_(request.ids)).delete(synchronize_session=False)
+    sync_schedule_view(db, room_ids=request.ids)
     db.commit()
     trigger_rag_bulk_delete(background_tasks, [f"room_{id}" for id in request.ids])
     return {"message": "Rooms deleted successfully"}
@@ -1004,6 +1253,7 @@ def delete_rooms_bulk(request: BulkDeleteRequest, background_tasks: BackgroundTa
 @router.post("/courses/bulk-delete")
 def delete_courses_bulk(request: BulkDeleteRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db.query(Course).filter(Course.id.in_(request.ids)).delete(synchronize_session=False)
+    sync_schedule_view(db, course_ids=request.ids)
     db.commit()
     trigger_rag_bulk_delete(background_tasks, [f"course_{id}" for id in request.ids])
     return {"message": "Courses deleted successfully"}
@@ -1021,6 +1271,7 @@ def delete_teachers_bulk(request: BulkDeleteRequest, background_tasks: Backgroun
     if user_ids:
         db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
         
+    sync_schedule_view(db, teacher_ids=request.ids)
     db.commit()
     trigger_rag_bulk_delete(background_tasks, [f"teacher_{id}" for id in request.ids])
     return {"message": "Teachers and associated user accounts deleted successfully"}
@@ -1035,6 +1286,8 @@ def delete_schedules_bulk(request: BulkDeleteRequest, background_tasks: Backgrou
         db.query(Section).filter(Section.id.in_(section_ids)).update({Section.teacher_id: None}, synchronize_session=False)
 
     db.query(ClassSchedule).filter(ClassSchedule.id.in_(request.ids)).delete(synchronize_session=False)
+    # The sections lost their teacher, so all their rows change
+    sync_schedule_view(db, schedule_ids=request.ids, section_ids=section_ids)
     db.commit()
     trigger_rag_bulk_delete(background_tasks, [f"schedule_{id}" for id in request.ids])
     return {"message": "Schedules deleted successfully"}
@@ -1136,6 +1389,7 @@ def update_schedule(
         db.add(new_sched)
         new_schedules.append(new_sched)
         
+    sync_schedule_view(db, section_ids=[section_id])
     db.commit()
     
     # RAG Update
@@ -1179,6 +1433,7 @@ def delete_schedule(schedule_id: int, background_tasks: BackgroundTasks, db: Ses
     db.query(Section).filter(Section.id == db_schedule.section_id).update({Section.teacher_id: None}, synchronize_session=False)
     
     db.delete(db_schedule)
+    sync_schedule_view(db, section_ids=[db_schedule.section_id])
     db.commit()
     trigger_rag_delete(background_tasks, f"schedule_{schedule_id}")
     return {"message": "Schedule deleted successfully"}
@@ -1197,6 +1452,7 @@ def delete_all_schedules(background_tasks: BackgroundTasks, db: Session = Depend
         
         # Delete all schedules
         db.query(ClassSchedule).delete(synchronize_session=False)
+        refresh_schedule_view(db)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -8,7 +8,7 @@ import json
 
 from core.database import get_db
 from core.security import get_current_active_user, get_admin_user
-from core.constants import TIME_SLOTS
+from core.time_slots import slot_times
 from models.booking import BookingRequest, BookingStatus
 from models.schedule import ClassSchedule
 from models.academic import Room, ClassType
@@ -218,13 +218,11 @@ def delete_booking_request(
         raise HTTPException(status_code=404, detail="Booking request not found")
 
     # Calculate booking start datetime
-    time_str = TIME_SLOTS.get(booking.time_slot_id)
-    if not time_str:
+    times = slot_times(booking.time_slot_id)
+    if not times:
         # Should not happen if data is consistent
         raise HTTPException(status_code=400, detail="Invalid time slot")
-    
-    start_time_str = time_str.split(" - ")[0] # "08:00 AM"
-    start_time = datetime.strptime(start_time_str, "%I:%M %p").time()
+    start_time = times[0]
     
     booking_datetime = datetime.combine(booking.booking_date, start_time)
     
@@ -1,19 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from fastapi.responses import RedirectResponse
 from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from core.database import get_db
 from core.security import get_current_active_user
 from models.user import User
 from models.teacher import Teacher
-from models.student import Student
+from models.student import Student, Enrollment
 from models.academic import Course
 from models.schedule import ClassSchedule, Section
 from models.booking import BookingRequest
 from services.google_calendar import get_google_auth_url, get_credentials_from_code, sync_schedule
-from core.constants import TIME_SLOTS
+from core.time_slots import slot_hms
+from services.eager_loading import SCHEDULE_SUMMARY
 
 router = APIRouter(
     prefix="/calendar",
@@ -21,15 +22,7 @@ router = APIRouter(
 )
 
 def get_start_time_from_slot(slot_id: int) -> str:
-    time_range = TIME_SLOTS.get(slot_id)
-    if not time_range:
-        return "00:00"
-    start_str = time_range.split(" - ")[0]
-    try:
-        dt = datetime.strptime(start_str, "%I:%M %p")
-        return dt.strftime("%H:%M")
-    except ValueError:
-        return "00:00"
+    return slot_hms(slot_id)[0][:5]
 
 @router.get("/my-schedule", response_model=List[Dict[str, Any]])
 def get_my_schedule(
@@ -42,7 +35,7 @@ def get_my_schedule(
     if current_user.role == "TEACHER":
         teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
         if teacher:
-            schedules = db.query(ClassSchedule).join(Section).filter(Section.teacher_id == teacher.id).all()
+            schedules = db.query(ClassSchedule).join(Section).filter(Section.teacher_id == teacher.id).options(*SCHEDULE_SUMMARY).all()
             for sch in schedules:
                 course = sch.section.course
                 duration_minutes = 190 if course.duration_mode == "EXTENDED" else 90
@@ -62,29 +55,32 @@ def get_my_schedule(
     elif current_user.role == "STUDENT":
         student = db.query(Student).filter(Student.user_id == current_user.id).first()
         if student:
-            for enrollment in student.enrollments:
-                section = enrollment.section
-                schedules = db.query(ClassSchedule).filter(ClassSchedule.section_id == section.id).all()
-                for sch in schedules:
-                    course = section.course
-                    duration_minutes = 190 if course.duration_mode == "EXTENDED" else 90
-                    events.append({
-                        "id": f"class-{sch.id}",
-                        "title": course.code,
-                        "type": "class",
-                        "day": sch.day,
-                        "time_slot_id": sch.time_slot_id,
-                        "start_time": get_start_time_from_slot(sch.time_slot_id),
-                        "duration_minutes": duration_minutes,
-                        "room": sch.room.room_number if sch.room else "TBA",
-                        "section": section.section_number
-                    })
+            # All enrolled sections' rows in one query instead of one per enrollment
+            schedules = db.query(ClassSchedule)\
+                .join(Enrollment, Enrollment.section_id == ClassSchedule.section_id)\
+                .filter(Enrollment.student_id == student.id)\
+                .options(*SCHEDULE_SUMMARY).all()
+            for sch in schedules:
+                section = sch.section
+                course = section.course
+                duration_minutes = 190 if course.duration_mode == "EXTENDED" else 90
+                events.append({
+                    "id": f"class-{sch.id}",
+                    "title": course.code,
+                    "type": "class",
+                    "day": sch.day,
+                    "time_slot_id": sch.time_slot_id,
+                    "start_time": get_start_time_from_slot(sch.time_slot_id),
+                    "duration_minutes": duration_minutes,
+                    "room": sch.room.room_number if sch.room else "TBA",
+                    "section": section.section_number
+                })
 
     # 2. Fetch Approved Bookings
     bookings = db.query(BookingRequest).filter(
         BookingRequest.user_id == current_user.id,
         BookingRequest.status == "APPROVED"
-    ).all()
+    ).options(selectinload(BookingRequest.room)).all()
 
     for booking in bookings:
         start_time_str = get_start_time_from_slot(booking.time_slot_id)
@@ -13,6 +13,7 @@ from models.student import Student, Enrollment
 from models.academic import Course, Room
 from models.schedule import ClassSchedule, Section
 from models.booking import BookingRequest
+from services.eager_loading import SCHEDULE_SUMMARY
 
 router = APIRouter(
     prefix="/dashboard",
@@ -95,6 +96,7 @@ def get_teacher_today_schedule(
         day_filters.append("RA")
 
     schedules = db.query(ClassSchedule).join(Section).join(Course).join(Room)\
+        .options(*SCHEDULE_SUMMARY)\
         .filter(Section.teacher_id == teacher.id)\
         .filter(ClassSchedule.day.in_(day_filters))\
         .order_by(ClassSchedule.time_slot_id).all()
@@ -137,6 +139,7 @@ def get_student_today_schedule(
 
     # Join Enrollment -> Section -> ClassSchedule
     schedules = db.query(ClassSchedule).join(Section).join(Enrollment)\
+        .options(*SCHEDULE_SUMMARY)\
         .filter(Enrollment.student_id == student.id)\
         .filter(ClassSchedule.day.in_(day_filters))\
         .order_by(ClassSchedule.time_slot_id).all()
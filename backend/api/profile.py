@@ -19,6 +19,8 @@ from schemas.teacher import TeacherUpdate, Teacher as TeacherSchema, TeacherPref
 from schemas.user import UserUpdate, PasswordChange, User as UserSchema, UserProfile
 from services.rag_service import trigger_rag_update, trigger_rag_delete
 from core.constants import TIME_SLOTS
+from services.eager_loading import SECTION_SUMMARY
+from services.schedule_view import sync_schedule_view
 
 router = APIRouter(
     prefix="/profile",
@@ -77,7 +79,7 @@ def construct_teacher_data(user: User, teacher: Teacher, db: Session) -> dict:
     
     assigned_courses = []
     # Fetch assigned sections
-    sections = db.query(Section).filter(Section.teacher_id == teacher.id).all()
+    sections = db.query(Section).filter(Section.teacher_id == teacher.id).options(*SECTION_SUMMARY).all()
     if sections:
         description += "Assigned Courses:\n"
         for section in sections:
@@ -85,9 +87,8 @@ def construct_teacher_data(user: User, teacher: Teacher, db: Session) -> dict:
             description += f"- {course.code}: {course.title} (Section {section.section_number})\n"
             
             schedules_list = []
-            # Fetch schedules for this section
-            schedules = db.query(ClassSchedule).filter(ClassSchedule.section_id == section.id).all()
-            for sched in schedules:
+            # Schedule rows of this section (loaded with the sections)
+            for sched in section.schedules:
                 slot_time = TIME_SLOTS.get(sched.time_slot_id, "Unknown Time")
                 description += f"  - {sched.day} {slot_time} (Room {sched.room.room_number})\n"
                 schedules_list.append({
@@ -262,6 +263,9 @@ def update_teacher_profile(
                 )
                 db.add(new_tp)
 
+    if profile_update.initial is not None:
+        # The initial shows on every schedule row of the teacher's sections
+        sync_schedule_view(db, teacher_ids=[teacher.id])
     db.commit()
     db.refresh(teacher)
     
@@ -1,14 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, defer
-from sqlalchemy import or_, desc, asc, case
+from sqlalchemy import or_
 from typing import List, Optional, Dict
 from core.database import get_db
 from models.teacher import Teacher
 from models.user import User
-from models.schedule import ClassSchedule, Section
-from models.academic import Room, Course
 from schemas.public import TeacherPublicResponse
 from schemas.schedule import PaginatedSchedules
+from services.schedule_query import schedule_page
 
 router = APIRouter(prefix="/public", tags=["Public Data"])
 
@@ -19,77 +18,21 @@ def get_public_schedules(
     search: str = "", 
     sort_by: str = "day", 
     sort_order: str = "asc", 
+    cursor: Optional[str] = None,
+    total: str = "cached",
     db: Session = Depends(get_db)
 ):
     """
     Returns all class schedules with pagination, search, and sorting (Public).
+    Pass the returned next_cursor as `cursor` for the following page; `total` is one of
+    exact, cached, estimate or none (see services.schedule_query.count_schedules).
     """
-    skip = (page - 1) * limit
-    query = db.query(ClassSchedule).join(Section).join(Course).join(Room).outerjoin(Teacher, Section.teacher_id == Teacher.id)
-    
-    # Search
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Course.code.ilike(search_term)) | 
-            (Course.title.ilike(search_term)) |
-            (Room.room_number.ilike(search_term)) |
-            (Teacher.initial.ilike(search_term))
-        )
-    
-    # Calculate total
-    total = query.count()
-
-    # Sort
-    sort_keys = [k.strip() for k in sort_by.split(',')]
-    sort_orders = [o.strip() for o in sort_order.split(',')]
-    
-    order_criteria = []
-    
-    for i, key in enumerate(sort_keys):
-        direction = sort_orders[i] if i < len(sort_orders) else 'asc'
-        
-        column = None
-        if key == 'course':
-            column = Course.code
-        elif key == 'section':
-            column = Section.section_number
-        elif key == 'faculty':
-            column = Teacher.initial
-        elif key == 'room':
-            column = Room.room_number
-        elif key == 'availability':
-            column = ClassSchedule.availability
-        elif key == 'day':
-            column = case(
-                (ClassSchedule.day == 'ST', 0),
-                (ClassSchedule.day == 'Sunday', 0),
-                (ClassSchedule.day == 'MW', 1),
-                (ClassSchedule.day == 'Monday', 1),
-                (ClassSchedule.day == 'Tuesday', 2),
-                (ClassSchedule.day == 'Wednesday', 3),
-                (ClassSchedule.day == 'RA', 4),
-                (ClassSchedule.day == 'Thursday', 4),
-                (ClassSchedule.day == 'Friday', 5),
-                (ClassSchedule.day == 'Saturday', 6),
-                else_=7
-            )
-        elif key == 'time':
-            column = ClassSchedule.time_slot_id
-        
-        if column is not None:
-            if direction == 'desc':
-                order_criteria.append(desc(column))
-            else:
-                order_criteria.append(asc(column))
-
-    # Always add tie-breakers
-    order_criteria.extend([ClassSchedule.time_slot_id.asc(), ClassSchedule.id.asc()])
-    
-    query = query.order_by(*order_criteria)
-
-    schedules = query.offset(skip).limit(limit).all()
-    return {"items": schedules, "total": total, "page": page, "size": limit}
+    try:
+        result = schedule_page(db, limit=limit, search=search, sort_by=sort_by, sort_order=sort_order,
+                               cursor=cursor, page=page, total=total, from_view=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": result.items, "total": result.total, "page": page, "size": limit, "next_cursor": result.next_cursor}
 
 @router.get("/filters")
 def get_teacher_filters(db: Session = Depends(get_db)):
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Any, Dict
 from datetime import datetime
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ from models.student import Student, Enrollment
 from models.schedule import Section, ClassSchedule
 from models.academic import Course, Room
 from models.teacher import Teacher
+from services.eager_loading import SECTION_SUMMARY
 
 router = APIRouter(prefix="/student", tags=["student"])
 
@@ -27,17 +28,16 @@ def get_available_sections(
         raise HTTPException(status_code=403, detail="Not authorized")
         
     # Fetch all sections with course and teacher info
-    sections = db.query(Section).join(Course).all()
+    sections = db.query(Section).join(Course).options(*SECTION_SUMMARY).all()
     
     result = []
     for section in sections:
         course = section.course
         teacher = section.teacher
         
-        # Get schedule for this section
-        schedules = db.query(ClassSchedule).filter(ClassSchedule.section_id == section.id).all()
+        # Schedule rows of this section (loaded with the sections)
         schedule_text = []
-        for sched in schedules:
+        for sched in section.schedules:
             time_str = TIME_SLOTS.get(sched.time_slot_id, "Unknown")
             schedule_text.append(f"{sched.day} {time_str} ({sched.room.room_number})")
             
@@ -134,7 +134,8 @@ def get_enrollments(
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
         
-    enrollments = db.query(Enrollment).filter(Enrollment.student_id == student.id).all()
+    enrollments = db.query(Enrollment).filter(Enrollment.student_id == student.id)\
+        .options(selectinload(Enrollment.section).options(*SECTION_SUMMARY)).all()
     
     result = []
     for enrollment in enrollments:
@@ -142,10 +143,9 @@ def get_enrollments(
         course = section.course
         teacher = section.teacher
         
-        # Get schedule for this section
-        schedules = db.query(ClassSchedule).filter(ClassSchedule.section_id == section.id).all()
+        # Schedule rows of this section (loaded with the enrollments)
         schedule_text = []
-        for sched in schedules:
+        for sched in section.schedules:
             time_str = TIME_SLOTS.get(sched.time_slot_id, "Unknown")
             schedule_text.append(f"{sched.day} {time_str} ({sched.room.room_number})")
             
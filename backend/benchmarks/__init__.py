@@ -0,0 +1,6 @@
+"""
+Scheduler benchmarks on synthetic university datasets.
+
+Run from the backend directory:
+    python -m benchmarks.run --scales 200 1000 5000 --engines auto cp_sat --output results.json
+"""
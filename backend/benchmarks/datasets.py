@@ -0,0 +1,143 @@
+import math
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core.constants import THEORY_DAYS
+from models.academic import ClassType, Course, DurationMode, Room
+from models.schedule import Section
+from models.teacher import Teacher, TeacherPreference, TeacherTimingPreference
+from models.user import User, UserRole
+from services.capacity_check import ROOM_BLOCKS, ROOM_CELLS, section_pool, section_size
+
+# Departments per building, as capacity_check.dept_building maps them
+SAC_DEPARTMENTS = ["CSE", "EEE", "MAT", "PHY"]
+NAC_DEPARTMENTS = ["BBA", "ENG", "ECO"]
+
+# Preference windows, in the 24h format the frontend stores
+TIME_WINDOWS = [("08:00", "11:10"), ("09:40", "12:50"), ("11:20", "14:30"), ("13:00", "16:10"), ("14:40", "17:50"), ("08:00", "17:50")]
+
+@dataclass
+class DatasetSpec:
+    """
+    Shape of a synthetic university. Counts not given explicitly are derived from `sections`.
+    """
+    sections: int = 200
+    sections_per_course: int = 3
+    lab_ratio: float = 0.35           # Share of theory courses with an L-suffixed lab sibling
+    extended_lab_ratio: float = 0.5   # Share of labs that are EXTENDED (3h)
+    adjunct_ratio: float = 0.25
+    sections_per_teacher: float = 3.0
+    room_slack: float = 1.3           # Rooms per strictly needed room
+    accepted_ratio: float = 0.8       # Share of course preferences already accepted
+    seed: int = 0
+
+def generate_dataset(db: Session, spec: DatasetSpec) -> Dict[str, int]:
+    """
+    Inserts a synthetic dataset into an empty database and returns the row counts.
+    Rows are bulk inserted with explicit ids, so even the 5,000-section scale loads in seconds.
+    """
+    rng = random.Random(spec.seed)
+    departments = SAC_DEPARTMENTS + NAC_DEPARTMENTS
+
+    # --- Courses and sections: theory courses, some with an L-suffixed lab sibling ---
+    per_theory_course = spec.sections_per_course * (1 + spec.lab_ratio)
+    theory_courses = max(1, round(spec.sections / per_theory_course))
+    courses, sections = [], []
+    for i in range(theory_courses):
+        dept = departments[i % len(departments)]
+        code = f"{dept}{101 + i // len(departments)}"
+        course_id = len(courses) + 1
+        courses.append({"id": course_id, "code": code, "title": f"{dept} Course {i}", "credits": 3,
+                        "type": ClassType.THEORY, "duration_mode": DurationMode.STANDARD})
+        with_lab = rng.random() < spec.lab_ratio
+        if with_lab:
+            lab_mode = DurationMode.EXTENDED if rng.random() < spec.extended_lab_ratio else DurationMode.STANDARD
+            courses.append({"id": course_id + 1, "code": code + "L", "title": f"{dept} Course {i} Lab", "credits": 1,
+                            "type": ClassType.LAB, "duration_mode": lab_mode})
+        for number in range(1, spec.sections_per_course + 1):
+            sections.append({"id": len(sections) + 1, "course_id": course_id, "section_number": number, "teacher_id": None})
+            if with_lab:
+                sections.append({"id": len(sections) + 1, "course_id": course_id + 1, "section_number": number, "teacher_id": None})
+
+    course_by_id = {c["id"]: c for c in courses}
+    theory_sections = sum(1 for s in sections if course_by_id[s["course_id"]]["type"] == ClassType.THEORY)
+    lab_sections = len(sections) - theory_sections
+
+    # --- Rooms: per building and type, sized from that building's own demand ---
+    # Sections only use rooms of their department's building (capacity_check.section_pool), so
+    # each (type, building) pool gets enough rooms for its sections: a theory room holds
+    # 3 patterns x 7 slots, a lab room 6 days x 3 blocks, and never less than the room time
+    # capacity_check counts.
+    demand = defaultdict(lambda: [0, 0, 0])   # (type, building) -> [sections, cells, blocks]
+    for s in sections:
+        course = course_by_id[s["course_id"]]
+        cells, blocks = section_size(course["type"], course["duration_mode"])
+        need = demand[section_pool(course["code"], course["type"])]
+        need[0] += 1
+        need[1] += cells
+        need[2] += blocks
+
+    rooms = []
+    for room_type, per_room in ((ClassType.THEORY, 21), (ClassType.LAB, 18)):
+        for building in ("SAC", "NAC"):
+            section_count, cells, blocks = demand[(room_type.value, building)]
+            needed = max(section_count / per_room, cells / ROOM_CELLS, blocks / ROOM_BLOCKS)
+            for _ in range(max(1, math.ceil(needed * spec.room_slack))):
+                floor = rng.randint(2, 9)
+                suffix = "L" if room_type == ClassType.LAB else ""
+                rooms.append({"id": len(rooms) + 1, "room_number": f"{building}{floor}{len(rooms) + 1:02d}{suffix}",
+                              "capacity": rng.choice([30, 35, 40, 45]), "type": room_type})
+
+    # --- Teachers: adjunct/permanent with timing windows and course quotas ---
+    teacher_count = max(2, round(len(sections) / spec.sections_per_teacher))
+    users, teachers, timing, prefs = [], [], [], []
+    theory_by_dept: Dict[str, List[Dict]] = {}
+    for c in courses:
+        if c["type"] == ClassType.THEORY:
+            theory_by_dept.setdefault(c["code"].rstrip("0123456789"), []).append(c)
+
+    for i in range(teacher_count):
+        teacher_id = i + 1
+        dept = departments[i % len(departments)]
+        is_adjunct = rng.random() < spec.adjunct_ratio
+        users.append({"id": teacher_id, "email": f"bench.t{teacher_id}@northsouth.edu", "password_hash": "x",
+                      "role": UserRole.TEACHER, "is_active": True})
+        teachers.append({"id": teacher_id, "user_id": teacher_id, "initial": f"B{teacher_id:04d}", "name": f"Bench Teacher {teacher_id}",
+                         "faculty_type": "Adjunct" if is_adjunct else "Permanent", "department": dept})
+
+        # Adjuncts always give windows (they are only placed on preferred days); some permanents give none
+        if is_adjunct or rng.random() < 0.8:
+            for pattern in rng.sample(list(THEORY_DAYS), rng.randint(1, 3)):
+                start, end = rng.choice(TIME_WINDOWS)
+                for day in THEORY_DAYS[pattern]:
+                    timing.append({"id": len(timing) + 1, "teacher_id": teacher_id, "day": day, "start_time": start, "end_time": end})
+
+        dept_courses = theory_by_dept.get(dept, [])
+        for c in rng.sample(dept_courses, min(len(dept_courses), rng.randint(1, 3))):
+            prefs.append({"id": len(prefs) + 1, "teacher_id": teacher_id, "course_id": c["id"],
+                          "section_count": rng.randint(1, 2),
+                          "status": "accepted" if rng.random() < spec.accepted_ratio else "pending"})
+
+    for model, rows in (
+        (Room, rooms), (Course, courses), (User, users), (Teacher, teachers), (Section, sections),
+        (TeacherPreference, prefs), (TeacherTimingPreference, timing),
+    ):
+        if rows:
+            db.execute(insert(model.__table__), rows)
+    db.commit()
+
+    return {
+        "sections": len(sections),
+        "theory_sections": theory_sections,
+        "lab_sections": lab_sections,
+        "courses": len(courses),
+        "rooms": len(rooms),
+        "teachers": len(teachers),
+        "course_preferences": len(prefs),
+        "timing_preferences": len(timing),
+    }
@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.datasets import DatasetSpec, generate_dataset
+from core.database import Base
+# Every mapped model, so relationships resolve in the spawned case process
+import models.academic, models.admin, models.booking, models.chat, models.notification, models.schedule, models.settings, models.student, models.teacher, models.user, models.verification  # noqa: F401,E401
+from services.cp_sat_scheduler import CpSatAutoScheduler
+from services.scheduler import AutoScheduler
+
+ENGINES = ("auto", "cp_sat")
+DEFAULT_SCALES = (200, 1000, 5000)
+
+def _open_session(database_url: str):
+    """
+    Fresh database for one case. A Postgres URL must point at a throwaway database:
+    all tables are dropped and recreated.
+    """
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+def _max_rss_mb() -> float:
+    # Peak resident set size of this process, including CP-SAT's native memory.
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+def run_case(engine_name: str, spec: DatasetSpec, database_url: str, time_limit_seconds: float) -> Dict:
+    """
+    One engine on one dataset. Runs in its own process so peak RSS belongs to this case alone
+    (tracemalloc is not used: it slows the Python-heavy phases several times over).
+    """
+    logging.getLogger("scheduler").setLevel(logging.WARNING)
+    engine, db = _open_session(database_url)
+    dataset = generate_dataset(db, spec)
+
+    queries = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(*args):
+        queries[0] += 1
+
+    # Peak RSS so far (dataset generation); the scheduler's own footprint is max_rss_mb minus this
+    baseline_rss_mb = _max_rss_mb()
+    started = time.perf_counter()
+    # Keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        if engine_name == "auto":
+            auto_run = AutoScheduler(db).run()
+        else:
+            result = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=spec.seed).run(db, rebuild=True)
+    wall = time.perf_counter() - started
+    max_rss_mb = _max_rss_mb()
+    run_queries = queries[0]
+
+    if engine_name == "auto":
+        # Same scoring rules for both engines
+        result = CpSatAutoScheduler().evaluate(db)
+        result.solver_status = "AUTO"
+        result.timings = auto_run.timings
+        result.counters = auto_run.counters
+
+    db.close()
+    engine.dispose()
+
+    return {
+        "engine": engine_name,
+        "scale": spec.sections,
+        "seed": spec.seed,
+        "dataset": dataset,
+        "wall_seconds": round(wall, 3),
+        "baseline_rss_mb": round(baseline_rss_mb, 1),
+        "max_rss_mb": round(max_rss_mb, 1),
+        "queries": run_queries,
+        "solver_status": result.solver_status,
+        "total_sections": result.total_sections,
+        "total_scheduled": result.total_scheduled,
+        "assigned_non_tba": result.assigned_non_tba,
+        "assigned_tba": result.assigned_tba,
+        "unscheduled": result.unscheduled,
+        "quality": {
+            "mean_score": result.quality.mean_score,
+            "min_score": result.quality.min_score,
+            "variance": result.quality.variance,
+            "overall_score": result.quality.overall_score,
+        },
+    }
+
+def check_datasets(scales: List[int], seeds: List[int], database_url: str) -> List[str]:
+    """
+    Runs CpSatAutoScheduler's capacity report on every dataset, without solving.
+    Returns one line per dataset that would be rejected as infeasible.
+    """
+    failures = []
+    for scale in scales:
+        for seed in seeds:
+            engine, db = _open_session(database_url)
+            try:
+                generate_dataset(db, DatasetSpec(sections=scale, seed=seed))
+                report = CpSatAutoScheduler().capacity_report(db)
+            finally:
+                db.close()
+                engine.dispose()
+            print(f"check scale={scale:<5} seed={seed} {report.summary()}", file=sys.stderr)
+            if not report.feasible:
+                failures.append(f"scale={scale} seed={seed}: {report.summary()}")
+    return failures
+
+def run_benchmarks(scales: List[int], engines: List[str], seeds: List[int], database_url: str, time_limit_seconds: float) -> Dict:
+    cases = []
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        for seed in seeds:
+            for engine_name in engines:
+                spec = DatasetSpec(sections=scale, seed=seed)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    case = pool.submit(run_case, engine_name, spec, database_url, time_limit_seconds).result()
+                print(f"{engine_name:>6} scale={scale:<5} seed={seed} {case['wall_seconds']:>8.2f}s "
+                      f"rss={case['max_rss_mb']}MB tba={case['assigned_tba']} quality={case['quality']['overall_score']}",
+                      file=sys.stderr)
+                cases.append(case)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": database_url.split("@")[-1],
+        "time_limit_seconds": time_limit_seconds,
+        "cases": cases,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AutoScheduler and CpSatAutoScheduler on synthetic datasets.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="Target section counts")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="Dataset (and CP-SAT) seeds")
+    parser.add_argument("--time-limit", type=float, default=30.0, help="CP-SAT time limit per run, seconds")
+    parser.add_argument("--database-url", default="sqlite://", help="sqlite:// (in memory) or a throwaway Postgres database")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--check", action="store_true", help="Only check that every dataset passes the capacity report; exit 1 if not")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_datasets(args.scales, args.seeds, args.database_url)
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    report = run_benchmarks(args.scales, args.engines, args.seeds, args.database_url, args.time_limit)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
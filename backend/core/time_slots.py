@@ -0,0 +1,87 @@
+"""
+The slot tables of core.constants compiled once at import: minute ranges, clock times,
+the slot-overlap matrix and pattern <-> weekday resolution. Nothing parses slot strings per request.
+"""
+from dataclasses import dataclass
+from datetime import time
+from typing import Dict, List, Optional, Tuple
+
+from core.constants import LAB_DAYS, LAB_SLOT_MAPPING, LAB_TIME_SLOTS, THEORY_DAYS, TIME_SLOTS
+
+@dataclass(frozen=True)
+class Slot:
+    id: int
+    kind: str                 # THEORY or LAB
+    label: str                # "08:00 AM - 09:30 AM", as stored in core.constants
+    start: int                # minutes after midnight
+    end: int
+    covers: Tuple[int, ...]   # theory slot ids it occupies (two for a lab block)
+
+    @property
+    def start_time(self) -> time:
+        return _CLOCK[self.start]
+
+    @property
+    def end_time(self) -> time:
+        return _CLOCK[self.end]
+
+    def overlaps(self, other: "Slot") -> bool:
+        return SLOT_OVERLAP[self, other]
+
+def _minutes(clock: str) -> int:
+    # "01:00 PM" -> 780; only runs on the constant tables at import
+    hm, meridiem = clock.split()
+    hour, minute = (int(part) for part in hm.split(":"))
+    return (hour % 12 + (12 if meridiem.upper() == "PM" else 0)) * 60 + minute
+
+def _compile(kind: str, table: Dict[int, str], covers: Dict[int, List[int]]) -> Dict[int, Slot]:
+    slots = {}
+    for slot_id, label in table.items():
+        start, end = label.split(" - ")
+        slots[slot_id] = Slot(slot_id, kind, label, _minutes(start), _minutes(end), tuple(covers.get(slot_id, [slot_id])))
+    return slots
+
+THEORY_SLOTS: Dict[int, Slot] = _compile("THEORY", TIME_SLOTS, {})
+LAB_SLOTS: Dict[int, Slot] = _compile("LAB", LAB_TIME_SLOTS, LAB_SLOT_MAPPING)
+ALL_SLOTS: List[Slot] = list(THEORY_SLOTS.values()) + list(LAB_SLOTS.values())
+
+_CLOCK = {m: time(m // 60, m % 60) for s in ALL_SLOTS for m in (s.start, s.end)}
+_HMS = {s.id: (s.start_time.strftime("%H:%M:%S"), s.end_time.strftime("%H:%M:%S")) for s in THEORY_SLOTS.values()}
+
+# (a, b) -> whether the two slots share any minute; half-open ranges, so back-to-back slots do not
+SLOT_OVERLAP: Dict[Tuple[Slot, Slot], bool] = {
+    (a, b): a.start < b.end and b.start < a.end for a in ALL_SLOTS for b in ALL_SLOTS
+}
+
+# Day pattern (ST/MW/RA) or single weekday -> the weekdays it meets on
+_DAYS: Dict[str, List[str]] = {**{day: [day] for day in LAB_DAYS}, **{p: list(days) for p, days in THEORY_DAYS.items()}}
+# Weekday -> the theory pattern that meets on it
+DAY_PATTERN: Dict[str, str] = {day: pattern for pattern, days in THEORY_DAYS.items() for day in days}
+
+# ClassSchedule.day -> position in the week for listings: a pattern sorts with its first day
+DAY_ORDINALS: Dict[str, int] = {
+    'ST': 0, 'Sunday': 0, 'MW': 1, 'Monday': 1, 'Tuesday': 2, 'Wednesday': 3,
+    'RA': 4, 'Thursday': 4, 'Friday': 5, 'Saturday': 6,
+}
+UNKNOWN_DAY_ORDINAL = 7
+
+def days_of(day: str) -> List[str]:
+    """
+    Weekdays of a ClassSchedule.day value: a pattern's two days, or the weekday itself.
+    The returned list is shared; do not modify it.
+    """
+    days = _DAYS.get(day)
+    return days if days is not None else [day]
+
+def slot_times(slot_id: int) -> Optional[Tuple[time, time]]:
+    """
+    (start, end) clock times of a theory slot, None for an unknown id.
+    """
+    slot = THEORY_SLOTS.get(slot_id)
+    return (slot.start_time, slot.end_time) if slot else None
+
+def slot_hms(slot_id: int) -> Tuple[str, str]:
+    """
+    ("08:00:00", "09:30:00") for a theory slot; midnight for an unknown id.
+    """
+    return _HMS.get(slot_id, ("00:00:00", "00:00:00"))
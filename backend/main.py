@@ -15,10 +15,18 @@ from models.verification import VerificationCode
 from models.chat import ChatMessage
 from models.notification import Notification, NotificationRecipient
 from core.security import get_password_hash
+from services.schedule_view import refresh_schedule_view
+from services.search import install_search_indexes
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Trigram indexes for the listing searches; without them search still works, by scanning
+try:
+    install_search_indexes(engine)
+except Exception as e:
+    print(f"Startup: Error installing search indexes: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
@@ -51,6 +59,16 @@ async def lifespan(app: FastAPI):
                 db.rollback()
         else:
             print(f"Startup: Admin user {admin_email} already exists.")
+
+        # Rebuild the schedule read table: it may have just been created, or the schedule
+        # may have been changed outside the API since the last run
+        try:
+            refresh_schedule_view(db)
+            db.commit()
+            print("Startup: Schedule view rebuilt.")
+        except Exception as e:
+            print(f"Startup: Error rebuilding schedule view: {e}")
+            db.rollback()
     except Exception as e:
         print(f"Startup Error: {e}")
     finally:
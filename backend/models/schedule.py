@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, Float, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from core.database import Base
 
 class Section(Base):
@@ -50,3 +51,110 @@ class ClassSchedule(Base):
 
     def __repr__(self):
         return f"<ClassSchedule(section_id={self.section_id}, room_id={self.room_id}, day='{self.day}', slot={self.time_slot_id})>"
+
+class ScheduleView(Base):
+    """
+    Denormalized read model of ClassSchedule: one flattened row per schedule row, with the
+    course, section, teacher and room fields public listings show, filter and sort on.
+    Same id as the ClassSchedule row. Plain ids (no foreign keys): services.schedule_view
+    keeps it in sync on every write path, and deleting a room or course never blocks on it.
+    """
+    __tablename__ = "schedule_view"
+
+    id = Column(Integer, primary_key=True)
+    section_id = Column(Integer, nullable=False, index=True)
+    course_id = Column(Integer, nullable=False, index=True)
+    teacher_id = Column(Integer, nullable=True, index=True)
+    room_id = Column(Integer, nullable=False, index=True)
+    course_code = Column(String, nullable=False, index=True)
+    course_title = Column(String, nullable=False)
+    section_number = Column(Integer, nullable=False)
+    teacher_initial = Column(String, nullable=False, default="", index=True)  # "" without a teacher
+    room_number = Column(String, nullable=False, index=True)
+    day = Column(String, nullable=False)
+    day_order = Column(Integer, nullable=False)  # core.time_slots.DAY_ORDINALS
+    time_slot_id = Column(Integer, nullable=False)
+    start_time = Column(String, nullable=False)  # "08:00:00"
+    end_time = Column(String, nullable=False)
+    availability = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # The default listing order
+        Index('ix_schedule_view_day_order_slot', 'day_order', 'time_slot_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<ScheduleView(id={self.id}, course='{self.course_code}', day='{self.day}', slot={self.time_slot_id})>"
+
+class ScheduleVersion(Base):
+    """
+    A published schedule kept for rollback: the Quality summary of the run that produced it,
+    with its rows in ScheduleVersionEntry.
+    """
+    __tablename__ = "schedule_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    label = Column(String, nullable=True)
+    source = Column(String, nullable=False)  # cp_sat, portfolio, sharded, job, repair, manual
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    total_sections = Column(Integer, nullable=False, default=0)
+    total_scheduled = Column(Integer, nullable=False, default=0)
+    assigned_non_tba = Column(Integer, nullable=False, default=0)
+    assigned_tba = Column(Integer, nullable=False, default=0)
+    mean_score = Column(Float, nullable=False, default=0.0)
+    min_score = Column(Float, nullable=False, default=0.0)
+    variance = Column(Float, nullable=False, default=0.0)
+    overall_score = Column(Float, nullable=False, default=0.0)
+    teacher_scores = Column(Text, nullable=True)  # JSON list, as in Quality.teacher_scores
+
+    entries = relationship("ScheduleVersionEntry", back_populates="version", cascade="all, delete-orphan", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<ScheduleVersion(id={self.id}, source='{self.source}', overall_score={self.overall_score})>"
+
+class ScheduleVersionEntry(Base):
+    """
+    One ClassSchedule row of a ScheduleVersion, with the section's teacher at the time.
+    Section, room and teacher are plain ids (no foreign keys), so deleting a course or room
+    never touches old versions; restore skips rows whose section or room is gone.
+    """
+    __tablename__ = "schedule_version_entries"
+
+    id = Column(Integer, primary_key=True)
+    version_id = Column(Integer, ForeignKey("schedule_versions.id", ondelete="CASCADE"), nullable=False, index=True)
+    section_id = Column(Integer, nullable=False)
+    room_id = Column(Integer, nullable=False)
+    day = Column(String, nullable=False)  # Pattern (ST/MW/RA) or lab day, as in ClassSchedule.day
+    time_slot_id = Column(Integer, nullable=False)
+    teacher_id = Column(Integer, nullable=True)
+    is_friday_booking = Column(Boolean, default=False)
+
+    version = relationship("ScheduleVersion", back_populates="entries")
+
+class SchedulerJobRecord(Base):
+    """
+    State of a background scheduler job (services.scheduler_jobs), shared by every API worker.
+    `active` is True while the job is queued or running and NULL once it finished; the column
+    is unique, so the database admits one active job at a time across all workers.
+    """
+    __tablename__ = "scheduler_jobs"
+
+    id = Column(String, primary_key=True)
+    seed = Column(Integer, nullable=False)
+    time_limit_seconds = Column(Float, nullable=False)
+    local_search = Column(Boolean, nullable=False, default=False)
+    warm_start = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False)
+    phase = Column(String, nullable=False)
+    progress = Column(Text, nullable=True)  # JSON dict of the solver's counters
+    active = Column(Boolean, nullable=True, unique=True)
+    submitted_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last sign of life from the owning worker
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON of the RunResult
+    version_id = Column(Integer, nullable=True)  # ScheduleVersion the finished job saved
+
+    def __repr__(self):
+        return f"<SchedulerJobRecord(id='{self.id}', status='{self.status}')>"
@@ -1,9 +1,8 @@
 from pydantic import BaseModel, computed_field
 from typing import Optional, List
-from datetime import datetime
 from schemas.academic import Room, Course
 from schemas.teacher import Teacher
-from core.constants import TIME_SLOTS
+from core.time_slots import slot_hms
 
 class SectionBase(BaseModel):
     course_id: int
@@ -33,21 +32,11 @@ class ClassSchedule(ClassScheduleBase):
 
     @computed_field
     def start_time(self) -> str:
-        time_str = TIME_SLOTS.get(self.time_slot_id, "00:00 AM - 00:00 AM")
-        start, _ = time_str.split(" - ")
-        return self._convert_to_24h(start)
+        return slot_hms(self.time_slot_id)[0]
 
     @computed_field
     def end_time(self) -> str:
-        time_str = TIME_SLOTS.get(self.time_slot_id, "00:00 AM - 00:00 AM")
-        _, end = time_str.split(" - ")
-        return self._convert_to_24h(end)
-
-    def _convert_to_24h(self, time_str: str) -> str:
-        try:
-            return datetime.strptime(time_str, "%I:%M %p").strftime("%H:%M:%S")
-        except ValueError:
-            return "00:00:00"
+        return slot_hms(self.time_slot_id)[1]
 
     class Config:
         from_attributes = True
@@ -57,6 +46,7 @@ class ClassScheduleCreate(ClassScheduleBase):
 
 class PaginatedSchedules(BaseModel):
     items: List[ClassSchedule]
-    total: int
+    total: Optional[int] = None        # None when requested with total=none
     page: int
     size: int
+    next_cursor: Optional[str] = None  # None on the last page
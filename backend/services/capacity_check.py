@@ -0,0 +1,273 @@
+import math
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from itertools import combinations
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from core.constants import LAB_DAYS, LAB_SLOT_MAPPING, THEORY_DAYS, TIME_SLOTS
+from models.academic import DurationMode
+
+# Weekly capacity of one room
+ROOM_CELLS = len(LAB_DAYS) * len(TIME_SLOTS)          # (day, slot) cells
+ROOM_BLOCKS = len(LAB_DAYS) * len(LAB_SLOT_MAPPING)   # (day, 3h block) cells, for block-aligned classes
+
+# Building Preference Configuration: departments whose classes stay in one building when it has rooms of the type
+SAC_DEPTS = {'CSE', 'EEE', 'ETE', 'ECE', 'MAT', 'PHY', 'CHE', 'BIO', 'ENV', 'PHR', 'CE', 'ARCH', 'CIT'}
+NAC_DEPTS = {'BBA', 'ECO', 'ENG', 'BEN', 'HIS', 'PHI', 'SOC', 'LAW', 'POL', 'MGT', 'MKT', 'FIN', 'INB', 'MIS', 'HRM', 'BUS'}
+
+RoomPools = Dict[Tuple[str, Optional[str]], list]   # (class type, building) -> rooms
+
+@dataclass
+class Bottleneck:
+    """
+    One supply/demand check that fails. Fatal ones leave sections unscheduled whatever the solver
+    does; the others only force sections to TBA or leave teacher quota unused.
+    """
+    kind: str      # rooms, blocks, teacher_quota, adjunct_days, adjunct_patterns
+    scope: str     # what was checked, e.g. "LAB/SAC" or "CSE" or a teacher initial
+    demand: int
+    supply: int
+    fatal: bool
+    detail: str
+
+@dataclass
+class CapacityReport:
+    bottlenecks: List[Bottleneck] = field(default_factory=list)
+    supply: Dict[str, int] = field(default_factory=dict)   # room cells per pool
+    demand: Dict[str, int] = field(default_factory=dict)   # section cells per pool
+
+    @property
+    def fatal(self) -> List[Bottleneck]:
+        return [b for b in self.bottlenecks if b.fatal]
+
+    @property
+    def warnings(self) -> List[Bottleneck]:
+        return [b for b in self.bottlenecks if not b.fatal]
+
+    @property
+    def feasible(self) -> bool:
+        return not self.fatal
+
+    def summary(self) -> str:
+        if self.feasible:
+            return f"Capacity check passed with {len(self.warnings)} warnings"
+        return "Schedule is infeasible: " + "; ".join(b.detail for b in self.fatal)
+
+    def to_dict(self) -> Dict:
+        return {
+            "feasible": self.feasible,
+            "bottlenecks": [asdict(b) for b in self.bottlenecks],
+            "supply": self.supply,
+            "demand": self.demand,
+        }
+
+class ScheduleInfeasibleError(Exception):
+    """
+    Raised before a run touches the schedule when the capacity check finds fatal bottlenecks.
+    """
+    def __init__(self, report: CapacityReport):
+        # The report is the only argument, so the error pickles across worker processes
+        super().__init__(report)
+        self.report = report
+
+    def __str__(self):
+        return self.report.summary()
+
+def normalize_type(type_str) -> str:
+    s = str(type_str).strip().upper()
+    if 'LAB' in s: return 'LAB'
+    return 'THEORY'
+
+def dept_of(code: str) -> str:
+    match = re.match(r"([A-Za-z]+)", code)
+    return match.group(1).upper() if match else "GEN"
+
+def dept_building(dept: str) -> Optional[str]:
+    if dept in SAC_DEPTS: return 'SAC'
+    if dept in NAC_DEPTS: return 'NAC'
+    return None
+
+def build_room_pools(rooms: Sequence) -> RoomPools:
+    """
+    Room pool per (class type, building): the rooms a section of that type and department
+    building may use, for both schedulers. Building None is the whole type; an empty building
+    falls back to the type, an empty type to all rooms. Rooms need id, type and room_number.
+    """
+    by_type = defaultdict(list)
+    for r in rooms:
+        by_type[normalize_type(r.type)].append(r)
+
+    pools = {}
+    for target_type in ('THEORY', 'LAB'):
+        valid_rooms = by_type.get(target_type, [])
+        for building in ('SAC', 'NAC', None):
+            pool = valid_rooms
+            if building:
+                in_building = [r for r in valid_rooms if r.room_number.upper().startswith(building)]
+                if in_building: pool = in_building
+            pools[(target_type, building)] = pool or list(rooms)
+    return pools
+
+def section_pool(code: str, course_type) -> Tuple[str, Optional[str]]:
+    # The room_pools key a section of this course places into
+    return (normalize_type(course_type), dept_building(dept_of(code)))
+
+@dataclass
+class SectionNeed:
+    """
+    Room time one section needs per week.
+    """
+    pool: FrozenSet[int]   # room ids it may use
+    cells: int             # (day, slot) cells it occupies
+    blocks: int = 0        # (day, block) cells, when it must start on a block boundary
+
+def room_bottlenecks(needs: Iterable[SectionNeed], pool_names: Dict[FrozenSet[int], str]) -> Tuple[List[Bottleneck], Dict[str, int], Dict[str, int]]:
+    """
+    Hall's condition on the section/room-time bipartite graph, restricted to the room pools:
+    the sections that can only use rooms of pool P must fit into P's cells and blocks.
+    Pools are nested or disjoint, so checking every pool (with all pools inside it) suffices.
+    Returns (bottlenecks, supply per pool, demand per pool).
+    """
+    cells = defaultdict(int)
+    blocks = defaultdict(int)
+    counts = defaultdict(int)
+    max_cells = defaultdict(int)
+    for need in needs:
+        cells[need.pool] += need.cells
+        blocks[need.pool] += need.blocks
+        counts[need.pool] += 1
+        max_cells[need.pool] = max(max_cells[need.pool], need.cells)
+
+    bottlenecks, supply, demand = [], {}, {}
+    pools = list(cells)
+    for pool in sorted(pools, key=len):
+        name = pool_names.get(pool, f"{len(pool)} rooms")
+        inner = [p for p in pools if p <= pool]
+        need_cells = sum(cells[p] for p in inner)
+        need_blocks = sum(blocks[p] for p in inner)
+        sections = sum(counts[p] for p in inner)
+        have_cells = len(pool) * ROOM_CELLS
+        have_blocks = len(pool) * ROOM_BLOCKS
+        supply[name] = have_cells
+        demand[name] = need_cells
+
+        if not pool:
+            bottlenecks.append(Bottleneck("rooms", name, need_cells, 0, True,
+                                          f"{sections} sections need {name} rooms and there are none"))
+        elif need_cells > have_cells:
+            widest = max(max_cells[p] for p in inner)
+            bottlenecks.append(Bottleneck("rooms", name, need_cells, have_cells, True,
+                                          f"{name}: {sections} sections need {need_cells} room-slots, {len(pool)} rooms offer {have_cells}; "
+                                          f"at least {math.ceil((need_cells - have_cells) / widest)} sections cannot be placed"))
+        elif need_blocks > have_blocks:
+            bottlenecks.append(Bottleneck("blocks", name, need_blocks, have_blocks, True,
+                                          f"{name}: extended classes need {need_blocks} day-blocks, {len(pool)} rooms offer {have_blocks}"))
+    return bottlenecks, supply, demand
+
+def section_size(course_type, duration_mode) -> Tuple[int, int]:
+    """
+    (cells, blocks) a section needs at least: one day for a lab, both days of a pattern for theory;
+    an extended class takes two slots starting on a block boundary.
+    """
+    days = 1 if normalize_type(course_type) == 'LAB' else 2
+    if duration_mode == DurationMode.EXTENDED:
+        return days * 2, days
+    return days, 0
+
+def room_capacity(
+    room_pools: RoomPools,
+    sections: Iterable[Tuple[str, str, str]],
+    size: Callable[[str, str], Tuple[int, int]] = section_size,
+) -> Tuple[List[Bottleneck], Dict[str, int], Dict[str, int]]:
+    """
+    The room check both schedulers run before touching the schedule, so one dataset is
+    accepted or rejected by both. `sections` are (course code, course type, duration mode);
+    each goes to its build_room_pools pool with section_size's room time.
+    Returns (bottlenecks, supply per pool, demand per pool), as room_bottlenecks.
+    """
+    pool_sets = {key: frozenset(r.id for r in rooms) for key, rooms in room_pools.items()}
+    pool_names = {}
+    # Type-wide pools name a set before building pools that fell back to it
+    for (room_type, building), rooms in sorted(pool_sets.items(), key=lambda kv: kv[0][1] is not None):
+        pool_names.setdefault(rooms, f"{room_type}/{building}" if building else room_type)
+
+    needs = []
+    for code, course_type, duration_mode in sections:
+        cells, blocks = size(course_type, duration_mode)
+        needs.append(SectionNeed(pool=pool_sets[section_pool(code, course_type)], cells=cells, blocks=blocks))
+    return room_bottlenecks(needs, pool_names)
+
+def quota_bottlenecks(groups_by_dept: Dict[str, int], capacity_by_dept: Dict[str, int]) -> List[Bottleneck]:
+    """
+    Groups (a section and its lab/theory sibling) per department against an upper bound on
+    how many of them teachers can take; the difference is a lower bound on TBA groups.
+    """
+    bottlenecks = []
+    for dept, groups in sorted(groups_by_dept.items()):
+        capacity = capacity_by_dept.get(dept, 0)
+        if groups > capacity:
+            bottlenecks.append(Bottleneck("teacher_quota", dept, groups, capacity, False,
+                                          f"{dept}: {groups} section groups, teachers can take at most {capacity}; "
+                                          f"at least {groups - capacity} go to TBA"))
+    return bottlenecks
+
+@dataclass
+class AdjunctNeed:
+    """
+    Quota of one adjunct, in room-time units, and the days they accept.
+    """
+    initial: str
+    days: FrozenSet[str]
+    theory_units: int = 0   # (pattern, slot) units of the theory sections they asked for
+    lab_units: int = 0      # (day, slot) units of the lab sections
+
+def adjunct_bottlenecks(adjuncts: Iterable[AdjunctNeed], theory_rooms: int, lab_rooms: int) -> List[Bottleneck]:
+    """
+    Day constraints of adjuncts, who are only placed on their preferred days:
+    - per adjunct: their quota must fit into their own week (one class per slot)
+    - Hall bound: the adjuncts confined to a set S of patterns (days) must fit into the
+      theory (lab) rooms on S, over every S (3 patterns, 6 lab days: at most 63 sets)
+    """
+    bottlenecks = []
+    theory_by_patterns = defaultdict(int)
+    lab_by_days = defaultdict(int)
+    slots = len(TIME_SLOTS)
+
+    for a in adjuncts:
+        patterns = frozenset(p for p, days in THEORY_DAYS.items() if all(d in a.days for d in days))
+        if not a.days and (a.theory_units or a.lab_units):
+            bottlenecks.append(Bottleneck("adjunct_days", a.initial, a.theory_units + a.lab_units, 0, False,
+                                          f"Adjunct {a.initial} has no preferred days and gets no sections"))
+            continue
+        if a.theory_units and not patterns:
+            bottlenecks.append(Bottleneck("adjunct_days", a.initial, a.theory_units, 0, False,
+                                          f"Adjunct {a.initial} asked for theory sections but no day pattern (ST/MW/RA) is fully preferred"))
+        # A theory unit takes a slot on both days of its pattern
+        need = (2 * a.theory_units if patterns else 0) + a.lab_units
+        have = slots * len(a.days)
+        if need > have:
+            bottlenecks.append(Bottleneck("adjunct_days", a.initial, need, have, False,
+                                          f"Adjunct {a.initial}: quota needs {need} slots on {len(a.days)} preferred days, which hold {have}"))
+        if patterns and a.theory_units:
+            theory_by_patterns[patterns] += a.theory_units
+        if a.lab_units:
+            lab_by_days[frozenset(a.days)] += a.lab_units
+
+    for names, by_set, per_member, rooms in (
+        (list(THEORY_DAYS), theory_by_patterns, slots, theory_rooms),
+        (LAB_DAYS, lab_by_days, slots, lab_rooms),
+    ):
+        failing = []
+        for size in range(1, len(names) + 1):
+            for subset in combinations(names, size):
+                s = frozenset(subset)
+                if any(f <= s for f in failing):
+                    continue  # Report the smallest failing sets only
+                need = sum(units for members, units in by_set.items() if members <= s)
+                have = rooms * per_member * size
+                if need > have:
+                    failing.append(s)
+                    bottlenecks.append(Bottleneck("adjunct_patterns", "/".join(subset), need, have, False,
+                                                  f"Adjuncts limited to {'/'.join(subset)} need {need} room-slots there, rooms offer {have}"))
+    return bottlenecks
@@ -1,31 +1,61 @@
 from __future__ import annotations
 import logging
+import math
 import random
 import re
+import time
 from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Set
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Set
 
-from sqlalchemy.orm import Session
+from ortools.sat.python import cp_model
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_
 
-from core.constants import LAB_DAYS, THEORY_DAYS, TIME_SLOTS
+from core.constants import LAB_DAYS, THEORY_DAYS
+from core.time_slots import days_of
 from models.academic import ClassType, DurationMode, Room
 from models.schedule import ClassSchedule, Section
-from models.teacher import Teacher, TeacherPreference, TeacherTimingPreference
+from models.teacher import Teacher, TeacherPreference
+from services.capacity_check import (
+    AdjunctNeed, CapacityReport, ScheduleInfeasibleError,
+    adjunct_bottlenecks, build_room_pools, dept_building, dept_of, normalize_type, quota_bottlenecks, room_capacity,
+)
 from services.scheduler import ensure_tba_teacher
+from services.schedule_versions import compare_placements
+from services.schedule_writer import insert_class_schedules, update_section_teachers
+from services.schedule_view import refresh_schedule_view
+from services.occupancy import ScheduleOccupancy, slot_mask, week_mask
+from services.run_profile import RunProfile
+from services.timing_preferences import load_timing_masks
 
 logger = logging.getLogger("scheduler")
 logging.basicConfig(level=logging.INFO)
 
 # --- CONFIGURATION ---
-SCORE_PERFECT_MATCH = 100.0       
-SCORE_DAY_MATCH = 75.0            
+SCORE_PERFECT_MATCH = 100.0
+SCORE_DAY_MATCH = 75.0
 SCORE_RESCUE_MATCH = 60.0         # Score for assigning a teacher with 0 load (High Priority)
-SCORE_DEPT_FALLBACK = 40.0        
+SCORE_DEPT_FALLBACK = 40.0
 PENALTY_TBA = -100000.0           # Massive penalty
 DEFAULT_MAX_SECTIONS = 4          # Reasonable limit for fallback assignments
 
+# --- CP-SAT MODEL CONFIGURATION ---
+PENALTY_UNSCHEDULED = 2 * PENALTY_TBA   # Leaving a section without a slot is worse than TBA
+BONUS_FIRST_SECTION = 20.0              # Rescue bonus: first section for a teacher with no load
+FLOOR_MATCH_BONUS = 5.0
+QUALITY_SCALE = 12                      # Integer scale for per-teacher weights (1/target_load)
+MAX_FALLBACK_TEACHERS = 4               # Department fallback candidates per group in the CP-SAT model
+
+# --- LOCAL SEARCH CONFIGURATION ---
+LOCAL_SEARCH_SHARE = 0.25               # Share of the time budget kept for local search when enabled
+LS_START_TEMPERATURE = 2.0              # Simulated annealing temperature, in teacher score points
+LS_END_TEMPERATURE = 0.05
+LS_STALL_ITERATIONS = 50000             # Stop early when the best plan has not improved for this many moves
+LS_MOVE_WEIGHTS = (("move", 5), ("swap", 3), ("reassign", 2))
+WARM_START_BONUS = 5.0                  # Objective points per section kept at its warm-start time (and again for its teacher)
+COMBINE_NODE_LIMIT = 20000              # Search nodes per group and teacher; past it the best tuple found so far is used
+
 @dataclass
 class Quality:
     mean_score: float = 0.0
@@ -42,16 +72,82 @@ class RunResult:
     assigned_non_tba: int
     assigned_tba: int
     unscheduled: int
+    solver_status: str = "GREEDY"
+    timings: Dict[str, float] = field(default_factory=dict)   # phase -> wall seconds
+    counters: Dict[str, int] = field(default_factory=dict)    # event -> count
+    bottlenecks: List[Dict] = field(default_factory=list)     # non-fatal capacity warnings
+    churn: Dict[str, int] = field(default_factory=dict)       # changes against the warm start, if any
+
+@dataclass
+class _RunContext:
+    """
+    Everything the greedy pass and the CP-SAT model need, prepared once per run.
+    """
+    tba_id: int
+    rooms: List[Room]
+    sections: List[Section]
+    teacher_info: Dict[int, Dict]
+    quota_limits: Dict[Tuple[int, str], int]
+    course_applicants: Dict[str, Set[int]]
+    dept_teachers: Dict[str, List[int]]
+    grouped_sections: Dict[Tuple[str, int], List[Section]]
+    sorted_keys: List[Tuple[str, int]]
+    room_pools: Dict[Tuple[str, Optional[str]], List[Room]]   # (class type, building) -> rooms
+    room_floor: Dict[int, int]                                # room id -> floor
+    section_types: Dict[int, str]                             # section id -> 'THEORY' / 'LAB'
+    pool_masks: Dict[Tuple[str, Optional[str], Optional[int]], Tuple[int, int]] = field(default_factory=dict)
+    warm_plans: Dict[Tuple[str, int], Dict] = field(default_factory=dict)   # previous plan per group, warm start only
+
+    def new_occupancy(self) -> ScheduleOccupancy:
+        # Room bits follow the order of self.rooms, which the pool masks rely on
+        return ScheduleOccupancy([r.id for r in self.rooms], self.teacher_info.keys())
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Reports every improving CP-SAT solution to the scheduler's progress hook.
+    """
+    def __init__(self, report: Callable[..., None]):
+        super().__init__()
+        self.report = report
+        self.solutions = 0
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        self.report("solving", solutions=self.solutions, objective=self.ObjectiveValue(), wall_time=round(self.WallTime(), 1))
+
+@dataclass
+class _GreedyState:
+    """
+    Occupancy and usage counters of the greedy pass; a repair seeds them with the kept placements.
+    """
+    occupancy: ScheduleOccupancy
+    quota_usage: Dict[Tuple[int, str], int] = field(default_factory=lambda: defaultdict(int))
+    global_usage: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    pattern_usage: Dict[str, int] = field(default_factory=lambda: defaultdict(int)) # Track usage of ST, MW, RA to balance them
 
 class CpSatAutoScheduler:
-    def __init__(self, time_limit_seconds: float = 60.0, seed: int = 1):
+    def __init__(self, time_limit_seconds: float = 60.0, seed: int = 1, num_workers: int = 8,
+                 progress: Optional[Callable[..., None]] = None, local_search: bool = False,
+                 warm_start: Optional[Dict[int, Dict]] = None):
+        self.time_limit_seconds = time_limit_seconds
+        self.num_workers = num_workers
         self.seed = seed
+        # Improve the final plans by local search in the last LOCAL_SEARCH_SHARE of the budget
+        self.local_search = local_search
+        # Previous placements per section id (schedule_versions.load_placements): kept while still
+        # feasible, preferred by the model, and compared against for the churn report
+        self.warm_start = warm_start
         self.rng = random.Random(seed)
+        # Optional progress(phase, **counters) hook, e.g. for the async job runner
+        self.progress = progress
+        self.profile = RunProfile()
+
+    def _report(self, phase: str, **counters):
+        if self.progress is not None:
+            self.progress(phase, **counters)
 
     def _normalize_type(self, type_str: str) -> str:
-        s = str(type_str).strip().upper()
-        if 'LAB' in s: return 'LAB'
-        return 'THEORY'
+        return normalize_type(type_str)
 
     def _get_room_floor(self, room_number: str) -> int:
         match = re.search(r'\d', room_number)
@@ -62,31 +158,204 @@ class CpSatAutoScheduler:
         return mapping.get(str(department).upper(), 0)
 
     def _extract_dept_from_code(self, code: str) -> str:
-        match = re.match(r"([A-Za-z]+)", code)
-        return match.group(1).upper() if match else "GEN"
+        return dept_of(code)
+
+    def _base_code(self, code: str) -> str:
+        base_code = code.upper().strip()
+        if base_code.endswith('L'): base_code = base_code[:-1]
+        return base_code
+
+    def _time_options(self, sec: Section) -> List[Tuple[str, List[str], int, List[int]]]:
+        """
+        All (pattern, days, start slot, occupied slots) combinations a section may use.
+        """
+        target_type = self._normalize_type(sec.course.type)
+        is_extended = sec.course.duration_mode == DurationMode.EXTENDED
+        patterns = list(LAB_DAYS) if target_type == 'LAB' else list(THEORY_DAYS.keys())
+        # Extended (3h) classes must start at 1, 3, or 5 to match standard blocks (8-11, 11-2, 2-5)
+        valid_start_slots = [1, 3, 5] if is_extended else range(1, 8)
+
+        options = []
+        for pattern in patterns:
+            actual_days = days_of(pattern)
+            for slot in valid_start_slots:
+                req_slots = [slot, slot + 1] if is_extended else [slot]
+                options.append((pattern, actual_days, slot, req_slots))
+        return options
+
+    def _dept_building(self, group_dept: str) -> Optional[str]:
+        return dept_building(group_dept)
+
+    def _build_room_pools(self, rooms: List[Room]) -> Dict[Tuple[str, Optional[str]], List[Room]]:
+        # Room pool per (class type, building), built once per run; the rules are shared with
+        # AutoScheduler in services.capacity_check
+        return build_room_pools(rooms)
+
+    def _pool_masks(self, ctx: _RunContext, target_type: str, building: Optional[str], dept_floor: Optional[int]) -> Tuple[int, int]:
+        """
+        Room bitmasks of a pool: (rooms on the department's floor, the rest). Memoised per run.
+        """
+        key = (target_type, building, dept_floor)
+        masks = ctx.pool_masks.get(key)
+        if masks is None:
+            preferred = rest = 0
+            index = {r.id: i for i, r in enumerate(ctx.rooms)}
+            for r in ctx.room_pools[(target_type, building)]:
+                if dept_floor is not None and ctx.room_floor[r.id] == dept_floor:
+                    preferred |= 1 << index[r.id]
+                else:
+                    rest |= 1 << index[r.id]
+            masks = (preferred, rest)
+            ctx.pool_masks[key] = masks
+        return masks
+
+    def _pick_room(self, ctx: _RunContext, free: int, preferred: int) -> Tuple[Room, bool]:
+        """
+        First free room (load order), floor-matching rooms first. Returns (room, floor matched).
+        """
+        pick = free & preferred or free
+        return ctx.rooms[(pick & -pick).bit_length() - 1], bool(pick & preferred)
+
+    def _option_score(self, t_data: Dict, days: List[str], req_slots: List[int]) -> float:
+        """
+        Strict compliance score of one placement against the teacher's timing preferences.
+        """
+        match_d = t_data['timing'].prefers_days(days)
+        match_s = t_data['timing'].covers(days, slot_mask(req_slots))
+
+        score = 100.0
+        if not match_d:
+            score -= 25.0 # Day Mismatch (Permanent only, Adjuncts filtered above)
+        if not match_s:
+            score -= 10.0 # Slot Mismatch
+        return score
 
     def run(self, db: Session, rebuild: bool = True) -> RunResult:
         logger.info("--- Starting Zero-Load Rescue Scheduler ---")
+        started = time.monotonic()
+        self.profile = RunProfile()
+        self.profile.watch_queries(db)
+        try:
+            self._report("loading")
+            tba = ensure_tba_teacher(db)
+            ctx = self._prepare(db, tba)
+
+            # Fail fast, before the current schedule is deleted, when demand exceeds supply
+            capacity = self._capacity_report(ctx)
+            self.profile.lap("capacity_check")
+            if not capacity.feasible:
+                logger.warning(capacity.summary())
+                raise ScheduleInfeasibleError(capacity)
+
+            if rebuild:
+                # Flushed, not committed: a commit here would expire every section, course,
+                # room and teacher _prepare loaded and reload them one by one. _commit commits.
+                db.query(ClassSchedule).delete(synchronize_session=False)
+                refresh_schedule_view(db)
+                db.flush()
 
+            keys = None
+            if self.warm_start:
+                ctx.warm_plans = self._warm_plans(ctx)
+                # Groups with a previous placement go first, so nothing else takes their cells
+                keys = [k for k in ctx.sorted_keys if k in ctx.warm_plans] + [k for k in ctx.sorted_keys if k not in ctx.warm_plans]
+            greedy_plans = self._greedy(ctx, keys=keys)
+            self.profile.lap("greedy")
+
+            plans = greedy_plans
+            status = "GREEDY"
+            deadline = started + self.time_limit_seconds
+            solve_deadline = deadline - (LOCAL_SEARCH_SHARE * self.time_limit_seconds if self.local_search else 0.0)
+            if solve_deadline - time.monotonic() > 1.0:
+                solved, status = self._solve(ctx, greedy_plans, solve_deadline)
+                if solved is not None:
+                    plans = solved
+
+            if self.local_search and deadline > time.monotonic():
+                self._report("improving")
+                plans, improved = self._local_search(ctx, plans, deadline)
+                if improved:
+                    status += "+LS"
+
+            self._report("writing")
+            result = self._commit(db, ctx, plans, status)
+            result.bottlenecks = [asdict(b) for b in capacity.warnings]
+            if self.warm_start is not None:
+                result.churn = self._churn(ctx, plans)
+            return result
+        finally:
+            self.profile.unwatch_queries()
+
+    def repair(self, db: Session, teacher_ids: Iterable[int] = (), room_ids: Iterable[int] = ()) -> RunResult:
+        """
+        Incremental repair after teachers withdraw or rooms go offline.
+
+        Only the groups (a section and its lab/theory sibling) that lost their teacher or
+        room, or were never placed, are freed and re-placed by the greedy pass against the
+        occupancy of all other placements. Those stay untouched; there is no CP-SAT solve.
+        """
+        logger.info("--- Repairing schedule ---")
+        withdrawn = set(teacher_ids)
+        offline = set(room_ids)
+        self.profile = RunProfile()
+        self.profile.watch_queries(db)
+        try:
+            return self._repair(db, withdrawn, offline)
+        finally:
+            self.profile.unwatch_queries()
+
+    def _repair(self, db: Session, withdrawn: Set[int], offline: Set[int]) -> RunResult:
         tba = ensure_tba_teacher(db)
-        if rebuild:
-            db.query(ClassSchedule).delete(synchronize_session=False)
-            db.commit()
-
-        teachers = db.query(Teacher).all()
-        rooms = db.query(Room).all()
-        sections = db.query(Section).all()
-        
-        # --- 1. DATA PREP ---
+        ctx = self._prepare(db, tba, excluded_teacher_ids=withdrawn, excluded_room_ids=offline)
+        stored = self._stored_assigns(db, ctx)
+
+        state = _GreedyState(occupancy=ctx.new_occupancy())
+        affected_keys = []
+        kept = []
+        for key in ctx.sorted_keys:
+            group = ctx.grouped_sections[key]
+            if any(sec.id not in stored or stored[sec.id]['room'] is None or sec.teacher_id in withdrawn for sec in group):
+                affected_keys.append(key)
+                continue
+            by_teacher = defaultdict(list)
+            for sec in group:
+                tid = sec.teacher_id or ctx.tba_id
+                by_teacher[tid].append(stored[sec.id])
+                kept.append((sec, tid, stored[sec.id]))
+            for tid, assigns in by_teacher.items():
+                self._reserve(ctx, state, key[0], tid, assigns)
+
+        affected_ids = [sec.id for key in affected_keys for sec in ctx.grouped_sections[key]]
+        logger.info(f"Repair: {len(affected_ids)} sections in {len(affected_keys)} groups to re-place")
+        if affected_ids:
+            db.query(ClassSchedule).filter(ClassSchedule.section_id.in_(affected_ids)).delete(synchronize_session=False)
+            update_section_teachers(db, {section_id: None for section_id in affected_ids})
+        self.profile.lap("repair_scan")
+
+        plans = self._greedy(ctx, keys=affected_keys, state=state)
+        self.profile.lap("greedy")
+        return self._commit(db, ctx, plans, "REPAIR", keys=affected_keys, kept=kept)
+
+    # --- 1. DATA PREP ---
+    def _prepare(self, db: Session, tba: Teacher, excluded_teacher_ids: Set[int] = frozenset(), excluded_room_ids: Set[int] = frozenset()) -> _RunContext:
+        """
+        Loads the inputs. Excluded teachers and rooms (withdrawn / offline) are left out entirely.
+        """
+        teachers = [t for t in db.query(Teacher).all() if t.id not in excluded_teacher_ids]
+        rooms = [r for r in db.query(Room).all() if r.id not in excluded_room_ids]
+        sections = db.query(Section).options(joinedload(Section.course)).all()
+
         quota_limits = defaultdict(int)
-        course_applicants = defaultdict(set) 
+        course_applicants = defaultdict(set)
         dept_teachers = defaultdict(list)
 
+        timing_masks = load_timing_masks(db)
+
         teacher_info = {}
         for t in teachers:
             is_adjunct = (t.faculty_type or "").strip().lower() == "adjunct"
             dept = (t.department or "").strip().upper()
-            
+
             # Map Dept for fallback (Permanent only)
             if not is_adjunct and t.id != tba.id:
                 # Handle variations like "Electrical Engineering" -> "EEE" if needed
@@ -96,88 +365,198 @@ class CpSatAutoScheduler:
                 if dept in ['GEN', 'GENERAL']:
                     dept_teachers['GED'].append(t.id)
 
-            timings = db.query(TeacherTimingPreference).filter_by(teacher_id=t.id).all()
-            pref_days = set()
-            pref_slots = set()
-            for tp in timings:
-                days = THEORY_DAYS.get(tp.day, [tp.day])
-                for d in days:
-                    pref_days.add(d)
-                    for s_id, s_range in TIME_SLOTS.items():
-                        if tp.start_time in s_range:
-                            pref_slots.add((d, s_id))
-            
+            timing = timing_masks[t.id]
+
             teacher_info[t.id] = {
                 'obj': t,
+                # Copied: the scores are read after the commit, which expires `obj`
+                'initial': t.initial,
+                'name': t.name,
                 'is_adjunct': is_adjunct,
                 'dept': dept,
-                'pref_days': pref_days,
-                'pref_slots': pref_slots,
+                'pref_days': timing.days,
+                'timing': timing,
+                'floor': self._get_dept_floor(dept),
                 'assigned_count': 0,
-                'total_score': 0
+                'total_score': 0,
+                'target_load': 0
             }
 
-        all_prefs = db.query(TeacherPreference).filter(
+        all_prefs = db.query(TeacherPreference).options(joinedload(TeacherPreference.course)).filter(
             or_(TeacherPreference.status == 'accepted', TeacherPreference.status == 'pending')
         ).all()
-        
+
         for p in all_prefs:
-            base_code = p.course.code.upper().strip()
-            if base_code.endswith('L'): base_code = base_code[:-1]
+            if p.teacher_id in excluded_teacher_ids: continue
+            base_code = self._base_code(p.course.code)
             limit = int(p.section_count or 0)
             if limit == 0: limit = DEFAULT_MAX_SECTIONS
             quota_limits[(p.teacher_id, base_code)] = max(quota_limits[(p.teacher_id, base_code)], limit)
             course_applicants[base_code].add(p.teacher_id)
 
-        quota_usage = defaultdict(int)     
-        global_usage = defaultdict(int)    
-        occupied_slots = set()             
-        pattern_usage = defaultdict(int) # Track usage of ST, MW, RA to balance them
+        # Target Load (Total sections they requested/were willing to take)
+        # If they didn't apply for anything specific, assume default max (fallback)
+        for (t_id, c_code), limit in quota_limits.items():
+            if t_id in teacher_info:
+                teacher_info[t_id]['target_load'] += limit
+        for info in teacher_info.values():
+            if info['target_load'] == 0: info['target_load'] = DEFAULT_MAX_SECTIONS
+
+        self.profile.lap("load")
 
         # --- 2. GROUPING ---
         grouped_sections = defaultdict(list)
         for s in sections:
-            base_code = s.course.code.upper().strip()
-            if base_code.endswith('L'): base_code = base_code[:-1]
-            grouped_sections[(base_code, s.section_number)].append(s)
+            grouped_sections[(self._base_code(s.course.code), s.section_number)].append(s)
 
         # Sort: Hardest First
         def group_priority(group):
             score = 0
-            base_code = group[0].course.code.upper().strip()
-            if base_code.endswith('L'): base_code = base_code[:-1]
-            
+            base_code = self._base_code(group[0].course.code)
+
             for s in group:
                 if self._normalize_type(s.course.type) == 'LAB': score += 1000
                 if s.course.duration_mode == DurationMode.EXTENDED: score += 500
-            
+
             # Boost priority if requested by Adjuncts (who have harder constraints)
             applicants = course_applicants.get(base_code, set())
             for tid in applicants:
                 if tid in teacher_info and teacher_info[tid]['is_adjunct']:
                     score += 200
-            
+
             return score
-        
+
         sorted_keys = sorted(grouped_sections.keys(), key=lambda k: group_priority(grouped_sections[k]), reverse=True)
 
-        total_scheduled = 0
-        assigned_non_tba = 0
-        assigned_tba = 0
-        
-        # --- 3. SCHEDULING LOOP ---
-        for key in sorted_keys:
-            group = grouped_sections[key]
+        ctx = _RunContext(
+            tba_id=tba.id,
+            rooms=rooms,
+            sections=sections,
+            teacher_info=teacher_info,
+            quota_limits=quota_limits,
+            course_applicants=course_applicants,
+            dept_teachers=dept_teachers,
+            grouped_sections=grouped_sections,
+            sorted_keys=sorted_keys,
+            room_pools=self._build_room_pools(rooms),
+            room_floor={r.id: self._get_room_floor(r.room_number) for r in rooms},
+            section_types={s.id: self._normalize_type(s.course.type) for s in sections},
+        )
+        self.profile.lap("grouping")
+        return ctx
+
+    # --- 2b. CAPACITY CHECK ---
+    def capacity_report(self, db: Session) -> CapacityReport:
+        """
+        The supply/demand analysis run() starts with, on the current inputs. Writes nothing
+        (except the TBA teacher, if missing).
+        """
+        self.profile = RunProfile()
+        tba = ensure_tba_teacher(db)
+        return self._capacity_report(self._prepare(db, tba))
+
+    def _capacity_report(self, ctx: _RunContext) -> CapacityReport:
+        """
+        Necessary conditions for a complete schedule, in one pass over the groups:
+        - rooms: section time per room pool (type, building) against the pool's room time
+        - teacher quota: groups per department against applicant quotas plus fallback capacity
+        - adjuncts: their quota against their preferred days, and Hall bounds per day set
+        """
+        tba_id = ctx.tba_id
+        teacher_info = ctx.teacher_info
+
+        sections = []   # (code, type, duration mode) for the shared room check
+        groups_by_dept = defaultdict(int)
+        groups_by_base = defaultdict(int)
+        base_dept = {}
+        group_units = {}   # base code -> (theory units, lab units) of one group
+        for key, group in ctx.grouped_sections.items():
+            dept = self._extract_dept_from_code(key[0])
+            groups_by_dept[dept] += 1
+            groups_by_base[key[0]] += 1
+            base_dept[key[0]] = dept
+            theory_units = lab_units = 0
+            for sec in group:
+                target_type = ctx.section_types[sec.id]
+                extended = sec.course.duration_mode == DurationMode.EXTENDED
+                length = 2 if extended else 1
+                sections.append((sec.course.code, target_type, sec.course.duration_mode))
+                if target_type == 'LAB':
+                    lab_units += length
+                else:
+                    theory_units += length
+            group_units.setdefault(key[0], (theory_units, lab_units))
+
+        bottlenecks, supply, demand = room_capacity(ctx.room_pools, sections)
+
+        # Upper bound on groups with a teacher: applicants up to their quota, then department fallback
+        def usable(tid):
+            return tid != tba_id and tid in teacher_info and not (teacher_info[tid]['is_adjunct'] and not teacher_info[tid]['pref_days'])
+
+        capacity_by_dept = defaultdict(int)
+        for base_code, groups in groups_by_base.items():
+            quota = sum(ctx.quota_limits[(tid, base_code)] for tid in ctx.course_applicants.get(base_code, ()) if usable(tid))
+            capacity_by_dept[base_dept[base_code]] += min(groups, quota)
+        for dept in groups_by_dept:
+            capacity_by_dept[dept] += len(ctx.dept_teachers.get(dept, [])) * DEFAULT_MAX_SECTIONS
+        bottlenecks += quota_bottlenecks(groups_by_dept, capacity_by_dept)
+
+        adjuncts = {}
+        for (tid, base_code), limit in ctx.quota_limits.items():
+            info = teacher_info.get(tid)
+            if info is None or tid == tba_id or not info['is_adjunct'] or base_code not in group_units:
+                continue
+            need = adjuncts.setdefault(tid, AdjunctNeed(initial=info['obj'].initial, days=frozenset(info['pref_days'])))
+            section_count = min(limit, groups_by_base[base_code])
+            need.theory_units += section_count * group_units[base_code][0]
+            need.lab_units += section_count * group_units[base_code][1]
+        bottlenecks += adjunct_bottlenecks(
+            adjuncts.values(),
+            theory_rooms=len(ctx.room_pools[('THEORY', None)]),
+            lab_rooms=len(ctx.room_pools[('LAB', None)]),
+        )
+
+        return CapacityReport(bottlenecks=bottlenecks, supply=supply, demand=demand)
+
+    # --- 3. GREEDY PASS ---
+    def _greedy(self, ctx: _RunContext, keys: Optional[List[Tuple[str, int]]] = None, state: Optional[_GreedyState] = None) -> Dict[Tuple[str, int], Dict]:
+        """
+        Single greedy pass over the groups (hardest first), or over `keys` against an existing state.
+        Returns the chosen plan per group; the plans also seed the CP-SAT model as a hint.
+        """
+        tba_id = ctx.tba_id
+        teacher_info = ctx.teacher_info
+        quota_limits = ctx.quota_limits
+
+        if state is None:
+            state = _GreedyState(occupancy=ctx.new_occupancy())
+        quota_usage = state.quota_usage
+        global_usage = state.global_usage
+        occupancy = state.occupancy
+        pattern_usage = state.pattern_usage
+        plans = {}
+
+        # Instrumentation, booked to the profile once at the end
+        clock = time.perf_counter
+        t_candidates = t_scoring = t_pairing = 0.0
+        candidates_evaluated = options_scored = rooms_probed = blocked_checks = combine_nodes = warm_kept = 0
+
+        keys = ctx.sorted_keys if keys is None else keys
+        for done, key in enumerate(keys):
+            self._report("greedy", groups_done=done, groups_total=len(keys))
+            t0 = clock()
+            group = ctx.grouped_sections[key]
             base_code = key[0]
             group_dept = self._extract_dept_from_code(base_code)
-            
+            building = self._dept_building(group_dept)
+
             # --- CANDIDATE GENERATION ---
             candidates = []
 
             # A. Preferred Candidates
-            pref_tids = course_applicants.get(base_code, [])
+            pref_tids = ctx.course_applicants.get(base_code, [])
             for tid in pref_tids:
-                if tid == tba.id: continue
+                if tid == tba_id: continue
                 # Strict check against their own requested limit
                 if quota_usage[(tid, base_code)] < quota_limits[(tid, base_code)]:
                      candidates.append({'tid': tid, 'type': 'PREF'})
@@ -185,17 +564,12 @@ class CpSatAutoScheduler:
             # B. Dept Fallback (Rescue & Fill)
             # Find ALL permanent teachers in this department
             # Logic: If course is CSE115, look in CSE dept.
-            dept_matches = dept_teachers.get(group_dept, [])
-            
-            # Special handling for Foundation courses (ENG, MAT, etc)
-            if not dept_matches and group_dept in ['MAT', 'ENG', 'PHY', 'CHE', 'BIO']:
-                 # Try to find teachers mapped to these specific departments
-                 pass 
+            dept_matches = ctx.dept_teachers.get(group_dept, [])
 
             for tid in dept_matches:
                 # Skip if already in preferred list
                 if tid in pref_tids: continue
-                
+
                 # Load Check: Don't overload fallback teachers
                 current_load = global_usage[tid]
                 if current_load < DEFAULT_MAX_SECTIONS:
@@ -204,41 +578,35 @@ class CpSatAutoScheduler:
                     candidates.append({'tid': tid, 'type': c_type})
 
             # C. TBA (Last Resort)
-            candidates.append({'tid': tba.id, 'type': 'TBA'})
+            candidates.append({'tid': tba_id, 'type': 'TBA'})
 
             # --- SORTING CANDIDATES (CRITICAL) ---
             # We shuffle first to randomize within tiers
             self.rng.shuffle(candidates)
-            
+
             # Sort Key:
-            # 1. TBA is last (False < True)
-            # 2. Priority Score (Rescue > Pref > Fallback)
+            # 1. TBA is last
+            # 2. Priority Score (Pref > Rescue > Fallback)
             #    Rescue (0 load) needs to be prioritized to fix "Unassigned" issue.
-            #    But we also want to honor preferences.
-            #    Let's mix: Pref is good, but Rescue is FAIR.
-            
+            # 3. Inside a rank, LOWER load first: key = (rank, -load), descending.
+            #    (3, 0) > (3, -5) -> Rank 3 Load 0 is better than Rank 3 Load 5.
             def candidate_rank(c):
                 if c['type'] == 'TBA': return -1
                 if c['type'] == 'PREF': return 3  # Highest priority: They asked for it
                 if c['type'] == 'RESCUE': return 2 # Next: They have no work, give them this!
                 return 1 # Fallback: They have work, but can take more
-            
-            # Additional tie-breaker: Current Load (Ascending)
-            # If two people are PREF, give to the one with less work.
-            
-            candidates.sort(key=lambda x: (
-                candidate_rank(x), 
-                -global_usage[x['tid']] # Negative because we want Ascending load, but sort is Reverse=True? No, let's keep simple logic.
-            ), reverse=True)
-            
-            # Wait, complex sort. Let's make it simpler.
-            # We want the list to start with the BEST candidate.
-            # Sort DESCENDING by rank.
-            # Inside rank, we want LOWER load.
-            # So key = (rank, -load). 
-            # (3, 0) > (3, -5) -> Rank 3 Load 0 is better than Rank 3 Load 5. Correct.
-            
+
             candidates.sort(key=lambda x: (candidate_rank(x), -global_usage.get(x['tid'], 0)), reverse=True)
+            t_candidates += clock() - t0
+
+            # --- WARM START: keep the previous placement while it is still feasible ---
+            if key in ctx.warm_plans:
+                kept_plan = self._keep_warm(ctx, occupancy, key, candidates)
+                if kept_plan is not None:
+                    warm_kept += 1
+                    plans[key] = kept_plan
+                    self._reserve(ctx, state, base_code, kept_plan['tid'], kept_plan['assigns'])
+                    continue
 
             # --- ATTEMPT SCHEDULE ---
             best_plan = None
@@ -249,95 +617,59 @@ class CpSatAutoScheduler:
                 ctype = cand['type']
                 t_data = teacher_info[tid]
 
-                # RELAXED CONSTRAINT:
-                # If it's a PREF candidate (they explicitly asked for this course), 
-                # we ignore the general 'pref_days' constraint.
-                # We only enforce it for Adjuncts who are NOT PREF (which shouldn't happen in this logic, but good for safety).
-                # UPDATE: Adjuncts MUST have their preferred days respected even if they requested the course.
-                if tid != tba.id and t_data['is_adjunct'] and not t_data['pref_days']:
-                    continue 
+                # Adjuncts MUST have their preferred days respected even if they requested the course.
+                if tid != tba_id and t_data['is_adjunct'] and not t_data['pref_days']:
+                    continue
 
+                t0 = clock()
+                candidates_evaluated += 1
                 group_options = []
                 possible = True
-
-                # Building Preference Configuration
-                SAC_DEPTS = {'CSE', 'EEE', 'ETE', 'ECE', 'MAT', 'PHY', 'CHE', 'BIO', 'ENV', 'PHR', 'CE', 'ARCH', 'CIT'}
-                NAC_DEPTS = {'BBA', 'ECO', 'ENG', 'BEN', 'HIS', 'PHI', 'SOC', 'LAW', 'POL', 'MGT', 'MKT', 'FIN', 'INB', 'MIS', 'HRM', 'BUS'}
+                dept_floor = t_data['floor'] if tid != tba_id else None
+                busy_tid = tid if tid != tba_id else None
 
                 for sec in group:
-                    # Room Filter
-                    target_type = self._normalize_type(sec.course.type)
-                    valid_rooms = [r for r in rooms if self._normalize_type(r.type) == target_type]
-                    
-                    # Apply Building Constraint based on Department
-                    if group_dept in SAC_DEPTS:
-                        sac_rooms = [r for r in valid_rooms if r.room_number.upper().startswith('SAC')]
-                        if sac_rooms: valid_rooms = sac_rooms
-                    elif group_dept in NAC_DEPTS:
-                        nac_rooms = [r for r in valid_rooms if r.room_number.upper().startswith('NAC')]
-                        if nac_rooms: valid_rooms = nac_rooms
-
-                    if not valid_rooms: valid_rooms = rooms 
+                    target_type = ctx.section_types[sec.id]
+                    preferred, rest = self._pool_masks(ctx, target_type, building, dept_floor)
+                    pool_size = bin(preferred | rest).count("1")
 
                     sec_opts = []
                     is_extended = sec.course.duration_mode == DurationMode.EXTENDED
-                    
+
                     # Pattern Selection (Balanced)
                     patterns = list(LAB_DAYS) if target_type == 'LAB' else list(THEORY_DAYS.keys())
                     # Sort patterns by usage count (ascending) to ensure equal distribution
                     patterns.sort(key=lambda p: (pattern_usage[p], self.rng.random()))
 
                     for pattern in patterns:
-                        actual_days = [pattern] if pattern in LAB_DAYS else THEORY_DAYS[pattern]
-                        
+                        actual_days = days_of(pattern)
+
                         # ADJUNCT CONSTRAINT: Must be on preferred days
-                        if tid != tba.id and t_data['is_adjunct']:
+                        if tid != tba_id and t_data['is_adjunct']:
                             if not all(d in t_data['pref_days'] for d in actual_days):
-                                continue 
-                        
+                                continue
+
                         # Determine valid start slots
                         # Extended (3h) labs must start at 1, 3, or 5 to match standard blocks (8-11, 11-2, 2-5)
                         # Standard (1.5h) labs can start at any slot 1-7
                         valid_start_slots = [1, 3, 5] if is_extended else range(1, 8)
 
                         for slot in valid_start_slots:
-                            if is_extended and slot == 7: continue # Redundant for [1,3,5] but safe
-
-
-                            # Availability
-                            blocked = False
+                            # Availability: teacher free and at least one pool room free
                             req_slots = [slot, slot+1] if is_extended else [slot]
-                            
-                            if tid != tba.id:
-                                for d in actual_days:
-                                    for s in req_slots:
-                                        if (tid, d, s) in occupied_slots:
-                                            blocked = True; break
-                                    if blocked: break
-                            if blocked: continue
+                            free = occupancy.free_rooms(preferred | rest, busy_tid, actual_days, slot_mask(req_slots))
+                            rooms_probed += pool_size
+                            if not free:
+                                blocked_checks += 1
+                                continue
 
                             # Scoring
                             score = 0
-                            if tid == tba.id: 
+                            if tid == tba_id:
                                 score = PENALTY_TBA
                             else:
-                                match_d = all(d in t_data['pref_days'] for d in actual_days)
-                                match_s = True
-                                for d in actual_days:
-                                    for s in req_slots:
-                                        if (d, s) not in t_data['pref_slots']:
-                                            match_s = False; break
-                                
-                                # Base Score
-                                score = 100.0
-                                
-                                # Penalties
-                                if not match_d:
-                                    score -= 25.0 # Day Mismatch (Permanent only, Adjuncts filtered above)
-                                
-                                if not match_s:
-                                    score -= 10.0 # Slot Mismatch
-                                
+                                score = self._option_score(t_data, actual_days, req_slots)
+
                                 # Candidate Type Adjustments
                                 if ctype == 'RESCUE':
                                     score -= 10.0 # Slight penalty for rescue to prefer PREF
@@ -345,68 +677,47 @@ class CpSatAutoScheduler:
                                     score -= 30.0 # Larger penalty for fallback
 
                             # Room
-                            for room in valid_rooms:
-                                r_blocked = False
-                                for d in actual_days:
-                                    for s in req_slots:
-                                        if (room.id, d, s) in occupied_slots:
-                                            r_blocked = True; break
-                                    if r_blocked: break
-                                
-                                if not r_blocked:
-                                    if tid != tba.id:
-                                        if self._get_room_floor(room.room_number) == self._get_dept_floor(t_data['dept']):
-                                            score += 5 # Floor bonus
-                                    
-                                    sec_opts.append({
-                                        'room': room,
-                                        'pattern': pattern,
-                                        'days': actual_days,
-                                        'slot': slot,
-                                        'req_slots': req_slots,
-                                        'score': score
-                                    })
-                                    break 
-                    
+                            room, floor_match = self._pick_room(ctx, free, preferred)
+                            if floor_match:
+                                score += FLOOR_MATCH_BONUS
+
+                            sec_opts.append({
+                                'room': room,
+                                'pattern': pattern,
+                                'days': actual_days,
+                                'slot': slot,
+                                'req_slots': req_slots,
+                                'score': score
+                            })
+                            options_scored += 1
+
                     if not sec_opts:
                         possible = False
                         break
                     group_options.append(sec_opts)
 
+                t1 = clock()
+                t_scoring += t1 - t0
                 if not possible: continue
 
-                # Combine
+                # Combine: best non-overlapping option per section, any group size
                 curr_plan = None
-                if len(group) == 1:
-                    best = max(group_options[0], key=lambda x: x['score'])
-                    curr_plan = {'tid': tid, 'assigns': [best], 'score': best['score']}
-                elif len(group) == 2:
-                    opts1 = sorted(group_options[0], key=lambda x: x['score'], reverse=True)
-                    opts2 = sorted(group_options[1], key=lambda x: x['score'], reverse=True)
-                    for o1 in opts1:
-                        if curr_plan: break
-                        for o2 in opts2:
-                            overlap = False
-                            for d1 in o1['days']:
-                                for d2 in o2['days']:
-                                    if d1 == d2:
-                                        if set(o1['req_slots']) & set(o2['req_slots']):
-                                            overlap = True; break
-                                if overlap: break
-                            if not overlap:
-                                curr_plan = {'tid': tid, 'assigns': [o1, o2], 'score': o1['score'] + o2['score']}
-                                break
-                
+                assigns, score, nodes = self._combine(group_options)
+                combine_nodes += nodes
+                if assigns is not None:
+                    curr_plan = {'tid': tid, 'assigns': assigns, 'score': score}
+                t_pairing += clock() - t1
+
                 if curr_plan:
                     # GREEDY ACCEPTANCE MODIFIED
                     # Only accept immediately if it's a PERFECT score (100.0)
                     # Otherwise, keep searching for a better slot/day.
-                    if tid != tba.id:
+                    if tid != tba_id:
                          if curr_plan['score'] >= 100.0: # Perfect match found
                              best_plan = curr_plan
                              best_score = curr_plan['score']
-                             break 
-                         
+                             break
+
                          # If not perfect, keep it if it's better than what we have
                          if curr_plan['score'] > best_score:
                              best_score = curr_plan['score']
@@ -417,111 +728,848 @@ class CpSatAutoScheduler:
                             best_score = curr_plan['score']
                             best_plan = curr_plan
 
-            # --- COMMIT ---
+            # --- RESERVE ---
             if best_plan:
-                tid = best_plan['tid']
-                
-                if tid != tba.id:
-                    quota_usage[(tid, base_code)] += 1
-                    global_usage[tid] += 1
-
-                for idx, assign in enumerate(best_plan['assigns']):
-                    sec = group[idx]
-                    sec.teacher_id = tid
-                    
-                    # Update pattern usage to maintain balance
-                    pattern_usage[assign['pattern']] += 1
-                    
-                    for s_idx in assign['req_slots']:
-                        sched = ClassSchedule(
-                            section_id=sec.id,
-                            room_id=assign['room'].id,
-                            day=assign['pattern'],
-                            time_slot_id=s_idx,
-                            is_friday_booking=(assign['pattern'] == 'Friday' or 'Friday' in assign['days']),
-                            availability=assign['room'].capacity
-                        )
-                        db.add(sched)
-                        for d in assign['days']:
-                            occupied_slots.add((assign['room'].id, d, s_idx))
-                            if tid != tba.id:
-                                occupied_slots.add((tid, d, s_idx))
-                    total_scheduled += 1
-                
-                if tid == tba.id:
-                    assigned_tba += len(best_plan['assigns'])
+                plans[key] = best_plan
+                self._reserve(ctx, state, base_code, best_plan['tid'], best_plan['assigns'])
+
+        self.profile.add_time("candidate_generation", t_candidates)
+        self.profile.add_time("option_scoring", t_scoring)
+        self.profile.add_time("pairing", t_pairing)
+        self.profile.count("candidates_evaluated", candidates_evaluated)
+        self.profile.count("options_scored", options_scored)
+        self.profile.count("rooms_probed", rooms_probed)
+        self.profile.count("blocked_checks", blocked_checks)
+        self.profile.count("combine_nodes", combine_nodes)
+        if ctx.warm_plans:
+            self.profile.count("warm_kept", warm_kept)
+        return plans
+
+    def _warm_plans(self, ctx: _RunContext) -> Dict[Tuple[str, int], Dict]:
+        """
+        The warm-start placements as group plans: groups whose sections were all placed, by one
+        teacher and in rooms that are still part of the run. TBA groups are left out so the greedy
+        pass looks for a teacher again. Feasibility is checked when the greedy pass reaches them.
+        """
+        rooms_by_id = {r.id: r for r in ctx.rooms}
+        warm = {}
+        for key, group in ctx.grouped_sections.items():
+            previous = [self.warm_start.get(sec.id) for sec in group]
+            if any(p is None or p['room_id'] not in rooms_by_id for p in previous):
+                continue
+            tids = {p['teacher_id'] or ctx.tba_id for p in previous}
+            tid = tids.pop()
+            if tids or tid == ctx.tba_id or tid not in ctx.teacher_info:
+                continue
+            warm[key] = {'tid': tid, 'assigns': [
+                {'room': rooms_by_id[p['room_id']], 'pattern': p['day'], 'days': days_of(p['day']),
+                 'slot': p['time_slots'][0], 'req_slots': p['time_slots'], 'score': 0}
+                for p in previous
+            ]}
+        return warm
+
+    def _keep_warm(self, ctx: _RunContext, occupancy: ScheduleOccupancy, key: Tuple[str, int], candidates: List[Dict]) -> Optional[Dict]:
+        """
+        The group's previous plan, rescored, if it is still feasible: the teacher is still a
+        candidate (quota and load), every section keeps a valid time option, its room (still in
+        the section's pool) and the teacher are free, and the sections do not overlap.
+        """
+        warm = ctx.warm_plans[key]
+        tid = warm['tid']
+        cand = next((c for c in candidates if c['tid'] == tid), None)
+        if cand is None:
+            return None
+        t_data = ctx.teacher_info[tid]
+        building = self._dept_building(self._extract_dept_from_code(key[0]))
+
+        used = 0
+        assigns = []
+        for sec, prev in zip(ctx.grouped_sections[key], warm['assigns']):
+            days, req_slots = prev['days'], prev['req_slots']
+            # The course may have changed type or duration since
+            if not any(o[0] == prev['pattern'] and o[2] == prev['slot'] and o[3] == req_slots for o in self._time_options(sec)):
+                return None
+            if t_data['is_adjunct'] and not all(d in t_data['pref_days'] for d in days):
+                return None
+            slots = slot_mask(req_slots)
+            cells = week_mask(days, slots)
+            if cells & used:
+                return None
+            used |= cells
+            preferred, rest = self._pool_masks(ctx, ctx.section_types[sec.id], building, t_data['floor'])
+            room_bit = occupancy.rooms.mask_of([prev['room'].id]) & (preferred | rest)
+            if not occupancy.free_rooms(room_bit, tid, days, slots):
+                return None
+
+            score = self._option_score(t_data, days, req_slots)
+            if cand['type'] == 'RESCUE':
+                score -= 10.0
+            elif cand['type'] == 'FALLBACK':
+                score -= 30.0
+            if room_bit & preferred:
+                score += FLOOR_MATCH_BONUS
+            assigns.append(dict(prev, score=score))
+        return {'tid': tid, 'assigns': assigns, 'score': sum(a['score'] for a in assigns)}
+
+    def _churn(self, ctx: _RunContext, plans: Dict[Tuple[str, int], Dict]) -> Dict[str, int]:
+        """
+        Section changes of the new plans against the warm start (moved, teacher changed, ...).
+        """
+        after = {}
+        for key, plan in plans.items():
+            for sec, assign in zip(ctx.grouped_sections[key], plan['assigns']):
+                after[sec.id] = {'room_id': assign['room'].id, 'day': assign['pattern'],
+                                 'time_slots': list(assign['req_slots']), 'teacher_id': plan['tid']}
+        # Sections without a teacher count as TBA, as in the plans
+        before = {sid: dict(p, teacher_id=p['teacher_id'] or ctx.tba_id) for sid, p in self.warm_start.items()}
+        counts, _ = compare_placements(before, after)
+        return counts
+
+    def _combine(self, group_options: List[List[Dict]]) -> Tuple[Optional[List[Dict]], float, int]:
+        """
+        Highest-scoring tuple of options, one per section, whose (day, slot) cells are pairwise
+        disjoint. Depth-first branch and bound: sections with the fewest options first, options
+        by score, and a branch is cut once even the best remaining options cannot beat the
+        incumbent. Returns (assigns in group order, score, nodes visited); assigns is None when
+        no compatible tuple exists.
+        """
+        n = len(group_options)
+        if n == 1:
+            best = max(group_options[0], key=lambda x: x['score'])
+            return [best], best['score'], 1
+
+        order = sorted(range(n), key=lambda i: len(group_options[i]))
+        # Per section: (score, week mask, option), best first
+        levels = [
+            sorted(((o['score'], week_mask(o['days'], slot_mask(o['req_slots'])), o) for o in group_options[i]),
+                   key=lambda x: x[0], reverse=True)
+            for i in order
+        ]
+        # bound[k]: best possible score of sections k.. ignoring overlaps
+        bound = [0.0] * (n + 1)
+        for k in range(n - 1, -1, -1):
+            bound[k] = bound[k + 1] + levels[k][0][0]
+
+        best_score = -float('inf')
+        best_pick = None
+        pick = [None] * n
+        nodes = 0
+
+        def search(k, used, score) -> bool:
+            """Returns True when the node budget is spent."""
+            nonlocal best_score, best_pick, nodes
+            if k == n:
+                if score > best_score:
+                    best_score, best_pick = score, list(pick)
+                return False
+            for option_score, cells, option in levels[k]:
+                if score + option_score + bound[k + 1] <= best_score:
+                    break  # Sorted by score: the rest of this level cannot do better
+                if cells & used:
+                    continue
+                nodes += 1
+                if nodes > COMBINE_NODE_LIMIT and best_pick is not None:
+                    return True
+                pick[k] = option
+                if search(k + 1, used | cells, score + option_score):
+                    return True
+            return False
+
+        search(0, 0, 0.0)
+        if best_pick is None:
+            return None, 0.0, nodes
+        assigns = [None] * n
+        for k, i in enumerate(order):
+            assigns[i] = best_pick[k]
+        return assigns, best_score, nodes
+
+    def _reserve(self, ctx: _RunContext, state: _GreedyState, base_code: str, tid: int, assigns: List[Dict]):
+        if tid != ctx.tba_id:
+            state.quota_usage[(tid, base_code)] += 1
+            state.global_usage[tid] += 1
+
+        for assign in assigns:
+            # Update pattern usage to maintain balance
+            state.pattern_usage[assign['pattern']] += 1
+            state.occupancy.mark(assign['room'].id, tid if tid != ctx.tba_id else None, assign['days'], slot_mask(assign['req_slots']))
+
+    # --- 4b. LOCAL SEARCH ---
+    def _local_search(self, ctx: _RunContext, plans: Dict[Tuple[str, int], Dict], deadline: float) -> Tuple[Dict[Tuple[str, int], Dict], bool]:
+        """
+        Simulated annealing on finished plans until the deadline (or LS_STALL_ITERATIONS without a new best).
+
+        Moves:
+        - move:     one section to another time option, same teacher, any free room of its pool
+        - swap:     two sections of the same kind and different teachers exchange their times
+        - reassign: a group (TBA included) goes to another eligible teacher and is re-placed for them
+
+        Moves are checked against the occupancy grids and scored incrementally with the Quality
+        formula: only the teachers a move touches are re-scored (strict points / target load, capped
+        at 100). Plan dicts are replaced, never mutated, so the best plans are a shallow copy.
+        With a warm start, leaving a section's previous time or a group's previous teacher costs
+        WARM_START_BONUS, as in the CP-SAT objective.
+        Returns (best plans, whether they beat the input).
+        """
+        tba_id = ctx.tba_id
+        teacher_info = ctx.teacher_info
+        rng = self.rng
+        plans = dict(plans)
+
+        state = _GreedyState(occupancy=ctx.new_occupancy())
+        for key, plan in plans.items():
+            self._reserve(ctx, state, key[0], plan['tid'], plan['assigns'])
+        occupancy = state.occupancy
+
+        def busy(tid):
+            return tid if tid != tba_id else None
+
+        def strict(tid, assign):
+            if tid == tba_id:
+                return 0.0
+            return max(0.0, self._option_score(teacher_info[tid], assign['days'], assign['req_slots']))
+
+        def contribution(tid, pts):
+            if tid == tba_id:
+                return 0.0
+            return min(100.0, pts / teacher_info[tid]['target_load'])
+
+        points = defaultdict(float)   # teacher id -> strict compliance points of all their sections
+        for plan in plans.values():
+            for assign in plan['assigns']:
+                points[plan['tid']] += strict(plan['tid'], assign)
+
+        warm_time = {sid: (p['day'], p['time_slots']) for sid, p in (self.warm_start or {}).items()}
+        warm_teacher = {key: plan['tid'] for key, plan in ctx.warm_plans.items()}
+
+        def kept(sec, assign):
+            return WARM_START_BONUS if warm_time.get(sec.id) == (assign['pattern'], assign['req_slots']) else 0.0
+
+        def release(tid, assign):
+            occupancy.unmark(assign['room'].id, busy(tid), assign['days'], slot_mask(assign['req_slots']))
+
+        def occupy(tid, assign):
+            occupancy.mark(assign['room'].id, busy(tid), assign['days'], slot_mask(assign['req_slots']))
+
+        buildings = {}
+        def building_of(key):
+            if key not in buildings:
+                buildings[key] = self._dept_building(self._extract_dept_from_code(key[0]))
+            return buildings[key]
+
+        options = {}
+        def options_of(sec):
+            if sec.id not in options:
+                options[sec.id] = self._time_options(sec)
+            return options[sec.id]
+
+        def place(sec, key, tid, option, siblings):
+            """
+            The assign for `sec` at `option` taught by `tid` in the best free room, or None.
+            The section's own cells must be released first.
+            """
+            pattern, days, slot, req_slots = option
+            t_data = teacher_info[tid]
+            if tid != tba_id and t_data['is_adjunct'] and not all(d in t_data['pref_days'] for d in days):
+                return None
+            slots = slot_mask(req_slots)
+            for other in siblings:
+                # Covered by the teacher grid except for TBA groups
+                if slots & slot_mask(other['req_slots']) and any(d in other['days'] for d in days):
+                    return None
+            dept_floor = t_data['floor'] if tid != tba_id else None
+            preferred, rest = self._pool_masks(ctx, ctx.section_types[sec.id], building_of(key), dept_floor)
+            free = occupancy.free_rooms(preferred | rest, busy(tid), days, slots)
+            if not free:
+                return None
+            room, floor_match = self._pick_room(ctx, free, preferred)
+            score = PENALTY_TBA if tid == tba_id else self._option_score(t_data, days, req_slots)
+            return {'room': room, 'pattern': pattern, 'days': days, 'slot': slot, 'req_slots': req_slots,
+                    'score': score + (FLOOR_MATCH_BONUS if floor_match else 0.0)}
+
+        def option_of(assign):
+            return (assign['pattern'], assign['days'], assign['slot'], assign['req_slots'])
+
+        eligible = {}
+        def eligible_teachers(key):
+            """
+            Teachers who could take the group: applicants with quota, then department fallback.
+            """
+            if key not in eligible:
+                group_dept = self._extract_dept_from_code(key[0])
+                pref = [t for t in ctx.course_applicants.get(key[0], []) if t != tba_id and ctx.quota_limits[(t, key[0])] > 0]
+                fallback = [t for t in ctx.dept_teachers.get(group_dept, []) if t not in pref]
+                eligible[key] = [(t, t in pref) for t in pref + fallback
+                                 if t in teacher_info and not (teacher_info[t]['is_adjunct'] and not teacher_info[t]['pref_days'])]
+            return eligible[key]
+
+        def set_plan(key, tid, assigns):
+            plans[key] = {'tid': tid, 'assigns': assigns, 'score': sum(a['score'] for a in assigns)}
+
+        placed = [(key, i) for key, plan in plans.items() for i in range(len(plan['assigns']))]
+        keys = list(plans.keys())
+        if not placed:
+            return plans, False
+
+        moves = [name for name, weight in LS_MOVE_WEIGHTS for _ in range(weight)]
+        start_total = current = sum(contribution(tid, pts) for tid, pts in points.items())
+        best_total, best_plans = current, dict(plans)
+        started = time.monotonic()
+        span = max(1e-6, deadline - started)
+        temperature = LS_START_TEMPERATURE
+        evaluated = accepted = improving = stall = 0
+
+        def accept(delta):
+            return delta >= 0 or rng.random() < math.exp(delta / temperature)
+
+        while True:
+            if evaluated % 256 == 0:
+                now = time.monotonic()
+                if now >= deadline or stall >= LS_STALL_ITERATIONS:
+                    break
+                progress = (now - started) / span
+                temperature = LS_START_TEMPERATURE * (LS_END_TEMPERATURE / LS_START_TEMPERATURE) ** progress
+            evaluated += 1
+            stall += 1
+            kind = rng.choice(moves)
+            delta = None
+
+            if kind == "move":
+                key, i = rng.choice(placed)
+                plan = plans[key]
+                tid = plan['tid']
+                if tid == tba_id:
+                    continue
+                sec = ctx.grouped_sections[key][i]
+                old = plan['assigns'][i]
+                option = rng.choice(options_of(sec))
+                if (option[0], option[2]) == (old['pattern'], old['slot']):
+                    continue
+                release(tid, old)
+                new = place(sec, key, tid, option, [a for j, a in enumerate(plan['assigns']) if j != i])
+                if new is None:
+                    occupy(tid, old)
+                    continue
+                d_pts = strict(tid, new) - strict(tid, old)
+                delta = contribution(tid, points[tid] + d_pts) - contribution(tid, points[tid]) + kept(sec, new) - kept(sec, old)
+                if accept(delta):
+                    occupy(tid, new)
+                    points[tid] += d_pts
+                    assigns = list(plan['assigns'])
+                    assigns[i] = new
+                    set_plan(key, tid, assigns)
                 else:
-                    assigned_non_tba += len(best_plan['assigns'])
-                    t_data = teacher_info[tid]
-                    t_data['assigned_count'] += len(best_plan['assigns'])
-                    
-                    # Correct Score Calculation: STRICT COMPLIANCE ONLY
-                    # We recalculate the score based purely on Day/Slot match, ignoring scheduler bonuses.
-                    batch_total = 0
-                    for assign in best_plan['assigns']:
-                        # Check Day Match
-                        match_d = all(d in t_data['pref_days'] for d in assign['days'])
-                        
-                        # Check Slot Match
-                        match_s = True
-                        for d in assign['days']:
-                            for s in assign['req_slots']:
-                                if (d, s) not in t_data['pref_slots']:
-                                    match_s = False; break
-                        
-                        # Strict Scoring
-                        item_score = 100.0
-                        if not match_d: item_score -= 25.0
-                        if not match_s: item_score -= 10.0
-                        
-                        batch_total += max(0.0, item_score)
-
-                    t_data['total_score'] += batch_total
+                    occupy(tid, old)
+                    delta = None
+
+            elif kind == "swap":
+                (k1, i1), (k2, i2) = rng.choice(placed), rng.choice(placed)
+                p1, p2 = plans[k1], plans[k2]
+                t1, t2 = p1['tid'], p2['tid']
+                if k1 == k2 or t1 == t2:
+                    continue
+                s1, s2 = ctx.grouped_sections[k1][i1], ctx.grouped_sections[k2][i2]
+                a1, a2 = p1['assigns'][i1], p2['assigns'][i2]
+                if ctx.section_types[s1.id] != ctx.section_types[s2.id] or len(a1['req_slots']) != len(a2['req_slots']):
+                    continue
+                if (a1['pattern'], a1['slot']) == (a2['pattern'], a2['slot']):
+                    continue
+                release(t1, a1)
+                release(t2, a2)
+                n1 = place(s1, k1, t1, option_of(a2), [a for j, a in enumerate(p1['assigns']) if j != i1])
+                n2 = None
+                if n1 is not None:
+                    occupy(t1, n1)
+                    n2 = place(s2, k2, t2, option_of(a1), [a for j, a in enumerate(p2['assigns']) if j != i2])
+                    if n2 is None:
+                        release(t1, n1)
+                if n2 is None:
+                    occupy(t1, a1)
+                    occupy(t2, a2)
+                    continue
+                d1 = strict(t1, n1) - strict(t1, a1)
+                d2 = strict(t2, n2) - strict(t2, a2)
+                delta = (contribution(t1, points[t1] + d1) - contribution(t1, points[t1])
+                         + contribution(t2, points[t2] + d2) - contribution(t2, points[t2])
+                         + kept(s1, n1) - kept(s1, a1) + kept(s2, n2) - kept(s2, a2))
+                if accept(delta):
+                    occupy(t2, n2)
+                    points[t1] += d1
+                    points[t2] += d2
+                    assigns1, assigns2 = list(p1['assigns']), list(p2['assigns'])
+                    assigns1[i1], assigns2[i2] = n1, n2
+                    set_plan(k1, t1, assigns1)
+                    set_plan(k2, t2, assigns2)
+                else:
+                    release(t1, n1)
+                    occupy(t1, a1)
+                    occupy(t2, a2)
+                    delta = None
+
             else:
-                logger.warning(f"FAILED to schedule group {base_code}-{group[0].section_number}")
+                key = rng.choice(keys)
+                plan = plans[key]
+                old_tid = plan['tid']
+                base_code = key[0]
+                cands = [
+                    t for t, is_pref in eligible_teachers(key)
+                    if t != old_tid and (
+                        state.quota_usage[(t, base_code)] < ctx.quota_limits[(t, base_code)] if is_pref
+                        else state.global_usage[t] < DEFAULT_MAX_SECTIONS
+                    )
+                ]
+                if not cands:
+                    continue
+                new_tid = rng.choice(cands)
+                for assign in plan['assigns']:
+                    release(old_tid, assign)
+                # Per section: the current time if the new teacher can take it, else their best option
+                new_assigns = []
+                for sec, old in zip(ctx.grouped_sections[key], plan['assigns']):
+                    best = None
+                    for option in [option_of(old)] + options_of(sec):
+                        cand = place(sec, key, new_tid, option, new_assigns)
+                        if cand is not None and (best is None or strict(new_tid, cand) > strict(new_tid, best)):
+                            best = cand
+                    if best is None:
+                        break
+                    occupy(new_tid, best)
+                    new_assigns.append(best)
+                if len(new_assigns) < len(plan['assigns']):
+                    for assign in new_assigns:
+                        release(new_tid, assign)
+                    for assign in plan['assigns']:
+                        occupy(old_tid, assign)
+                    continue
+                d_old = -sum(strict(old_tid, a) for a in plan['assigns'])
+                d_new = sum(strict(new_tid, a) for a in new_assigns)
+                delta = (contribution(old_tid, points[old_tid] + d_old) - contribution(old_tid, points[old_tid])
+                         + contribution(new_tid, points[new_tid] + d_new) - contribution(new_tid, points[new_tid]))
+                if warm_teacher:
+                    group = ctx.grouped_sections[key]
+                    delta += sum(kept(sec, a) for sec, a in zip(group, new_assigns)) - sum(kept(sec, a) for sec, a in zip(group, plan['assigns']))
+                    delta += WARM_START_BONUS * len(group) * ((warm_teacher.get(key) == new_tid) - (warm_teacher.get(key) == old_tid))
+                if accept(delta):
+                    points[old_tid] += d_old
+                    points[new_tid] += d_new
+                    if old_tid != tba_id:
+                        state.quota_usage[(old_tid, base_code)] -= 1
+                        state.global_usage[old_tid] -= 1
+                    state.quota_usage[(new_tid, base_code)] += 1
+                    state.global_usage[new_tid] += 1
+                    set_plan(key, new_tid, new_assigns)
+                else:
+                    for assign in new_assigns:
+                        release(new_tid, assign)
+                    for assign in plan['assigns']:
+                        occupy(old_tid, assign)
+                    delta = None
 
+            if delta is None:
+                continue
+            accepted += 1
+            current += delta
+            if current > best_total + 1e-9:
+                improving += 1
+                stall = 0
+                best_total, best_plans = current, dict(plans)
+
+        n_teachers = max(1, sum(1 for tid in teacher_info if tid != tba_id))
+        logger.info(f"Local search: {evaluated} moves, {accepted} accepted, "
+                    f"mean score {start_total / n_teachers:.2f} -> {best_total / n_teachers:.2f}")
+        self.profile.count("ls_moves_evaluated", evaluated)
+        self.profile.count("ls_moves_accepted", accepted)
+        self.profile.count("ls_improvements", improving)
+        self.profile.lap("local_search")
+        return best_plans, best_total > start_total + 1e-9
+
+    # --- 4. CP-SAT MODEL ---
+    def _solve(self, ctx: _RunContext, hint_plans: Dict[Tuple[str, int], Dict], deadline: float) -> Tuple[Optional[Dict[Tuple[str, int], Dict]], str]:
+        """
+        Builds the full constraint model and solves it with CP-SAT, seeded with the greedy plans.
+
+        Variables:
+        - assign[g, t]: group g is taught by teacher t
+        - x[s, t, o]:   section s is taught by t at time option o (pattern, start slot)
+
+        The room dimension is modelled per room pool (type + building): every (day, slot) cell
+        may hold at most as many sections as the pool has rooms, counting sections of nested
+        pools too (a building pool lies inside its type pool). Placements are intervals of
+        slots on fixed days, so this is exact (interval colouring) and keeps the model small;
+        concrete rooms are assigned after the solve.
+        Returns (plans, status); plans is None when the solver found nothing usable.
+        """
+        tba_id = ctx.tba_id
+        teacher_info = ctx.teacher_info
+        model = cp_model.CpModel()
+
+        # Hinted decisions from the greedy pass
+        hint_teacher = {}
+        hint_place = {}
+        for key, plan in hint_plans.items():
+            hint_teacher[key] = plan['tid']
+            for sec, assign in zip(ctx.grouped_sections[key], plan['assigns']):
+                hint_place[sec.id] = (assign['pattern'], assign['slot'])
+
+        # Warm start: a small reward for keeping a section's time and a group's teacher
+        warm_place = {sid: (p['day'], p['time_slots'][0]) for sid, p in (self.warm_start or {}).items()}
+        warm_teacher = {key: plan['tid'] for key, plan in ctx.warm_plans.items()}
+        warm_bonus = int(WARM_START_BONUS * QUALITY_SCALE)
+
+        objective = []
+        group_tids = {}                       # key -> candidate teacher ids
+        assign_vars = {}                      # (key, tid) -> var
+        x_vars = {}                           # (sec_id, tid, opt_idx) -> var
+        sec_options = {}                      # sec_id -> options
+        sec_pools = {}                        # sec_id -> (class type, building)
+        teacher_cells = defaultdict(list)     # (tid, day, slot) -> vars
+        pool_cells = defaultdict(list)        # (pool key, day, slot) -> vars
+        teacher_loads = defaultdict(list)     # tid -> assign vars
+        fallback_loads = defaultdict(list)    # tid -> assign vars on groups they did not request
+        quota_loads = defaultdict(list)       # (tid, base_code) -> assign vars
+        hints = {}
+
+        for key in ctx.sorted_keys:
+            group = ctx.grouped_sections[key]
+            base_code = key[0]
+            group_dept = self._extract_dept_from_code(base_code)
+            building = self._dept_building(group_dept)
+
+            # Candidate teachers: applicants, then department fallback, capped for model size.
+            pref_tids = [tid for tid in ctx.course_applicants.get(base_code, []) if tid != tba_id and ctx.quota_limits[(tid, base_code)] > 0]
+            fallback_tids = [tid for tid in ctx.dept_teachers.get(group_dept, []) if tid not in pref_tids]
+            self.rng.shuffle(fallback_tids)
+            cand_tids = pref_tids + fallback_tids[:MAX_FALLBACK_TEACHERS]
+            hinted_tid = hint_teacher.get(key)
+            if hinted_tid is not None and hinted_tid != tba_id and hinted_tid not in cand_tids:
+                cand_tids.append(hinted_tid)
+            cand_tids = [tid for tid in cand_tids if not (teacher_info[tid]['is_adjunct'] and not teacher_info[tid]['pref_days'])]
+            cand_tids.append(tba_id)
+            group_tids[key] = cand_tids
+
+            group_assign = []
+            for tid in cand_tids:
+                a = model.NewBoolVar(f"a_{base_code}_{key[1]}_{tid}")
+                assign_vars[(key, tid)] = a
+                group_assign.append(a)
+                hints[a] = 1 if hinted_tid == tid else 0
+                if warm_teacher.get(key) == tid:
+                    objective.append(warm_bonus * len(group) * a)
+                if tid != tba_id:
+                    teacher_loads[tid].append(a)
+                    if tid in pref_tids:
+                        quota_loads[(tid, base_code)].append(a)
+                    else:
+                        fallback_loads[tid].append(a)
+                        objective.append(-30 * QUALITY_SCALE // teacher_info[tid]['target_load'] * len(group) * a) # Fallback penalty, per section like the greedy score
+            model.AddAtMostOne(group_assign)
+            objective.append(int(PENALTY_UNSCHEDULED) * len(group) * (1 - sum(group_assign)))
+
+            group_cells = defaultdict(list)
+            for sec in group:
+                options = self._time_options(sec)
+                sec_options[sec.id] = options
+                pool_key = (ctx.section_types[sec.id], building)
+                sec_pools[sec.id] = pool_key
+                hinted = hint_place.get(sec.id)
+                warm = warm_place.get(sec.id)
+
+                for tid in cand_tids:
+                    t_data = teacher_info[tid]
+                    sec_x = []
+                    for o_idx, (pattern, days, slot, req_slots) in enumerate(options):
+                        # ADJUNCT CONSTRAINT: Must be on preferred days
+                        if tid != tba_id and t_data['is_adjunct'] and not all(d in t_data['pref_days'] for d in days):
+                            continue
+                        v = model.NewBoolVar(f"x_{sec.id}_{tid}_{o_idx}")
+                        x_vars[(sec.id, tid, o_idx)] = v
+                        sec_x.append(v)
+                        hints[v] = 1 if (hinted_tid == tid and hinted == (pattern, slot)) else 0
+                        if warm == (pattern, slot):
+                            objective.append(warm_bonus * v)
+                        if tid == tba_id:
+                            objective.append(int(PENALTY_TBA) * v)
+                        else:
+                            # Weighted like Quality: a point counts 1/target_load towards the teacher's score
+                            weight = QUALITY_SCALE / t_data['target_load']
+                            objective.append(int(round(self._option_score(t_data, days, req_slots) * weight)) * v)
+                        for d in days:
+                            for s in req_slots:
+                                if tid != tba_id:
+                                    teacher_cells[(tid, d, s)].append(v)
+                                pool_cells[(pool_key, d, s)].append(v)
+                                group_cells[(d, s)].append(v)
+                    # Every section of the group is taught by the group's teacher, exactly once
+                    model.Add(sum(sec_x) == assign_vars[(key, tid)])
+
+            # Lab/Theory siblings never overlap (matters for TBA, which has no teacher constraint)
+            if len(group) > 1:
+                for cell_vars in group_cells.values():
+                    if len(cell_vars) > 1:
+                        model.AddAtMostOne(cell_vars)
+
+        # Teacher no-overlap
+        for cell_vars in teacher_cells.values():
+            if len(cell_vars) > 1:
+                model.AddAtMostOne(cell_vars)
+
+        # Room no-overlap: capacity per pool and cell. Pools are nested or disjoint, so a pool
+        # also has to hold the sections of every pool inside it.
+        pool_rooms = {k: frozenset(r.id for r in ctx.room_pools[k]) for k in set(sec_pools.values())}
+        inner_pools = {k: [j for j in pool_rooms if pool_rooms[j] <= pool_rooms[k]] for k in pool_rooms}
+        cells = {(d, s) for (_, d, s) in pool_cells}
+        for pool_key, inner in inner_pools.items():
+            for d, s in cells:
+                cell_vars = [v for j in inner for v in pool_cells.get((j, d, s), [])]
+                if len(cell_vars) > len(pool_rooms[pool_key]):
+                    model.Add(sum(cell_vars) <= len(pool_rooms[pool_key]))
+
+        # Quotas: requested section counts per course, and a cap on fallback assignments.
+        for (tid, base_code), load in quota_loads.items():
+            model.Add(sum(load) <= ctx.quota_limits[(tid, base_code)])
+        for tid, load in fallback_loads.items():
+            model.Add(sum(load) <= DEFAULT_MAX_SECTIONS)
+        for tid, load in teacher_loads.items():
+            # Rescue: reward giving every teacher at least one section
+            used = model.NewBoolVar(f"used_{tid}")
+            model.Add(used <= sum(load))
+            objective.append(int(BONUS_FIRST_SECTION * QUALITY_SCALE / teacher_info[tid]['target_load']) * used)
+            hints[used] = 1 if any(hints[a] for a in load) else 0
+
+        model.Maximize(sum(objective))
+        for var, value in hints.items():
+            model.AddHint(var, value)
+
+        solver = cp_model.CpSolver()
+        # Building the model took part of the budget; the solver gets what is left (time.monotonic deadline)
+        solver.parameters.max_time_in_seconds = max(0.1, deadline - time.monotonic())
+        solver.parameters.num_workers = self.num_workers
+        solver.parameters.random_seed = self.seed
+        # Presolve on these models is expensive and finds little; keep the budget for search.
+        solver.parameters.cp_model_probing_level = 0
+        solver.parameters.symmetry_level = 0
+        proto = model.Proto()
+        self.profile.count("cp_variables", len(proto.variables))
+        self.profile.count("cp_constraints", len(proto.constraints))
+        self.profile.lap("model_build")
+
+        self._report("solving", solutions=0)
+        status = solver.Solve(model, _ProgressCallback(self._report) if self.progress else None)
+        status_name = solver.StatusName(status)
+        self.profile.lap("solve")
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            logger.info(f"CP-SAT finished without a solution: {status_name}, {solver.WallTime():.1f}s")
+            return None, status_name
+        logger.info(f"CP-SAT finished: {status_name}, objective {solver.ObjectiveValue():.0f}, {solver.WallTime():.1f}s")
+
+        # --- Decode: teacher and time per group ---
+        plans = {}
+        placements = []
+        for key in ctx.sorted_keys:
+            group = ctx.grouped_sections[key]
+            tid = next((t for t in group_tids[key] if solver.Value(assign_vars[(key, t)])), None)
+            if tid is None:
+                continue
+            dept_floor = teacher_info[tid]['floor'] if tid != tba_id else None
+            assigns = []
+            for sec in group:
+                o_idx = next(i for i in range(len(sec_options[sec.id])) if (sec.id, tid, i) in x_vars and solver.Value(x_vars[(sec.id, tid, i)]))
+                pattern, days, slot, req_slots = sec_options[sec.id][o_idx]
+                assign = {
+                    'room': None,
+                    'pattern': pattern,
+                    'days': days,
+                    'slot': slot,
+                    'req_slots': req_slots,
+                    'score': PENALTY_TBA if tid == tba_id else self._option_score(teacher_info[tid], days, req_slots)
+                }
+                assigns.append(assign)
+                placements.append((sec.id, sec_pools[sec.id], dept_floor, assign))
+            plans[key] = {'tid': tid, 'assigns': assigns, 'score': sum(a['score'] for a in assigns)}
+
+        # --- Concrete rooms: first-fit in start-slot order (interval colouring), narrowest pool
+        # first within a start slot, floor match first ---
+        placements.sort(key=lambda p: (p[3]['slot'], len(ctx.room_pools[p[1]])))
+        rooms = self._assign_rooms(ctx, placements, keep_previous=True) if self.warm_start else None
+        if rooms is None:
+            # Pinning previous rooms can break the colouring; plain first-fit never does
+            rooms = self._assign_rooms(ctx, placements, keep_previous=False)
+        if rooms is None:
+            logger.warning("CP-SAT room assignment failed; keeping greedy result")
+            return None, status_name
+        for (_, _, _, assign), (room, floor_match) in zip(placements, rooms):
+            assign['room'] = room
+            if floor_match:
+                assign['score'] += FLOOR_MATCH_BONUS
+
+        self.profile.lap("decode")
+        return plans, status_name
+
+    def _assign_rooms(self, ctx: _RunContext, placements: List[Tuple[int, Tuple[str, Optional[str]], Optional[int], Dict]],
+                      keep_previous: bool) -> Optional[List[Tuple[Room, bool]]]:
+        """
+        (room, floor matched) per placement, in order, or None when a placement finds no free room.
+        With keep_previous, sections still at their warm-start time get their previous room first.
+        """
+        occupancy = ctx.new_occupancy()
+        rooms = [None] * len(placements)
+        if keep_previous:
+            for i, (sec_id, pool_key, dept_floor, assign) in enumerate(placements):
+                prev = self.warm_start.get(sec_id)
+                if prev is None or (prev['day'], prev['time_slots']) != (assign['pattern'], assign['req_slots']):
+                    continue
+                preferred, rest = self._pool_masks(ctx, pool_key[0], pool_key[1], dept_floor)
+                slots = slot_mask(assign['req_slots'])
+                room_bit = occupancy.rooms.mask_of([prev['room_id']]) & (preferred | rest)
+                if occupancy.free_rooms(room_bit, None, assign['days'], slots):
+                    rooms[i] = self._pick_room(ctx, room_bit, preferred)
+                    occupancy.mark(prev['room_id'], None, assign['days'], slots)
+
+        for i, (sec_id, pool_key, dept_floor, assign) in enumerate(placements):
+            if rooms[i] is not None:
+                continue
+            preferred, rest = self._pool_masks(ctx, pool_key[0], pool_key[1], dept_floor)
+            slots = slot_mask(assign['req_slots'])
+            free = occupancy.free_rooms(preferred | rest, None, assign['days'], slots)
+            if not free:
+                return None
+            rooms[i] = self._pick_room(ctx, free, preferred)
+            occupancy.mark(rooms[i][0].id, None, assign['days'], slots)
+        return rooms
+
+    # --- 5. COMMIT ---
+    def _commit(self, db: Session, ctx: _RunContext, plans: Dict[Tuple[str, int], Dict], status: str,
+                keys: Optional[List[Tuple[str, int]]] = None, kept: List[Tuple[Section, int, Dict]] = ()) -> RunResult:
+        """
+        Writes the plans of `keys` (default: all groups). `kept` placements are already
+        stored and only count towards the result.
+        """
+        placements = self._placements(ctx, plans, keys)
+
+        rows = []
+        teacher_ids = {}
+        for sec, tid, assign in placements:
+            teacher_ids[sec.id] = tid
+            for s_idx in assign['req_slots']:
+                rows.append({
+                    'section_id': sec.id,
+                    'room_id': assign['room'].id,
+                    'day': assign['pattern'],
+                    'time_slot_id': s_idx,
+                    'is_friday_booking': (assign['pattern'] == 'Friday' or 'Friday' in assign['days']),
+                    'availability': assign['room'].capacity
+                })
+
+        # One bulk insert and one set-based teacher update instead of a flush per row
+        insert_class_schedules(db, rows)
+        update_section_teachers(db, teacher_ids)
+        refresh_schedule_view(db)
         db.commit()
+        self.profile.lap("commit")
+        return self._result(ctx, list(kept) + placements, status)
+
+    def _placements(self, ctx: _RunContext, plans: Dict[Tuple[str, int], Dict], keys: Optional[List[Tuple[str, int]]] = None) -> List[Tuple[Section, int, Dict]]:
+        """
+        Flattens the group plans to (section, teacher id, assign) in group order.
+        """
+        placements = []
+        for key in (ctx.sorted_keys if keys is None else keys):
+            group = ctx.grouped_sections[key]
+            best_plan = plans.get(key)
+            if not best_plan:
+                logger.warning(f"FAILED to schedule group {key[0]}-{group[0].section_number}")
+                continue
+            for sec, assign in zip(group, best_plan['assigns']):
+                placements.append((sec, best_plan['tid'], assign))
+        return placements
+
+    def evaluate(self, db: Session) -> RunResult:
+        """
+        Scores the schedule currently stored in the DB with the same rules as run(),
+        whichever engine produced it. Nothing is written.
+        """
+        self.profile = RunProfile()
+        tba = ensure_tba_teacher(db)
+        ctx = self._prepare(db, tba)
+        stored = self._stored_assigns(db, ctx)
+
+        placements = [(sec, sec.teacher_id or tba.id, stored[sec.id]) for sec in ctx.sections if sec.id in stored]
+        return self._result(ctx, placements, "EVALUATED")
+
+    def _stored_assigns(self, db: Session, ctx: _RunContext) -> Dict[int, Dict]:
+        """
+        The stored ClassSchedule rows as assigns per section id. 'room' is None when the
+        room is not part of this run (e.g. offline).
+        """
+        rooms_by_id = {r.id: r for r in ctx.rooms}
+        rows_by_section = defaultdict(list)
+        for row in db.query(ClassSchedule).all():
+            rows_by_section[row.section_id].append(row)
+
+        stored = {}
+        for section_id, rows in rows_by_section.items():
+            pattern = rows[0].day
+            req_slots = sorted({r.time_slot_id for r in rows})
+            stored[section_id] = {
+                'room': rooms_by_id.get(rows[0].room_id),
+                'pattern': pattern,
+                'days': days_of(pattern),
+                'slot': req_slots[0],
+                'req_slots': req_slots,
+                'score': 0
+            }
+        return stored
+
+    def _result(self, ctx: _RunContext, placements: List[Tuple[Section, int, Dict]], status: str) -> RunResult:
+        tba_id = ctx.tba_id
+        teacher_info = ctx.teacher_info
+        total_scheduled = len(placements)
+        assigned_non_tba = 0
+        assigned_tba = 0
+
+        for sec, tid, assign in placements:
+            if tid == tba_id or tid not in teacher_info:
+                assigned_tba += 1
+                continue
+            assigned_non_tba += 1
+            t_data = teacher_info[tid]
+            t_data['assigned_count'] += 1
+
+            # Correct Score Calculation: STRICT COMPLIANCE ONLY
+            # We recalculate the score based purely on Day/Slot match, ignoring scheduler bonuses.
+            t_data['total_score'] += max(0.0, self._option_score(t_data, assign['days'], assign['req_slots']))
 
         # Stats
         teacher_scores_list = []
         all_scores = []
         for tid, info in teacher_info.items():
-            if tid == tba.id: continue
-            
-            # Calculate Target Load (Total sections they requested/were willing to take)
-            # We sum up the quota limits for this teacher across all courses they applied for.
-            target_load = 0
-            for (t_id, c_code), limit in quota_limits.items():
-                if t_id == tid:
-                    target_load += limit
-            
-            # If they didn't apply for anything specific, assume default max (fallback)
-            if target_load == 0: target_load = DEFAULT_MAX_SECTIONS
+            if tid == tba_id: continue
+
+            target_load = info['target_load']
 
             # Calculation for display
             # Formula: (Total Compliance Points) / (Target Load * 100) * 100
             # This penalizes them for unassigned sections.
             # Example: Wanted 4, Got 2 Perfect (200 pts). Score = 200 / 400 = 50%.
-            
+
             final_score = 0.0
             if target_load > 0:
                 final_score = (info['total_score'] / (target_load * 100.0)) * 100.0
-            
+
             # Cap at 100 just in case
             final_score = min(100.0, max(0.0, final_score))
-            
+
             all_scores.append(final_score)
-            
+
             teacher_scores_list.append({
                 "teacher_id": tid,
-                "initial": info['obj'].initial,
-                "name": info['obj'].name,
+                "initial": info['initial'],
+                "name": info['name'],
                 "assigned_sections": info['assigned_count'],
                 "score_out_of_100": round(final_score, 2)
             })
 
         final_mean = sum(all_scores)/len(all_scores) if all_scores else 0
-        
+
         # Variance Calculation
         variance = 0.0
         if all_scores:
@@ -534,14 +1582,17 @@ class CpSatAutoScheduler:
             overall_score=round(final_mean, 2),
             teacher_scores=teacher_scores_list
         )
-        
-        logger.info(f"Done. Assigned {assigned_non_tba}/{len(sections)} to teachers.")
+
+        logger.info(f"Done ({status}). Assigned {assigned_non_tba}/{len(ctx.sections)} to teachers.")
 
         return RunResult(
             total_scheduled=total_scheduled,
             quality=qual,
-            total_sections=len(sections),
+            total_sections=len(ctx.sections),
             assigned_non_tba=assigned_non_tba,
             assigned_tba=assigned_tba,
-            unscheduled=len(sections) - total_scheduled
-        )
\ No newline at end of file
+            unscheduled=len(ctx.sections) - total_scheduled,
+            solver_status=status,
+            timings=self.profile.timings_rounded(),
+            counters=dict(self.profile.counters)
+        )
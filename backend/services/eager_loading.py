@@ -0,0 +1,61 @@
+"""
+Loader presets per response shape, so endpoints returning schedules or sections run a fixed
+number of queries per page instead of lazy-loading relationships row by row.
+
+Pass them to Query.options(*PRESET). The *_RESPONSE presets cover the nested Pydantic schemas;
+the *_SUMMARY ones cover endpoints that build dicts from course, room and teacher only.
+"""
+from sqlalchemy.orm import contains_eager, selectinload
+
+from models.academic import Course
+from models.schedule import ClassSchedule, Section
+from models.teacher import Teacher
+# The options below configure the mappers when this module loads, so every model a relationship
+# names must be registered by then, whichever module imported this one first
+import models.admin, models.booking, models.chat, models.notification, models.settings, models.student, models.user, models.verification  # noqa: F401,E401
+
+def _with_course_sections(load):
+    # schemas.academic.Course: sections_count is len(course.sections)
+    return load.selectinload(Course.sections)
+
+def _with_teacher_profile(load):
+    # schemas.teacher.Teacher: email (through user), office hours and timing preferences
+    return load.options(
+        selectinload(Teacher.user),
+        selectinload(Teacher.office_hours),
+        selectinload(Teacher.timing_preferences),
+    )
+
+# schemas.schedule.Section
+SECTION_RESPONSE = (
+    _with_course_sections(selectinload(Section.course)),
+    _with_teacher_profile(selectinload(Section.teacher)),
+)
+
+# schemas.schedule.ClassSchedule, for a query on ClassSchedule alone
+SCHEDULE_RESPONSE = (
+    selectinload(ClassSchedule.room),
+    _with_course_sections(selectinload(ClassSchedule.section).selectinload(Section.course)),
+    _with_teacher_profile(selectinload(ClassSchedule.section).selectinload(Section.teacher)),
+)
+
+# schemas.schedule.ClassSchedule, for a query already joined to Section, Course, Room and
+# (outer) Teacher, as in services.schedule_query: the joined rows fill the many-to-one side
+SCHEDULE_RESPONSE_JOINED = (
+    contains_eager(ClassSchedule.room),
+    _with_course_sections(contains_eager(ClassSchedule.section).contains_eager(Section.course)),
+    _with_teacher_profile(contains_eager(ClassSchedule.section).contains_eager(Section.teacher)),
+)
+
+# Schedule rows shown as course code/title and room number
+SCHEDULE_SUMMARY = (
+    selectinload(ClassSchedule.room),
+    selectinload(ClassSchedule.section).selectinload(Section.course),
+)
+
+# Sections shown with course, teacher name and their schedule rows
+SECTION_SUMMARY = (
+    selectinload(Section.course),
+    selectinload(Section.teacher),
+    selectinload(Section.schedules).selectinload(ClassSchedule.room),
+)
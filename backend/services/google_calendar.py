@@ -12,7 +12,7 @@ from models.student import Student
 from models.schedule import ClassSchedule, Section
 from models.booking import BookingRequest, BookingStatus
 from models.academic import Course, DurationMode
-from core.constants import TIME_SLOTS
+from core.time_slots import slot_times
 
 # Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -84,11 +84,8 @@ def get_next_day_date(day_name: str):
     return min(candidates) if candidates else today
 
 def get_time_from_slot(slot_id: int):
-    slot_str = TIME_SLOTS.get(slot_id)
-    if not slot_str:
-        return datetime.time(0, 0)
-    start_str = slot_str.split(' - ')[0]
-    return datetime.datetime.strptime(start_str, "%I:%M %p").time()
+    times = slot_times(slot_id)
+    return times[0] if times else datetime.time(0, 0)
 
 def clear_calendar(creds: Credentials):
     """
@@ -181,11 +178,9 @@ def sync_schedule(user: User, creds: Credentials, db: Session):
     ).all()
 
     for booking in bookings:
-        slot_str = TIME_SLOTS.get(booking.time_slot_id)
-        if slot_str:
-            start_str, end_str = slot_str.split(' - ')
-            start_time = datetime.datetime.strptime(start_str, "%I:%M %p").time()
-            end_time = datetime.datetime.strptime(end_str, "%I:%M %p").time()
+        times = slot_times(booking.time_slot_id)
+        if times:
+            start_time, end_time = times
             
             start_dt = datetime.datetime.combine(booking.booking_date, start_time)
             end_dt = datetime.datetime.combine(booking.booking_date, end_time)
@@ -0,0 +1,180 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.constants import TIME_SLOTS, LAB_SLOT_MAPPING, LAB_DAYS
+
+# Day -> row of the occupancy grid
+DAY_INDEX = {day: i for i, day in enumerate(LAB_DAYS)}
+
+def slot_mask(slots: Iterable[int]) -> int:
+    """
+    Bitmask of theory slot ids (bit n set for slot n).
+    """
+    mask = 0
+    for s in slots:
+        mask |= 1 << s
+    return mask
+
+# Precomputed masks: a theory slot covers itself, a lab slot covers the theory slots it merges.
+THEORY_SLOT_MASKS = {slot: 1 << slot for slot in TIME_SLOTS.keys()}
+LAB_SLOT_MASKS = {slot: slot_mask(covered) for slot, covered in LAB_SLOT_MAPPING.items()}
+
+# Bits per day in a week mask (slot ids are 1-based)
+WEEK_SLOT_BITS = max(TIME_SLOTS.keys()) + 1
+
+def week_mask(days: Iterable[str], slots: int) -> int:
+    """
+    Bitmask of (day, slot) cells: the slot mask shifted into each day's field.
+    Two placements overlap exactly when their week masks share a bit.
+    """
+    mask = 0
+    for day in days:
+        mask |= slots << (DAY_INDEX[day] * WEEK_SLOT_BITS)
+    return mask
+
+def mask_slots(mask: int) -> List[int]:
+    """
+    Theory slot ids contained in a slot mask, ascending.
+    """
+    return [s for s in TIME_SLOTS.keys() if mask >> s & 1]
+
+class OccupancyGrid:
+    """
+    Occupied (day, slot) cells for a set of entities (rooms or teachers).
+
+    Stored transposed: busy[day][slot] is an int whose bit i is set when the entity with
+    dense index i is occupied at that cell. "Which of these rooms are free on these days
+    and slots" is therefore a handful of ORs and one AND-NOT for the whole inventory.
+    """
+    def __init__(self, entity_ids: Iterable[int]):
+        self.ids: List[int] = list(entity_ids)
+        self.index: Dict[int, int] = {eid: i for i, eid in enumerate(self.ids)}
+        self.busy: List[List[int]] = [[0] * (max(TIME_SLOTS.keys()) + 1) for _ in LAB_DAYS]
+
+    def mask_of(self, entity_ids: Iterable[int]) -> int:
+        """
+        Entity bitmask for a subset of the grid's entities (e.g. all rooms of one type).
+        """
+        mask = 0
+        for eid in entity_ids:
+            if eid in self.index:
+                mask |= 1 << self.index[eid]
+        return mask
+
+    def busy_mask(self, days: Iterable[str], slots: int) -> Optional[int]:
+        """
+        Entities occupied in any of the given cells, or None if a day is not schedulable.
+        """
+        busy = 0
+        for day in days:
+            if day not in DAY_INDEX:
+                return None
+            row = self.busy[DAY_INDEX[day]]
+            s = 0
+            while slots >> s:
+                if slots >> s & 1:
+                    busy |= row[s]
+                s += 1
+        return busy
+
+    def free(self, pool: int, days: Iterable[str], slots: int) -> int:
+        """
+        Subset of the entity mask `pool` that is free on all given days and slots.
+        """
+        busy = self.busy_mask(days, slots)
+        if busy is None:
+            return 0
+        return pool & ~busy
+
+    def is_free(self, entity_id: int, days: Iterable[str], slots: int) -> bool:
+        if entity_id not in self.index:
+            return True
+        return self.free(1 << self.index[entity_id], days, slots) != 0
+
+    def mark(self, entity_id: int, days: Iterable[str], slots: int):
+        bit = 1 << self.index[entity_id]
+        for day in days:
+            row = self.busy[DAY_INDEX[day]]
+            for s in mask_slots(slots):
+                row[s] |= bit
+
+    def unmark(self, entity_id: int, days: Iterable[str], slots: int):
+        # A cell holds at most one placement per entity, so clearing the bit frees it
+        bit = 1 << self.index[entity_id]
+        for day in days:
+            row = self.busy[DAY_INDEX[day]]
+            for s in mask_slots(slots):
+                row[s] &= ~bit
+
+    def first(self, mask: int) -> Optional[int]:
+        """
+        Entity id of the lowest set bit (the earliest entity in load order).
+        """
+        if not mask:
+            return None
+        return self.ids[(mask & -mask).bit_length() - 1]
+
+class ScheduleOccupancy:
+    """
+    Room and teacher occupancy kept in separate grids, so room 7 and teacher 7 never
+    block each other.
+    """
+    def __init__(self, room_ids: Iterable[int], teacher_ids: Iterable[int]):
+        self.rooms = OccupancyGrid(room_ids)
+        self.teachers = OccupancyGrid(teacher_ids)
+
+    def free_rooms(self, pool: int, teacher_id: Optional[int], days: Iterable[str], slots: int) -> int:
+        """
+        Rooms of the room mask `pool` that are free on all given days and slots, or 0 when
+        the teacher is busy. A teacher_id of None (TBA) skips the teacher check.
+        """
+        if teacher_id is not None and not self.teachers.is_free(teacher_id, days, slots):
+            return 0
+        return self.rooms.free(pool, days, slots)
+
+    def is_free(self, room_id: int, teacher_id: Optional[int], days: Iterable[str], slots: int) -> bool:
+        return self.free_rooms(self.rooms.mask_of([room_id]), teacher_id, days, slots) != 0
+
+    def mark(self, room_id: int, teacher_id: Optional[int], days: Iterable[str], slots: int):
+        self.rooms.mark(room_id, days, slots)
+        if teacher_id is not None:
+            self.teachers.mark(teacher_id, days, slots)
+
+    def unmark(self, room_id: int, teacher_id: Optional[int], days: Iterable[str], slots: int):
+        self.rooms.unmark(room_id, days, slots)
+        if teacher_id is not None:
+            self.teachers.unmark(teacher_id, days, slots)
+
+def sibling_key(course_code: str, section_number: int) -> Tuple[str, int]:
+    """
+    Key shared by a theory section and its lab sibling (CSE115 / CSE115L, same section number).
+    """
+    base_code = course_code[:-1] if course_code.endswith('L') else course_code
+    return (base_code, section_number)
+
+class SiblingIndex:
+    """
+    Occupied day/slot masks of placed sections, grouped by sibling key.
+
+    Replaces querying ClassSchedule for the sibling's rows: a conflict check is one AND
+    per day against the masks of the other sections in the group.
+    """
+    def __init__(self):
+        self.placed: Dict[Tuple[str, int], Dict[int, List[int]]] = defaultdict(dict)
+
+    def add(self, key: Tuple[str, int], section_id: int, days: Iterable[str], slots: int):
+        day_masks = self.placed[key].setdefault(section_id, [0] * len(LAB_DAYS))
+        for day in days:
+            day_masks[DAY_INDEX[day]] |= slots
+
+    def conflicts(self, key: Tuple[str, int], section_id: int, days: Iterable[str], slots: int) -> bool:
+        group = self.placed.get(key)
+        if not group:
+            return False
+        for other_id, day_masks in group.items():
+            if other_id == section_id:
+                continue
+            for day in days:
+                if day in DAY_INDEX and day_masks[DAY_INDEX[day]] & slots:
+                    return True
+        return False
@@ -0,0 +1,53 @@
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class RunProfile:
+    """
+    Wall time per phase and event counters of one scheduler run, cheap enough to leave on in production.
+
+    Sequential phases use lap(): the time since the previous lap (or start) is booked to the phase.
+    Hot loops accumulate locally and book once with add_time()/count().
+    """
+    def __init__(self):
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._last = time.perf_counter()
+        self._db: Optional[Session] = None
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.timings[phase] += now - self._last
+        self._last = now
+
+    def add_time(self, phase: str, seconds: float):
+        self.timings[phase] += seconds
+
+    def count(self, counter: str, n: int = 1):
+        self.counters[counter] += n
+
+    def watch_queries(self, db: Session):
+        """
+        Counts statements executed through this session (queries, lazy loads, bulk writes) as db_queries.
+        """
+        self.unwatch_queries()
+        self._db = db
+        self.counters["db_queries"] += 0
+        event.listen(db, "do_orm_execute", self._on_execute)
+
+    def unwatch_queries(self):
+        if self._db is not None:
+            event.remove(self._db, "do_orm_execute", self._on_execute)
+            self._db = None
+
+    def _on_execute(self, orm_execute_state):
+        self.counters["db_queries"] += 1
+
+    def timings_rounded(self) -> Dict[str, float]:
+        return {phase: round(seconds, 4) for phase, seconds in self.timings.items()}
@@ -0,0 +1,254 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, asc, case, desc, func, or_, text
+from sqlalchemy.orm import Query, Session
+
+from core.time_slots import DAY_ORDINALS, UNKNOWN_DAY_ORDINAL
+from models.academic import Course, Room
+from models.schedule import ClassSchedule, ScheduleView, Section
+from models.teacher import Teacher
+from services.eager_loading import SCHEDULE_RESPONSE, SCHEDULE_RESPONSE_JOINED
+from services.search import matching_ids, search_filter, search_rank
+
+TOTAL_MODES = ("exact", "cached", "estimate", "none")
+TOTAL_CACHE_SECONDS = 30
+TOTAL_CACHE_SIZE = 256   # Search terms kept; the least recently used one goes first
+
+# Patterns sort with their first day; the read table stores the same ordinal as day_order
+DAY_ORDER = case(DAY_ORDINALS, value=ClassSchedule.day, else_=UNKNOWN_DAY_ORDINAL)
+
+# Sort key -> expression. Nullable columns are coalesced so a cursor can compare them
+# (a NULL never compares equal); rows without a teacher or availability sort first.
+SORT_KEYS = {
+    'day': DAY_ORDER,
+    'time': ClassSchedule.time_slot_id,
+    'course': Course.code,
+    'section': Section.section_number,
+    'faculty': func.coalesce(Teacher.initial, ''),
+    'room': Room.room_number,
+    'availability': func.coalesce(ClassSchedule.availability, -1),
+    'id': ClassSchedule.id,
+}
+
+# The same keys on the read table (services.schedule_view), where they are plain columns
+VIEW_SORT_KEYS = {
+    'day': ScheduleView.day_order,
+    'time': ScheduleView.time_slot_id,
+    'course': ScheduleView.course_code,
+    'section': ScheduleView.section_number,
+    'faculty': ScheduleView.teacher_initial,
+    'room': ScheduleView.room_number,
+    'availability': func.coalesce(ScheduleView.availability, -1),
+    'id': ScheduleView.id,
+}
+
+# What a search matches, on the join and on the read table
+SEARCH_COLUMNS = (Course.code, Course.title, Room.room_number, Teacher.initial)
+VIEW_SEARCH_COLUMNS = (ScheduleView.course_code, ScheduleView.course_title, ScheduleView.room_number, ScheduleView.teacher_initial)
+
+# (from read table, search term) -> (total, time counted), least recently used first.
+# Bounded: /public/schedules is anonymous, and every distinct search term is a key.
+# Shared by the request threads, so every access holds _totals_lock. The cache is per process:
+# invalidate_totals() only clears this worker's copy, so with several uvicorn workers the
+# others may serve a total up to TOTAL_CACHE_SECONDS old after a write (use total=exact
+# where that matters).
+_totals: "OrderedDict[Tuple[bool, str], Tuple[int, float]]" = OrderedDict()
+_totals_lock = threading.Lock()
+_totals_generation = 0   # Bumped by invalidate_totals; a count started before it is not stored
+
+class InvalidCursorError(ValueError):
+    pass
+
+@dataclass
+class SchedulePage:
+    items: List[ClassSchedule]
+    total: Optional[int]          # None when not requested
+    next_cursor: Optional[str]    # None on the last page
+
+def parse_sort(sort_by: str, sort_order: str, sort_keys: Dict = SORT_KEYS) -> List[Tuple[str, bool]]:
+    """
+    "day,time" / "asc,desc" -> [(key, descending)], keys missing from sort_keys dropped, ending
+    with the time and id tie-breakers so the order is total (a cursor needs a unique position).
+    """
+    keys = [k.strip() for k in sort_by.split(',')]
+    orders = [o.strip() for o in sort_order.split(',')]
+    spec = []
+    for i, key in enumerate(keys):
+        if key in sort_keys and key != 'id' and key not in (k for k, _ in spec):
+            spec.append((key, (orders[i] if i < len(orders) else 'asc') == 'desc'))
+    for key in ('time', 'id'):
+        if key not in (k for k, _ in spec):
+            spec.append((key, False))
+    return spec
+
+def base_query(db: Session, search: str = "") -> Query:
+    # Explicit ON clauses: the sort columns added later must not change how the joins resolve
+    query = (
+        db.query(ClassSchedule)
+        .join(Section, ClassSchedule.section_id == Section.id)
+        .join(Course, Section.course_id == Course.id)
+        .join(Room, ClassSchedule.room_id == Room.id)
+        .outerjoin(Teacher, Section.teacher_id == Teacher.id)
+    )
+    if search:
+        # Each table is searched on its own index, then joined back by id
+        query = query.filter(
+            Section.course_id.in_(matching_ids(db, (Course.code, Course.title), search)) |
+            ClassSchedule.room_id.in_(matching_ids(db, (Room.room_number,), search)) |
+            Section.teacher_id.in_(matching_ids(db, (Teacher.initial,), search))
+        )
+    return query
+
+def view_query(db: Session, search: str = "") -> Query:
+    # The ids of matching read rows; one table, no joins
+    query = db.query(ScheduleView.id)
+    if search:
+        query = query.filter(search_filter(db, VIEW_SEARCH_COLUMNS, search))
+    return query
+
+def encode_cursor(spec: List[Tuple[str, bool]], search: str, values: List) -> str:
+    payload = json.dumps({"s": [[k, d] for k, d in spec], "q": search, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, spec: List[Tuple[str, bool]], search: str) -> List:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["v"]
+        same_listing = [tuple(s) for s in payload["s"]] == spec and payload["q"] == search
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+    if not same_listing or len(values) != len(spec):
+        raise InvalidCursorError("Cursor belongs to a different search or sort order")
+    return values
+
+def _after(sort_keys: Dict, spec: List[Tuple[str, bool]], values: List):
+    """
+    Rows strictly after `values` in the spec's order: (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+    Spelled out per key because the directions may be mixed.
+    """
+    clauses = []
+    for i, (key, descending) in enumerate(spec):
+        column = sort_keys[key]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[sort_keys[k] == v for (k, _), v in zip(spec[:i], values[:i])], step))
+    return or_(*clauses)
+
+def count_schedules(db: Session, search: str = "", mode: str = "cached", from_view: bool = False) -> Optional[int]:
+    """
+    Total rows of a listing:
+    - exact: a COUNT over the join (or the read table)
+    - cached: the exact count, reused for TOTAL_CACHE_SECONDS per search term
+    - estimate: without a search, the planner's row estimate on PostgreSQL (the table count
+      elsewhere), skipping the join; with a search, the cached count
+    - none: no count
+    """
+    if mode == "none":
+        return None
+    model = ScheduleView if from_view else ClassSchedule
+    if mode == "estimate" and not search:
+        if db.get_bind().dialect.name == "postgresql":
+            estimate = db.execute(text("SELECT reltuples FROM pg_class WHERE relname = :t"),
+                                  {"t": model.__tablename__}).scalar()
+            # reltuples is -1 (or 0 before PG 14) until the table is first analyzed
+            if estimate and estimate > 0:
+                return int(estimate)
+        return db.query(func.count(model.id)).scalar()
+
+    now = time.monotonic()
+    key = (from_view, search)
+    with _totals_lock:
+        generation = _totals_generation
+        if mode != "exact":
+            hit = _totals.get(key)
+            if hit and now - hit[1] < TOTAL_CACHE_SECONDS:
+                _totals.move_to_end(key)
+                return hit[0]
+            if hit:
+                del _totals[key]
+    # Counted outside the lock: other requests keep reading the cache meanwhile
+    total = (view_query if from_view else base_query)(db, search).count()
+    with _totals_lock:
+        if generation == _totals_generation:
+            _totals[key] = (total, now)
+            _totals.move_to_end(key)
+            while len(_totals) > TOTAL_CACHE_SIZE:
+                _totals.popitem(last=False)
+    return total
+
+def invalidate_totals():
+    # Called by services.schedule_view whenever the read table changes (in this process only)
+    global _totals_generation
+    with _totals_lock:
+        _totals_generation += 1
+        _totals.clear()
+
+def schedule_page(
+    db: Session,
+    limit: int = 50,
+    search: str = "",
+    sort_by: str = "day",
+    sort_order: str = "asc",
+    cursor: Optional[str] = None,
+    page: int = 1,
+    total: str = "cached",
+    from_view: bool = False,
+) -> SchedulePage:
+    """
+    One page of the schedule listing shared by /admin/schedules and /public/schedules.
+
+    With a cursor (the next_cursor of the previous page) the page starts right after that row,
+    so every page costs the same as the first. Without one, `page` falls back to OFFSET for
+    clients that jump to a page number. Raises ValueError for an unknown total mode and
+    InvalidCursorError for a cursor of another listing.
+
+    from_view filters, sorts and counts on the schedule_view read table alone and then loads
+    the page's rows by id; otherwise the live five-way join is used.
+    """
+    if total not in TOTAL_MODES:
+        raise ValueError(f"Unknown total mode: {total} (use one of {', '.join(TOTAL_MODES)})")
+    limit = max(1, limit)
+    sort_keys = VIEW_SORT_KEYS if from_view else SORT_KEYS
+    if search.strip():
+        # sort_by=relevance: exact, then prefix, then word-prefix matches first
+        sort_keys = {**sort_keys, 'relevance': search_rank(VIEW_SEARCH_COLUMNS if from_view else SEARCH_COLUMNS, search)}
+    spec = parse_sort(sort_by, sort_order, sort_keys)
+    columns = [sort_keys[key] for key, _ in spec]
+
+    if from_view:
+        query = view_query(db, search)
+    else:
+        # The joins of the base query also fill section, course, room and teacher
+        query = base_query(db, search).options(*SCHEDULE_RESPONSE_JOINED)
+    # The sort values come back with each row and become the next cursor
+    query = (
+        query.add_columns(*[column.label(f"k{i}") for i, column in enumerate(columns)])
+        .order_by(*[desc(c) if descending else asc(c) for c, (_, descending) in zip(columns, spec)])
+    )
+    if cursor:
+        query = query.filter(_after(sort_keys, spec, decode_cursor(cursor, spec, search)))
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+
+    # One row extra tells if there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(spec, search, list(rows[-1][1:]))
+
+    if from_view:
+        ids = [row[0] for row in rows]
+        loaded = {s.id: s for s in db.query(ClassSchedule).filter(ClassSchedule.id.in_(ids)).options(*SCHEDULE_RESPONSE)}
+        # A row deleted since the read table was last synced is skipped
+        items = [loaded[i] for i in ids if i in loaded]
+    else:
+        items = [row[0] for row in rows]
+
+    return SchedulePage(items=items, total=count_schedules(db, search, total, from_view), next_cursor=next_cursor)
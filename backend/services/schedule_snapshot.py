@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from models.academic import Course, Room
+from models.schedule import ClassSchedule, ScheduleView, Section
+from models.teacher import Teacher, TeacherPreference, TeacherTimingPreference
+from services.schedule_writer import insert_class_schedules, update_section_teachers
+from services.schedule_view import refresh_schedule_view
+# The rest of the mapped models, as main.py imports them: relationships resolve by class name,
+# and a spawned worker process never imports main.py.
+import models.admin, models.booking, models.chat, models.notification, models.settings, models.student, models.user, models.verification  # noqa: F401,E401
+
+# Everything a scheduler reads or writes, in foreign-key order
+SNAPSHOT_MODELS = [Room, Course, Teacher, Section, TeacherPreference, TeacherTimingPreference, ClassSchedule]
+
+@dataclass
+class ScheduleSnapshot:
+    """
+    Plain-row copy of the scheduler inputs (and the current schedule).
+
+    Picklable, so it can be shipped to worker processes; open_session() restores it into
+    a private in-memory SQLite database where any scheduler runs unchanged.
+    """
+    tables: Dict[str, List[Dict]] = field(default_factory=dict)
+
+    def open_session(self) -> Session:
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        # The read table is created empty: schedulers refresh it when they write, nothing reads it here
+        Base.metadata.create_all(engine, tables=[m.__table__ for m in SNAPSHOT_MODELS] + [ScheduleView.__table__])
+        with engine.begin() as conn:
+            for model in SNAPSHOT_MODELS:
+                rows = self.tables.get(model.__tablename__)
+                if rows:
+                    conn.execute(insert(model.__table__), rows)
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+def take_snapshot(db: Session) -> ScheduleSnapshot:
+    """
+    One SELECT per table; ensure the TBA teacher exists before taking it.
+    """
+    tables = {}
+    for model in SNAPSHOT_MODELS:
+        tables[model.__tablename__] = [dict(row) for row in db.execute(select(model.__table__)).mappings()]
+    return ScheduleSnapshot(tables=tables)
+
+def read_schedule(db: Session) -> Tuple[List[Dict], Dict[int, Optional[int]]]:
+    """
+    The schedule held by a session as plain rows: (class schedule rows without ids, section id -> teacher id).
+    """
+    schedules = [
+        {k: v for k, v in dict(row).items() if k != "id"}
+        for row in db.execute(select(ClassSchedule.__table__)).mappings()
+    ]
+    teacher_ids = {section_id: teacher_id for section_id, teacher_id in db.query(Section.id, Section.teacher_id).all()}
+    return schedules, teacher_ids
+
+def write_schedule(db: Session, schedules: List[Dict], teacher_ids: Dict[int, Optional[int]]):
+    """
+    Replaces the stored schedule with the given rows (as returned by read_schedule).
+    """
+    db.query(ClassSchedule).delete(synchronize_session=False)
+    insert_class_schedules(db, schedules)
+    update_section_teachers(db, teacher_ids)
+    refresh_schedule_view(db)
+    db.commit()
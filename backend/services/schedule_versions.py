@@ -0,0 +1,210 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from models.academic import Course, Room
+from models.schedule import ClassSchedule, ScheduleVersion, ScheduleVersionEntry, Section
+from models.teacher import Teacher
+from services.schedule_view import refresh_schedule_view
+from services.schedule_writer import SCHEDULE_COLUMNS
+
+KEEP_VERSIONS = 50   # Older versions are pruned when a new one is saved
+
+def save_version(db: Session, result=None, source: str = "manual", label: Optional[str] = None) -> ScheduleVersion:
+    """
+    Stores the schedule currently in the DB as a new version and commits.
+    `result` is the RunResult that produced it; without one the stored schedule is scored first.
+    The rows are copied with one INSERT ... SELECT, nothing is loaded into Python.
+    """
+    if result is None:
+        # Local import: the scheduler module is heavy (OR-Tools) and only needed here
+        from services.cp_sat_scheduler import CpSatAutoScheduler
+        result = CpSatAutoScheduler().evaluate(db)
+
+    quality = result.quality
+    version = ScheduleVersion(
+        label=label,
+        source=source,
+        total_sections=result.total_sections,
+        total_scheduled=result.total_scheduled,
+        assigned_non_tba=result.assigned_non_tba,
+        assigned_tba=result.assigned_tba,
+        mean_score=quality.mean_score,
+        min_score=quality.min_score,
+        variance=quality.variance,
+        overall_score=quality.overall_score,
+        teacher_scores=json.dumps(quality.teacher_scores),
+    )
+    db.add(version)
+    db.flush()
+
+    entries = ScheduleVersionEntry.__table__
+    schedules = ClassSchedule.__table__
+    sections = Section.__table__
+    db.execute(
+        insert(entries).from_select(
+            ["version_id", "section_id", "room_id", "day", "time_slot_id", "teacher_id", "is_friday_booking"],
+            select(
+                literal(version.id), schedules.c.section_id, schedules.c.room_id, schedules.c.day,
+                schedules.c.time_slot_id, sections.c.teacher_id, schedules.c.is_friday_booking,
+            ).select_from(schedules.join(sections, sections.c.id == schedules.c.section_id)),
+        )
+    )
+
+    _prune_versions(db)
+    db.commit()
+    return version
+
+def _prune_versions(db: Session):
+    stale = select(ScheduleVersion.id).order_by(ScheduleVersion.id.desc()).offset(KEEP_VERSIONS)
+    stale_ids = [row[0] for row in db.execute(stale)]
+    if not stale_ids:
+        return
+    # Entries first: SQLite does not enforce ON DELETE CASCADE without a pragma
+    db.execute(delete(ScheduleVersionEntry.__table__).where(ScheduleVersionEntry.version_id.in_(stale_ids)))
+    db.execute(delete(ScheduleVersion.__table__).where(ScheduleVersion.id.in_(stale_ids)))
+
+def list_versions(db: Session, limit: int = KEEP_VERSIONS) -> List[Tuple[ScheduleVersion, int]]:
+    """
+    Newest first, with the number of schedule rows in each version.
+    """
+    row_counts = (
+        select(ScheduleVersionEntry.version_id, func.count().label("rows"))
+        .group_by(ScheduleVersionEntry.version_id)
+        .subquery()
+    )
+    return (
+        db.query(ScheduleVersion, func.coalesce(row_counts.c.rows, 0))
+        .outerjoin(row_counts, row_counts.c.version_id == ScheduleVersion.id)
+        .order_by(ScheduleVersion.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+def _placements(db: Session, version_id: int) -> Dict[int, Dict]:
+    """
+    A version's rows folded per section: room, day (pattern), sorted slots and teacher.
+    """
+    return _fold(db.execute(
+        select(
+            ScheduleVersionEntry.section_id, ScheduleVersionEntry.room_id, ScheduleVersionEntry.day,
+            ScheduleVersionEntry.time_slot_id, ScheduleVersionEntry.teacher_id,
+        ).where(ScheduleVersionEntry.version_id == version_id)
+    ))
+
+def _fold(rows) -> Dict[int, Dict]:
+    placements = {}
+    for section_id, room_id, day, slot, teacher_id in rows:
+        p = placements.setdefault(section_id, {"room_id": room_id, "day": day, "time_slots": [], "teacher_id": teacher_id})
+        p["time_slots"].append(slot)
+    for p in placements.values():
+        p["time_slots"].sort()
+    return placements
+
+def load_placements(db: Session, version_id: Optional[int] = None) -> Dict[int, Dict]:
+    """
+    Placements per section id, as used for a warm start: those of a stored version, or of the
+    live schedule when version_id is None. One query either way.
+    """
+    if version_id is not None:
+        return _placements(db, version_id)
+    return _fold(db.execute(
+        select(
+            ClassSchedule.section_id, ClassSchedule.room_id, ClassSchedule.day,
+            ClassSchedule.time_slot_id, Section.teacher_id,
+        ).join(Section, Section.id == ClassSchedule.section_id)
+    ))
+
+def compare_placements(before: Dict[int, Dict], after: Dict[int, Dict]) -> Tuple[Dict[str, int], List[Dict]]:
+    """
+    Per-section changes between two placement maps (see load_placements):
+    added / removed sections, moved (room, day or slots changed) and teacher changes.
+    Returns (counts, changes); unchanged sections are only counted.
+    """
+    changes = []
+    counts = {"added": 0, "removed": 0, "moved": 0, "teacher_changed": 0, "unchanged": 0}
+    for section_id in sorted(before.keys() | after.keys()):
+        old, new = before.get(section_id), after.get(section_id)
+        if old is None:
+            kinds = ["added"]
+        elif new is None:
+            kinds = ["removed"]
+        else:
+            kinds = []
+            if (old["room_id"], old["day"], old["time_slots"]) != (new["room_id"], new["day"], new["time_slots"]):
+                kinds.append("moved")
+            if old["teacher_id"] != new["teacher_id"]:
+                kinds.append("teacher_changed")
+        if not kinds:
+            counts["unchanged"] += 1
+            continue
+        for kind in kinds:
+            counts[kind] += 1
+        changes.append({"section_id": section_id, "changes": kinds, "before": old, "after": new})
+    return counts, changes
+
+def diff_versions(db: Session, from_id: int, to_id: int) -> Dict:
+    """
+    Per-section changes going from one version to another, with course code and section number.
+    """
+    counts, changes = compare_placements(_placements(db, from_id), _placements(db, to_id))
+
+    # Course code and section number for the changed sections (sections deleted since keep only the id)
+    labels = {}
+    changed_ids = [c["section_id"] for c in changes]
+    if changed_ids:
+        labels = {
+            sid: (code, number)
+            for sid, code, number in db.query(Section.id, Course.code, Section.section_number)
+            .join(Course, Section.course_id == Course.id)
+            .filter(Section.id.in_(changed_ids))
+        }
+    for change in changes:
+        code, number = labels.get(change["section_id"], (None, None))
+        change["course_code"], change["section_number"] = code, number
+
+    return {"from_version": from_id, "to_version": to_id, "counts": counts, "changes": changes}
+
+def restore_version(db: Session, version_id: int) -> Dict[str, int]:
+    """
+    Replaces the live schedule with a stored version and commits: one DELETE, one INSERT ... SELECT
+    and one UPDATE of all section teachers. Rows whose section or room no longer exists are skipped,
+    and teachers deleted since fall back to no teacher. Sections absent from the version end up
+    unscheduled and without a teacher, as after the run that produced it.
+    """
+    entries = ScheduleVersionEntry.__table__
+    sections = Section.__table__
+    rooms = Room.__table__
+    teachers = Teacher.__table__
+
+    total = db.query(func.count(ScheduleVersionEntry.id)).filter(ScheduleVersionEntry.version_id == version_id).scalar()
+
+    db.query(ClassSchedule).delete(synchronize_session=False)
+    inserted = db.execute(
+        insert(ClassSchedule.__table__).from_select(
+            SCHEDULE_COLUMNS,
+            select(
+                entries.c.section_id, entries.c.room_id, entries.c.day, entries.c.time_slot_id,
+                entries.c.is_friday_booking, rooms.c.capacity,
+            )
+            .select_from(
+                entries.join(sections, sections.c.id == entries.c.section_id).join(rooms, rooms.c.id == entries.c.room_id)
+            )
+            .where(entries.c.version_id == version_id),
+        )
+    ).rowcount
+
+    # Correlated on sections.id; every row of a section carries the same teacher
+    teacher = (
+        select(func.max(entries.c.teacher_id))
+        .select_from(entries.join(teachers, teachers.c.id == entries.c.teacher_id))
+        .where(entries.c.version_id == version_id, entries.c.section_id == sections.c.id)
+        .scalar_subquery()
+    )
+    db.execute(update(sections).values(teacher_id=teacher))
+    refresh_schedule_view(db)
+    db.commit()
+
+    return {"restored_rows": inserted, "skipped_rows": total - inserted}
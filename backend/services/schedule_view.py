@@ -0,0 +1,89 @@
+from typing import Iterable
+
+from sqlalchemy import case, delete, func, insert, or_, select, union
+from sqlalchemy.orm import Session
+
+from core.time_slots import DAY_ORDINALS, THEORY_SLOTS, UNKNOWN_DAY_ORDINAL, slot_hms
+from models.academic import Course, Room
+from models.schedule import ClassSchedule, ScheduleView, Section
+from models.teacher import Teacher
+from services.schedule_query import invalidate_totals
+
+VIEW_COLUMNS = [
+    "id", "section_id", "course_id", "teacher_id", "room_id", "course_code", "course_title", "section_number",
+    "teacher_initial", "room_number", "day", "day_order", "time_slot_id", "start_time", "end_time", "availability",
+]
+
+def _source():
+    """
+    The flattened rows, computed in the database: the join public listings used to run per request.
+    Rows whose section, course or room is missing are left out, as that join did.
+    """
+    no_slot = slot_hms(0)
+    return (
+        select(
+            ClassSchedule.id, ClassSchedule.section_id, Section.course_id, Section.teacher_id, ClassSchedule.room_id,
+            Course.code, Course.title, Section.section_number, func.coalesce(Teacher.initial, ""), Room.room_number,
+            ClassSchedule.day,
+            case(DAY_ORDINALS, value=ClassSchedule.day, else_=UNKNOWN_DAY_ORDINAL),
+            ClassSchedule.time_slot_id,
+            case({s: slot_hms(s)[0] for s in THEORY_SLOTS}, value=ClassSchedule.time_slot_id, else_=no_slot[0]),
+            case({s: slot_hms(s)[1] for s in THEORY_SLOTS}, value=ClassSchedule.time_slot_id, else_=no_slot[1]),
+            ClassSchedule.availability,
+        )
+        .select_from(ClassSchedule)
+        .join(Section, ClassSchedule.section_id == Section.id)
+        .join(Course, Section.course_id == Course.id)
+        .join(Room, ClassSchedule.room_id == Room.id)
+        .outerjoin(Teacher, Section.teacher_id == Teacher.id)
+    )
+
+def refresh_schedule_view(db: Session):
+    """
+    Rebuilds the whole read table with one DELETE and one INSERT ... SELECT, inside the caller's
+    transaction (the caller commits). Used after a scheduler run replaces the schedule.
+    """
+    db.flush()
+    db.execute(delete(ScheduleView.__table__))
+    db.execute(insert(ScheduleView.__table__).from_select(VIEW_COLUMNS, _source()))
+    invalidate_totals()
+
+def sync_schedule_view(
+    db: Session,
+    schedule_ids: Iterable[int] = (),
+    section_ids: Iterable[int] = (),
+    course_ids: Iterable[int] = (),
+    room_ids: Iterable[int] = (),
+    teacher_ids: Iterable[int] = (),
+):
+    """
+    Re-derives the read rows touched by an admin write, inside the caller's transaction:
+    rows of the given schedules, and every row of the given sections, courses, rooms and
+    teachers (a renamed room or teacher changes all of its rows). Pending ORM changes are
+    flushed first, so deleted rows drop out and new ones come in.
+    """
+    keys = [
+        (ScheduleView.id, ClassSchedule.id, schedule_ids),
+        (ScheduleView.section_id, ClassSchedule.section_id, section_ids),
+        (ScheduleView.course_id, Section.course_id, course_ids),
+        (ScheduleView.room_id, ClassSchedule.room_id, room_ids),
+        (ScheduleView.teacher_id, Section.teacher_id, teacher_ids),
+    ]
+    keys = [(view_column, source_column, list(ids)) for view_column, source_column, ids in keys]
+    keys = [key for key in keys if key[2]]
+    if not keys:
+        return
+
+    db.flush()
+    # Rows matching either before (read table) or after (source) the write: a section moved to
+    # another teacher is found under the old teacher id in one and the new one in the other
+    affected = union(
+        select(ScheduleView.id).where(or_(*[view_column.in_(ids) for view_column, _, ids in keys])),
+        _source().with_only_columns(ClassSchedule.id).where(or_(*[source_column.in_(ids) for _, source_column, ids in keys])),
+    )
+    affected_ids = [row[0] for row in db.execute(affected)]
+    if not affected_ids:
+        return
+    db.execute(delete(ScheduleView.__table__).where(ScheduleView.id.in_(affected_ids)))
+    db.execute(insert(ScheduleView.__table__).from_select(VIEW_COLUMNS, _source().where(ClassSchedule.id.in_(affected_ids))))
+    invalidate_totals()
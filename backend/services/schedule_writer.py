@@ -0,0 +1,71 @@
+import csv
+import io
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, bindparam, cast, column, insert, update, values
+from sqlalchemy.orm import Session
+
+from models.schedule import ClassSchedule, Section
+
+BATCH_SIZE = 1000   # Rows per UPDATE ... FROM (VALUES ...) statement
+
+SCHEDULE_COLUMNS = ["section_id", "room_id", "day", "time_slot_id", "is_friday_booking", "availability"]
+
+def insert_class_schedules(db: Session, rows: List[Dict]):
+    """
+    Inserts ClassSchedule rows (dicts of SCHEDULE_COLUMNS) in bulk, inside the session's transaction.
+    PostgreSQL uses COPY; other databases a single executemany INSERT.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_class_schedules(db, rows)
+    else:
+        db.execute(insert(ClassSchedule.__table__), [{c: row.get(c) for c in SCHEDULE_COLUMNS} for row in rows])
+
+def _copy_class_schedules(db: Session, rows: List[Dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # CSV COPY: an empty unquoted field is NULL
+        writer.writerow([
+            "" if row.get(c) is None else ("t" if row[c] is True else "f" if row[c] is False else row[c])
+            for c in SCHEDULE_COLUMNS
+        ])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {ClassSchedule.__tablename__} ({', '.join(SCHEDULE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+def update_section_teachers(db: Session, teacher_ids: Dict[int, Optional[int]]):
+    """
+    Sets Section.teacher_id for many sections at once.
+    PostgreSQL gets one UPDATE ... FROM (VALUES ...) per batch; other databases an executemany UPDATE.
+    """
+    if not teacher_ids:
+        return
+    sections = Section.__table__
+    items = list(teacher_ids.items())
+
+    if db.get_bind().dialect.name == "postgresql":
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = values(
+                column("id", Integer), column("teacher_id", Integer), name="v"
+            ).data(items[start:start + BATCH_SIZE])
+            db.execute(
+                update(sections)
+                .where(sections.c.id == batch.c.id)
+                # Cast: a batch of only NULLs would otherwise be typed text
+                .values(teacher_id=cast(batch.c.teacher_id, Integer))
+            )
+    else:
+        db.execute(
+            update(sections).where(sections.c.id == bindparam("section_id")).values(teacher_id=bindparam("new_teacher_id")),
+            [{"section_id": sid, "new_teacher_id": tid} for sid, tid in items],
+        )
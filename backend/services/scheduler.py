@@ -1,195 +1,195 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_, and_, func
 from typing import List, Dict, Optional, Tuple, Set
 from models.schedule import ClassSchedule, Section
 from models.academic import Room, Course, ClassType, DurationMode
-from models.teacher import Teacher, TeacherPreference, TeacherTimingPreference
+from models.teacher import Teacher, TeacherPreference
 from models.user import User, UserRole
-from core.constants import TIME_SLOTS, LAB_TIME_SLOTS, LAB_SLOT_MAPPING, THEORY_DAYS, LAB_DAYS
+from core.constants import THEORY_DAYS, LAB_DAYS
+from core.time_slots import THEORY_SLOTS, LAB_SLOTS, days_of
+from services.occupancy import OccupancyGrid, SiblingIndex, sibling_key, THEORY_SLOT_MASKS, LAB_SLOT_MASKS
+from services.timing_preferences import load_timing_masks
+from services.schedule_versions import compare_placements
+from services.schedule_writer import insert_class_schedules, update_section_teachers
+from services.schedule_view import refresh_schedule_view
+from services.run_profile import RunProfile
+from services.capacity_check import Bottleneck, CapacityReport, ScheduleInfeasibleError, build_room_pools, dept_of, normalize_type, quota_bottlenecks, room_capacity
+
+logger = logging.getLogger("scheduler")
+
+@dataclass
+class AutoRunResult:
+    """
+    What AutoScheduler.run() reports: the same profile CpSatAutoScheduler returns in
+    RunResult.timings/counters. Quality comes from CpSatAutoScheduler().evaluate(db).
+    """
+    scheduled: int
+    timings: Dict[str, float] = field(default_factory=dict)   # phase -> wall seconds
+    counters: Dict[str, int] = field(default_factory=dict)    # event -> count
+    churn: Dict[str, int] = field(default_factory=dict)       # changes against the warm start, if any
 
 class AutoScheduler:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, warm_start: Optional[Dict[int, Dict]] = None):
         self.db = db
+        self.warm_start = warm_start # section_id -> previous placement (schedule_versions.load_placements), tried first
+        self.churn = {} # changes against the warm start, set by run()
         self.rooms = []
         self.instructors = []
         self.sections = []
-        self.room_matrix = {} # room_id -> day -> slot -> bool
-        self.instructor_matrix = {} # teacher_id -> day -> slot -> bool
+        self.room_grid = None # OccupancyGrid over rooms
+        self.instructor_grid = None # OccupancyGrid over teachers
+        self.room_type_masks = {} # THEORY/LAB -> room bitmask of the type-wide pool (capacity_check.build_room_pools)
+        self.sibling_index = SiblingIndex() # (base code, section number) -> placed day/slot masks
+        self.timing_masks = {} # teacher_id -> TimingMask
+        self.unassigned_by_course = defaultdict(deque) # course_id -> sections in load order
+        self.sections_by_code = {} # (course code, section number) -> section
         self.scheduled_section_ids = set()
+        self.section_teachers = {} # section_id -> assigned teacher_id (None for TBA), written in bulk on save
+        self.pending_rows = [] # ClassSchedule rows, written in bulk on save
         self.pattern_usage = {'ST': 0, 'MW': 0, 'RA': 0} # Track usage for load balancing
-        
+        self.profile = RunProfile() # Phase timings and counters; queries are counted until run() saves
+
+        # Fail fast, before the current schedule is deleted, when demand exceeds supply (the same
+        # verdict CpSatAutoScheduler reaches on these inputs)
+        self.profile.watch_queries(db)
+        self.capacity = self._capacity_report()
+        self.profile.lap("capacity_check")
+        if not self.capacity.feasible:
+            self.profile.unwatch_queries()
+            raise ScheduleInfeasibleError(self.capacity)
+
         # Load Data
         self._load_data()
-        self._init_matrices()
+        self._init_grids()
+        self.profile.lap("load")
+
+    def _capacity_report(self) -> CapacityReport:
+        """
+        Rooms through capacity_check.room_capacity, the check CpSatAutoScheduler runs, so both
+        engines accept the same inputs (its building pools are stricter than this engine's
+        type-wide room choice); and sections per department against accepted preferences
+        (the rest go to TBA). Column queries only.
+        """
+        rooms = self.db.query(Room.id, Room.type, Room.room_number).all()
+        pools = build_room_pools(rooms)
+
+        sections = (
+            self.db.query(Section.section_number, Course.id, Course.code, Course.type, Course.duration_mode)
+            .join(Course, Section.course_id == Course.id)
+            .all()
+        )
+        room_sections = []
+        sections_by_course = defaultdict(int)
+        groups = set()
+        for number, course_id, code, course_type, duration_mode in sections:
+            room_sections.append((code, course_type, duration_mode))
+            sections_by_course[course_id] += 1
+            groups.add(sibling_key(code, number))
+
+        bottlenecks, supply, demand = room_capacity(pools, room_sections)
+        if not any(b.fatal for b in bottlenecks):
+            # This engine places every lab as a 3h block (one day, two slots) and every theory class
+            # in one slot of a pattern; where that overflows a pool, some sections stay unscheduled
+            own, _, _ = room_capacity(pools, room_sections, size=lambda course_type, _: (2, 1) if course_type == ClassType.LAB else (2, 0))
+            bottlenecks += [
+                Bottleneck(b.kind, b.scope, b.demand, b.supply, False, f"AutoScheduler places labs as 3h blocks; {b.detail}")
+                for b in own if b.fatal
+            ]
+
+        # A teacher takes a section (and its sibling) per accepted preference slot
+        quotas = dict(
+            self.db.query(TeacherPreference.course_id, func.sum(TeacherPreference.section_count))
+            .filter(TeacherPreference.status == 'accepted')
+            .group_by(TeacherPreference.course_id)
+            .all()
+        )
+        codes = {course_id: code for _, course_id, code, _, _ in sections}
+        groups_by_base = defaultdict(int)
+        for base_code, _ in groups:
+            groups_by_base[base_code] += 1
+        covered_by_base = defaultdict(int)
+        for course_id, count in sections_by_course.items():
+            covered_by_base[sibling_key(codes[course_id], 0)[0]] += min(count, int(quotas.get(course_id) or 0))
+        groups_by_dept = defaultdict(int)
+        capacity_by_dept = defaultdict(int)
+        for base_code, count in groups_by_base.items():
+            groups_by_dept[dept_of(base_code)] += count
+            capacity_by_dept[dept_of(base_code)] += min(count, covered_by_base[base_code])
+        bottlenecks += quota_bottlenecks(groups_by_dept, capacity_by_dept)
+
+        return CapacityReport(bottlenecks=bottlenecks, supply=supply, demand=demand)
 
     def _load_data(self):
-        self.rooms = self.db.query(Room).all()
-        self.instructors = self.db.query(Teacher).all()
-        self.sections = self.db.query(Section).all()
-        
         # Clear existing schedules
         self.db.query(ClassSchedule).delete()
-        
-        # Reset teacher assignments
-        for section in self.sections:
-            section.teacher_id = None
-        self.db.flush()
-
-    def _init_matrices(self):
-        # Initialize Room Matrix
-        for room in self.rooms:
-            self.room_matrix[room.id] = {}
-            for day in LAB_DAYS:
-                self.room_matrix[room.id][day] = {slot: False for slot in TIME_SLOTS.keys()}
 
-        # Initialize Instructor Matrix
-        for instructor in self.instructors:
-            self.instructor_matrix[instructor.id] = {}
-            for day in LAB_DAYS:
-                self.instructor_matrix[instructor.id][day] = {slot: False for slot in TIME_SLOTS.keys()}
+        # Reset teacher assignments (one UPDATE, before the sections are loaded)
+        self.db.query(Section).update({Section.teacher_id: None}, synchronize_session=False)
 
-    def _check_matrix_availability(self, matrix, entity_id, day, slot, is_lab):
-        if entity_id not in matrix: return True 
-        if day not in matrix[entity_id]: return False
+        self.rooms = self.db.query(Room).all()
+        self.instructors = self.db.query(Teacher).all()
+        self.sections = self.db.query(Section).options(joinedload(Section.course)).populate_existing().all()
+        self.timing_masks = load_timing_masks(self.db)
 
-        slots_to_check = []
+        for section in self.sections:
+            self.unassigned_by_course[section.course_id].append(section)
+            self.sections_by_code[(section.course.code, section.section_number)] = section
+
+    def _init_grids(self):
+        self.room_grid = OccupancyGrid(room.id for room in self.rooms)
+        self.instructor_grid = OccupancyGrid(instructor.id for instructor in self.instructors)
+
+        # Rooms of each type as one bitmask, in load order. Only the type-wide pools: this engine
+        # does not keep departments in their building (CpSatAutoScheduler does), it only shares
+        # the fallback to all rooms when a type has none
+        pools = build_room_pools(self.rooms)
+        for room_type in ('THEORY', 'LAB'):
+            self.room_type_masks[room_type] = self.room_grid.mask_of(r.id for r in pools[(room_type, None)])
+
+    def _slot_mask(self, slot: int, is_lab: bool) -> int:
+        # Lab Slot L overlaps Theory Slots defined in MAPPING
+        # Theory Slot T overlaps itself (and implicitly Lab slots that cover it)
+        # Unknown slots map to 0 and are never valid.
         if is_lab:
-            # Lab Slot L overlaps Theory Slots defined in MAPPING
-            if slot in LAB_SLOT_MAPPING:
-                slots_to_check = LAB_SLOT_MAPPING[slot]
-            else:
-                return False
-        else:
-            # Theory Slot T overlaps itself (and implicitly Lab slots that cover it)
-            slots_to_check = [slot]
-
-        for s in slots_to_check:
-            if matrix[entity_id][day].get(s, True): # Default True (Occupied)
-                return False
-        return True
+            return LAB_SLOT_MASKS.get(slot, 0)
+        return THEORY_SLOT_MASKS.get(slot, 0)
 
     def is_slot_valid(self, section: Section, teacher_id: Optional[int], room: Room, days: List[str], time_slot: int, is_lab: bool) -> bool:
         # 1. Check Room & Instructor Availability for ALL days in the pattern
-        for day in days:
-            # Check Room
-            if not self._check_matrix_availability(self.room_matrix, room.id, day, time_slot, is_lab):
-                return False
-            
-            # Check Instructor
-            if teacher_id and not self._check_matrix_availability(self.instructor_matrix, teacher_id, day, time_slot, is_lab):
-                return False
+        mask = self._slot_mask(time_slot, is_lab)
+        if not mask:
+            return False
+        if not self.room_grid.is_free(room.id, days, mask):
+            return False
+        if teacher_id and not self.instructor_grid.is_free(teacher_id, days, mask):
+            return False
 
         # 2. Sibling Conflict Check
-        # Ensure this section does not overlap with its sibling (Theory vs Lab)
-        course_code = section.course.code
-        sibling_code = course_code[:-1] if course_code.endswith('L') else course_code + 'L'
-        
-        # Find sibling section (same section number)
-        # We check the DB for existing schedules for the sibling.
-        # Since we flush after each schedule, DB query should return recently added schedules.
-        
-        sibling_schedules = self.db.query(ClassSchedule).join(Section).join(Course).filter(
-            Course.code == sibling_code,
-            Section.section_number == section.section_number
-        ).all()
-
-        for sched in sibling_schedules:
-            # Check overlap
-            # Sched Day vs Current Days
-            sched_days = THEORY_DAYS.get(sched.day, [sched.day])
-            
-            for d1 in days:
-                for d2 in sched_days:
-                    if d1 == d2:
-                        # Same day, check time overlap
-                        # Get occupied slots for the sibling
-                        sibling_slots = []
-                        is_sibling_lab = sched.section.course.type == ClassType.LAB
-                        if is_sibling_lab:
-                            sibling_slots = LAB_SLOT_MAPPING.get(sched.time_slot_id, [])
-                        else:
-                            sibling_slots = [sched.time_slot_id]
-                        
-                        # Get occupied slots for current
-                        current_slots = []
-                        if is_lab:
-                            current_slots = LAB_SLOT_MAPPING.get(time_slot, [])
-                        else:
-                            current_slots = [time_slot]
-                            
-                        # Intersection check
-                        if set(sibling_slots) & set(current_slots):
-                            return False
-
-        return True
-
-    def mark_occupied(self, teacher_id: Optional[int], room_id: int, days: List[str], slot: int, is_lab: bool):
-        slots_to_mark = []
-        if is_lab:
-            slots_to_mark = LAB_SLOT_MAPPING.get(slot, [])
-        else:
-            slots_to_mark = [slot]
-
-        for day in days:
-            for s in slots_to_mark:
-                self.room_matrix[room_id][day][s] = True
-                if teacher_id:
-                    self.instructor_matrix[teacher_id][day][s] = True
-
-    def _normalize_time(self, time_str: str) -> str:
-        """
-        Normalize time string to HH:MM AM/PM format.
-        Handles '8:00 AM' -> '08:00 AM'
-        """
-        try:
-            parts = time_str.split()
-            time_part = parts[0]
-            meridiem = parts[1] if len(parts) > 1 else ""
-            
-            if ':' in time_part:
-                h, m = time_part.split(':')
-                return f"{int(h):02d}:{m} {meridiem}".strip()
-            return time_str
-        except:
-            return time_str
+        return not self._has_sibling_conflict(section, days, time_slot, is_lab)
+
+    def _has_sibling_conflict(self, section: Section, days: List[str], time_slot: int, is_lab: bool) -> bool:
+        # Ensure this section does not overlap with its sibling (Theory vs Lab, same section number).
+        # Placed siblings live in the in-memory index, so no DB round trip is needed.
+        key = sibling_key(section.course.code, section.section_number)
+        return self.sibling_index.conflicts(key, section.id, days, self._slot_mask(time_slot, is_lab))
+
+    def mark_occupied(self, teacher_id: Optional[int], room_id: int, days: List[str], slot: int, is_lab: bool, section: Optional[Section] = None):
+        mask = self._slot_mask(slot, is_lab)
+        self.room_grid.mark(room_id, days, mask)
+        if teacher_id and teacher_id in self.instructor_grid.index:
+            self.instructor_grid.mark(teacher_id, days, mask)
+        if section is not None:
+            self.sibling_index.add(sibling_key(section.course.code, section.section_number), section.id, days, mask)
 
     def _is_preferred(self, teacher_id: int, days: List[str], slot_id: int, is_lab: bool) -> bool:
-        prefs = self.db.query(TeacherTimingPreference).filter(TeacherTimingPreference.teacher_id == teacher_id).all()
-        if not prefs:
-            return False
-            
-        # Get start time string for this slot
-        slot_time_str = ""
-        if is_lab:
-            slot_time_str = LAB_TIME_SLOTS.get(slot_id, "")
-        else:
-            slot_time_str = TIME_SLOTS.get(slot_id, "")
-            
-        if not slot_time_str:
+        # Preferences are compiled once per run; a lab block is preferred when all its slots are.
+        mask = self._slot_mask(slot_id, is_lab)
+        if not mask:
             return False
-            
-        # Extract start time "08:00 AM" from "08:00 AM - 09:30 AM"
-        current_start_time = slot_time_str.split(" - ")[0]
-        normalized_current = self._normalize_time(current_start_time)
-        
-        for pref in prefs:
-            # Check if day matches any of the days in the pattern
-            # Preference day might be "Sunday", "Monday" etc.
-            # Current days is a list ['Sunday', 'Tuesday']
-            
-            day_match = False
-            for d in days:
-                if d == pref.day:
-                    day_match = True
-                    break
-            
-            if day_match:
-                # Check time match with normalization
-                normalized_pref = self._normalize_time(pref.start_time)
-                if normalized_pref == normalized_current:
-                    return True
-                    
-        return False
+        return self.timing_masks[teacher_id].covers(days, mask)
 
     def schedule_section(self, section: Section, teacher_id: Optional[int]) -> bool:
         if section.id in self.scheduled_section_ids:
@@ -198,9 +198,9 @@ class AutoScheduler:
         is_lab = section.course.type == ClassType.LAB
         
         # Filter Rooms by Type
-        valid_rooms = [r for r in self.rooms if r.type == section.course.type]
-        if not valid_rooms:
-            print(f"No rooms found for {section.course.code} (Type: {section.course.type})")
+        room_pool = self.room_type_masks.get(normalize_type(section.course.type), 0)
+        if not room_pool:
+            logger.warning(f"No rooms found for {section.course.code} (Type: {section.course.type})")
             return False
 
         # Determine Slots and Patterns to try
@@ -213,15 +213,15 @@ class AutoScheduler:
         if is_lab:
             # Lab: Single Days, Slots 1-3
             for day in LAB_DAYS:
-                for slot in LAB_TIME_SLOTS.keys():
-                    all_options.append({'days': [day], 'slot': slot, 'pattern': day})
+                for slot in LAB_SLOTS:
+                    all_options.append({'days': days_of(day), 'slot': slot, 'pattern': day})
         else:
             # Theory: Patterns, Slots 1-7
             # Sort patterns by usage (least used first) to balance load
             sorted_patterns = sorted(THEORY_DAYS.items(), key=lambda item: self.pattern_usage.get(item[0], 0))
             
             for pattern, days in sorted_patterns:
-                for slot in TIME_SLOTS.keys():
+                for slot in THEORY_SLOTS:
                     all_options.append({'days': days, 'slot': slot, 'pattern': pattern})
 
         # Sort/Filter based on preferences
@@ -244,90 +244,131 @@ class AutoScheduler:
         # 2. If no preference/TBA, we pick the day pattern that is least used (Load Balancing).
         final_options = preferred_options + other_options
 
+        # Warm start: the previous time goes first, and the previous room if it is still free
+        previous = self.warm_start.get(section.id) if self.warm_start else None
+        previous_room = 0
+        if previous:
+            kept = [opt for opt in final_options if opt['pattern'] == previous['day'] and opt['slot'] == previous['time_slots'][0]]
+            final_options = kept + [opt for opt in final_options if opt not in kept]
+            previous_room = self.room_grid.mask_of([previous['room_id']])
+
+        rooms_by_id = {r.id: r for r in self.rooms}
+
         # Try to find a valid slot
+        options_tried = rooms_probed = blocked_checks = 0
+        pool_size = bin(room_pool).count("1")
         for opt in final_options:
             days = opt['days']
             slot = opt['slot']
             pattern = opt['pattern']
-            
-            for room in valid_rooms:
-                if self.is_slot_valid(section, teacher_id, room, days, slot, is_lab):
-                    # Found a slot!
-                    # 1. Assign Teacher
-                    section.teacher_id = teacher_id
-                    self.db.add(section)
-                    
-                    # 2. Create Schedule
-                    slots_to_create = []
-                    if is_lab:
-                        slots_to_create = LAB_SLOT_MAPPING.get(slot, [slot])
-                    else:
-                        slots_to_create = [slot]
-
-                    for s_id in slots_to_create:
-                        sched = ClassSchedule(
-                            section_id=section.id,
-                            room_id=room.id,
-                            day=pattern, # 'ST', 'MW', or 'RA'
-                            time_slot_id=s_id,
-                            availability=room.capacity
-                        )
-                        self.db.add(sched)
-                    
-                    # 3. Update Matrix
-                    self.mark_occupied(teacher_id, room.id, days, slot, is_lab)
-                    
-                    # 4. Update Pattern Usage (for Theory)
-                    if not is_lab and pattern in self.pattern_usage:
-                        self.pattern_usage[pattern] += 1
 
-                    # 5. Mark Scheduled
-                    self.scheduled_section_ids.add(section.id)
-                    
-                    # Flush to make it visible for sibling checks
-                    self.db.flush()
-                    return True
+            mask = self._slot_mask(slot, is_lab)
+            if not mask:
+                continue
+            options_tried += 1
+            if teacher_id and not self.instructor_grid.is_free(teacher_id, days, mask):
+                blocked_checks += 1
+                continue
+
+            # All free rooms of this type in one call; the first one in load order wins
+            free_rooms = self.room_grid.free(room_pool, days, mask)
+            rooms_probed += pool_size
+            if not free_rooms:
+                blocked_checks += 1
+                continue
+            if self._has_sibling_conflict(section, days, slot, is_lab):
+                continue
+            room = rooms_by_id[self.room_grid.first(free_rooms & previous_room or free_rooms)]
+
+            # Found a slot!
+            # 1. Assign Teacher
+            self.section_teachers[section.id] = teacher_id
+
+            # 2. Create Schedule
+            slots_to_create = LAB_SLOTS[slot].covers if is_lab else [slot]
+
+            for s_id in slots_to_create:
+                self.pending_rows.append({
+                    'section_id': section.id,
+                    'room_id': room.id,
+                    'day': pattern, # 'ST', 'MW', or 'RA'
+                    'time_slot_id': s_id,
+                    'is_friday_booking': False,
+                    'availability': room.capacity
+                })
+
+            # 3. Update Occupancy
+            self.mark_occupied(teacher_id, room.id, days, slot, is_lab, section)
+
+            # 4. Update Pattern Usage (for Theory)
+            if not is_lab and pattern in self.pattern_usage:
+                self.pattern_usage[pattern] += 1
+
+            # 5. Mark Scheduled
+            self.scheduled_section_ids.add(section.id)
+            self._count_attempt(options_tried, rooms_probed, blocked_checks)
+            return True
         
-        print(f"Failed to schedule {section.course.code} Sec {section.section_number}")
+        logger.info(f"Failed to schedule {section.course.code} Sec {section.section_number}")
+        self._count_attempt(options_tried, rooms_probed, blocked_checks)
         return False
 
+    def _churn(self) -> Dict[str, int]:
+        after = {}
+        for row in self.pending_rows:
+            p = after.setdefault(row['section_id'], {'room_id': row['room_id'], 'day': row['day'], 'time_slots': [],
+                                                     'teacher_id': self.section_teachers.get(row['section_id'])})
+            p['time_slots'].append(row['time_slot_id'])
+        for p in after.values():
+            p['time_slots'].sort()
+        # TBA sections have no teacher here; the TBA teacher of a CP-SAT schedule counts the same
+        tba_ids = {t.id for t in self.instructors if t.initial == "TBA"}
+        before = {sid: dict(p, teacher_id=None if p['teacher_id'] in tba_ids else p['teacher_id']) for sid, p in self.warm_start.items()}
+        counts, _ = compare_placements(before, after)
+        return counts
+
+    def _count_attempt(self, options_tried: int, rooms_probed: int, blocked_checks: int):
+        self.profile.count("sections_attempted")
+        self.profile.count("options_evaluated", options_tried)
+        self.profile.count("rooms_probed", rooms_probed)
+        self.profile.count("blocked_checks", blocked_checks)
+
     def find_sibling_section(self, section: Section) -> Optional[Section]:
         course_code = section.course.code
         sibling_code = course_code[:-1] if course_code.endswith('L') else course_code + 'L'
         
-        # Find in self.sections
-        for s in self.sections:
-            if s.course.code == sibling_code and s.section_number == section.section_number:
-                return s
-        return None
-
-    def run(self):
-        print("Starting AutoScheduler...")
+        return self.sections_by_code.get((sibling_code, section.section_number))
+
+    def _next_unassigned_section(self, course_id: int) -> Optional[Section]:
+        # Sections that got a teacher (directly or as a sibling) are dropped lazily from the queue head.
+        # A section that failed to schedule stays at the head, as with the old linear scan.
+        queue = self.unassigned_by_course.get(course_id)
+        while queue and self.section_teachers.get(queue[0].id) is not None:
+            queue.popleft()
+        return queue[0] if queue else None
+
+    def run(self) -> AutoRunResult:
+        logger.info("Starting AutoScheduler...")
+        self.profile.start()
         
         # Step 3: Round-Robin Assignment
-        # Build queues
-        teacher_queues = {}
-        for teacher in self.instructors:
-            prefs = self.db.query(TeacherPreference).filter(
-                TeacherPreference.teacher_id == teacher.id,
-                TeacherPreference.status == 'accepted'
-            ).all()
-            
-            queue = []
-            for pref in prefs:
-                # Find sections of this course
-                # We just put the Course object in the queue
-                for _ in range(pref.section_count):
-                    queue.append(pref.course)
-            
-            teacher_queues[teacher.id] = queue
+        # Build queues (one query for all teachers)
+        prefs = self.db.query(TeacherPreference).options(joinedload(TeacherPreference.course)).filter(
+            TeacherPreference.status == 'accepted'
+        ).order_by(TeacherPreference.id).all()
+
+        teacher_queues = {teacher.id: [] for teacher in self.instructors}
+        for pref in prefs:
+            # We just put the Course object in the queue
+            if pref.teacher_id in teacher_queues:
+                teacher_queues[pref.teacher_id].extend([pref.course] * (pref.section_count or 0))
 
         if not teacher_queues:
             max_rounds = 0
         else:
             max_rounds = max(len(q) for q in teacher_queues.values())
 
-        print(f"Max rounds: {max_rounds}")
+        logger.info(f"Max rounds: {max_rounds}")
 
         for r in range(max_rounds):
             for teacher in self.instructors:
@@ -336,30 +377,43 @@ class AutoScheduler:
                     course = queue[r]
                     
                     # Find an unassigned section of this course
-                    candidate_section = None
-                    for s in self.sections:
-                        if s.course_id == course.id and s.teacher_id is None:
-                            candidate_section = s
-                            break
-                    
+                    candidate_section = self._next_unassigned_section(course.id)
+
                     if candidate_section:
                         # Try to schedule
                         if self.schedule_section(candidate_section, teacher.id):
                             # Handle Sibling
                             sibling = self.find_sibling_section(candidate_section)
-                            if sibling and sibling.teacher_id is None:
+                            if sibling and self.section_teachers.get(sibling.id) is None:
                                 self.schedule_section(sibling, teacher.id)
 
+        self.profile.lap("assignment")
+
         # Step 4: TBA Handling
-        print("Assigning remaining sections to TBA...")
+        logger.info("Assigning remaining sections to TBA...")
         for section in self.sections:
             if section.id not in self.scheduled_section_ids:
                 self.schedule_section(section, None)
+        self.profile.lap("tba")
 
-        # Step 5: Save
+        # Step 5: Save (bulk insert + one set-based teacher update)
+        insert_class_schedules(self.db, self.pending_rows)
+        update_section_teachers(self.db, {sid: tid for sid, tid in self.section_teachers.items() if tid is not None})
+        refresh_schedule_view(self.db)
         self.db.commit()
-        print("Scheduling Complete.")
-        return len(self.scheduled_section_ids)
+        self.profile.lap("commit")
+        self.profile.unwatch_queries()
+        if self.warm_start is not None:
+            self.churn = self._churn()
+            logger.info(f"Churn against warm start: {self.churn}")
+        logger.info(f"AutoScheduler: {len(self.scheduled_section_ids)} sections scheduled, timings {self.profile.timings_rounded()}, "
+                    f"counters {dict(self.profile.counters)}")
+        return AutoRunResult(
+            scheduled=len(self.scheduled_section_ids),
+            timings=self.profile.timings_rounded(),
+            counters=dict(self.profile.counters),
+            churn=self.churn,
+        )
 
 def ensure_tba_teacher(db: Session) -> Teacher:
     # Check if TBA teacher exists
@@ -0,0 +1,273 @@
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.schedule import SchedulerJobRecord
+from services.capacity_check import ScheduleInfeasibleError
+from services.cp_sat_scheduler import CpSatAutoScheduler, Quality, RunResult
+from services.schedule_snapshot import ScheduleSnapshot, read_schedule, take_snapshot, write_schedule
+from services.schedule_versions import save_version
+from services.scheduler import ensure_tba_teacher
+
+logger = logging.getLogger("scheduler")
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+PROGRESS_INTERVAL_SECONDS = 0.25   # Throttle for progress messages from the solver process
+HEARTBEAT_SECONDS = 2.0            # How often a watcher marks its job alive and checks for a cancel
+STALE_JOB_SECONDS = 60.0           # An active job without a heartbeat this long is failed
+LIST_JOBS_LIMIT = 50
+
+# Spawned (not forked) children: the API process has threads and open DB connections
+_mp = multiprocessing.get_context("spawn")
+
+@dataclass
+class SchedulerJob:
+    """
+    A job as stored in SchedulerJobRecord; a snapshot, re-read on every get_job / list_jobs.
+    """
+    id: str
+    seed: int
+    time_limit_seconds: float
+    local_search: bool = False
+    warm_start: bool = False
+    status: str = QUEUED
+    phase: str = QUEUED
+    progress: Dict[str, Any] = field(default_factory=dict)
+    submitted_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[RunResult] = None
+    error: Optional[str] = None
+    version_id: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+# Solver processes started by this worker. Job state itself lives in the DB, so every worker
+# sees every job and the one-active-job rule (SchedulerJobRecord.active) holds across workers.
+_processes: Dict[str, Any] = {}
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _to_job(record: SchedulerJobRecord) -> SchedulerJob:
+    result = None
+    if record.result:
+        data = json.loads(record.result)
+        result = RunResult(**{**data, "quality": Quality(**data["quality"])})
+    return SchedulerJob(
+        id=record.id, seed=record.seed, time_limit_seconds=record.time_limit_seconds,
+        local_search=record.local_search, warm_start=record.warm_start,
+        status=record.status, phase=record.phase, progress=json.loads(record.progress or "{}"),
+        submitted_at=record.submitted_at, finished_at=record.finished_at,
+        result=result, error=record.error, version_id=record.version_id,
+    )
+
+def _update(job_id: str, only_active: bool = True, **values) -> bool:
+    """
+    Writes `values` to the job's row; with `only_active`, only while the job is still active.
+    Returns False when nothing was written: another worker cancelled or expired the job.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(SchedulerJobRecord).filter(SchedulerJobRecord.id == job_id)
+        if only_active:
+            query = query.filter(SchedulerJobRecord.active.is_(True))
+        updated = query.update(values, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+def _finish(job_id: str, status: str, **values) -> bool:
+    return _update(job_id, status=status, phase=status, active=None, finished_at=_now(), **values)
+
+def _expire_stale(db: Session):
+    """
+    Fails active jobs whose worker stopped sending heartbeats (it crashed or was restarted),
+    so they do not block new jobs forever.
+    """
+    cutoff = _now() - timedelta(seconds=STALE_JOB_SECONDS)
+    stale = db.query(SchedulerJobRecord).filter(
+        SchedulerJobRecord.active.is_(True), SchedulerJobRecord.heartbeat_at < cutoff
+    ).update({"status": FAILED, "phase": FAILED, "active": None, "finished_at": _now(),
+              "error": "The API worker running the job stopped responding"}, synchronize_session=False)
+    if stale:
+        logger.warning(f"Expired {stale} stale scheduler job(s)")
+    db.commit()
+
+def _solve_job(snapshot: ScheduleSnapshot, seed: int, time_limit_seconds: float, local_search: bool,
+               warm_start: Optional[Dict[int, Dict]], messages):
+    """
+    Child process: solves the snapshot in memory and sends progress and the result back.
+    The real DB is only written by the parent, so a cancelled job leaves it untouched.
+    """
+    last_sent = [0.0, None]
+
+    def report(phase: str, **counters):
+        now = time.monotonic()
+        if phase == last_sent[1] and now - last_sent[0] < PROGRESS_INTERVAL_SECONDS:
+            return
+        last_sent[0], last_sent[1] = now, phase
+        messages.put(("progress", phase, counters))
+
+    try:
+        db = snapshot.open_session()
+        try:
+            scheduler = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=seed, progress=report,
+                                           local_search=local_search, warm_start=warm_start)
+            result = scheduler.run(db, rebuild=True)
+            schedules, teacher_ids = read_schedule(db)
+        finally:
+            db.close()
+        messages.put(("done", result, schedules, teacher_ids))
+    except ScheduleInfeasibleError as e:
+        messages.put(("error", str(e)))
+    except Exception as e:
+        messages.put(("error", repr(e)))
+
+def _watch(job_id: str, process, messages):
+    """
+    Parent thread: stores progress and heartbeats, and writes the finished schedule.
+    Stops the solver when the job was cancelled, possibly by another worker.
+    """
+    last_beat = 0.0
+    try:
+        while True:
+            try:
+                message = messages.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    _finish(job_id, FAILED, error=f"Solver process exited with code {process.exitcode}")
+                    break
+                if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                    last_beat = time.monotonic()
+                    if not _update(job_id, heartbeat_at=_now()):
+                        break
+                continue
+
+            kind = message[0]
+            if kind == "progress":
+                # Throttled by the child already; doubles as the heartbeat
+                last_beat = time.monotonic()
+                if not _update(job_id, phase=message[1], progress=json.dumps(message[2]), heartbeat_at=_now()):
+                    break
+                continue
+
+            if kind == "done":
+                _, result, schedules, teacher_ids = message
+                # From here on the job can no longer be cancelled
+                if not _update(job_id, phase="saving", progress="{}", heartbeat_at=_now()):
+                    break
+                db = SessionLocal()
+                try:
+                    write_schedule(db, schedules, teacher_ids)
+                    version = save_version(db, result, source="job", label=f"job {job_id}")
+                    _finish(job_id, COMPLETED, result=json.dumps(asdict(result)), version_id=version.id)
+                except Exception as e:
+                    logger.exception("Saving scheduler job result failed")
+                    _finish(job_id, FAILED, error=repr(e))
+                finally:
+                    db.close()
+            else:
+                _finish(job_id, FAILED, error=message[1])
+            break
+    except Exception as e:
+        logger.exception("Watching scheduler job failed")
+        _finish(job_id, FAILED, error=repr(e))
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=5)
+        _processes.pop(job_id, None)
+
+def submit_job(seed: int = 1, time_limit_seconds: float = 30.0, local_search: bool = False,
+               warm_start: Optional[Dict[int, Dict]] = None) -> SchedulerJob:
+    """
+    Snapshots the inputs and starts the solve in a separate process.
+    `warm_start` is a placement map from schedule_versions.load_placements.
+    Raises RuntimeError if another job is still running, in any worker (both would rewrite the schedule).
+    """
+    job_id = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        _expire_stale(db)
+        db.add(SchedulerJobRecord(id=job_id, seed=seed, time_limit_seconds=time_limit_seconds, local_search=local_search,
+                                  warm_start=warm_start is not None, status=QUEUED, phase=QUEUED, active=True,
+                                  submitted_at=_now(), heartbeat_at=_now()))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise RuntimeError("A scheduler job is already running")
+
+        try:
+            ensure_tba_teacher(db)
+            snapshot = take_snapshot(db)
+            messages = _mp.Queue()
+            process = _mp.Process(target=_solve_job, args=(snapshot, seed, time_limit_seconds, local_search, warm_start, messages), daemon=True)
+            process.start()
+        except Exception as e:
+            db.rollback()
+            _finish(job_id, FAILED, error=repr(e))
+            raise
+    finally:
+        db.close()
+
+    _processes[job_id] = process
+    _update(job_id, status=RUNNING, phase="starting", heartbeat_at=_now())
+    threading.Thread(target=_watch, args=(job_id, process, messages), daemon=True).start()
+    return get_job(job_id)
+
+def get_job(job_id: str) -> Optional[SchedulerJob]:
+    db = SessionLocal()
+    try:
+        record = db.get(SchedulerJobRecord, job_id)
+        return _to_job(record) if record else None
+    finally:
+        db.close()
+
+def list_jobs() -> List[SchedulerJob]:
+    db = SessionLocal()
+    try:
+        records = db.query(SchedulerJobRecord).order_by(SchedulerJobRecord.submitted_at.desc()).limit(LIST_JOBS_LIMIT).all()
+        return [_to_job(r) for r in records]
+    finally:
+        db.close()
+
+def cancel_job(job_id: str) -> bool:
+    """
+    Stops a running solve. Returns False when the job already finished or is saving its result.
+    A job of another worker is stopped by that worker's watcher at its next heartbeat.
+    """
+    db = SessionLocal()
+    try:
+        cancelled = db.query(SchedulerJobRecord).filter(
+            SchedulerJobRecord.id == job_id, SchedulerJobRecord.active.is_(True), SchedulerJobRecord.phase != "saving"
+        ).update({"status": CANCELLED, "phase": CANCELLED, "active": None, "finished_at": _now()}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    if not cancelled:
+        return False
+    process = _processes.get(job_id)
+    if process is not None and process.is_alive():
+        process.terminate()
+    return True
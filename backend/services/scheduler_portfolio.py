@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from services.capacity_check import ScheduleInfeasibleError
+from services.cp_sat_scheduler import CpSatAutoScheduler, RunResult
+from services.schedule_snapshot import ScheduleSnapshot, read_schedule, take_snapshot, write_schedule
+from services.scheduler import AutoScheduler, ensure_tba_teacher
+
+logger = logging.getLogger("scheduler")
+
+# Spawned (not forked) children: the API process has threads and open DB connections
+_mp = multiprocessing.get_context("spawn")
+
+ENGINE_CP_SAT = "cp_sat"
+ENGINE_AUTO = "auto"
+
+# Entries per portfolio: each is a spawned process, and the request waits for all of them
+MAX_SEEDS = 8
+
+@dataclass
+class PortfolioRun:
+    """
+    Outcome of one portfolio entry, solved in a worker process against the snapshot.
+    """
+    engine: str
+    seed: int
+    result: RunResult
+    schedules: List[Dict] = field(default_factory=list)
+    teacher_ids: Dict[int, Optional[int]] = field(default_factory=dict)
+
+    @property
+    def rank(self) -> Tuple[float, int]:
+        # Best quality first, then fewest TBA sections
+        return (self.result.quality.overall_score, -self.result.assigned_tba)
+
+def _run_entry(snapshot: ScheduleSnapshot, engine: str, seed: int, time_limit_seconds: float, num_workers: int, local_search: bool,
+               warm_start: Optional[Dict[int, Dict]]) -> PortfolioRun:
+    db = snapshot.open_session()
+    try:
+        if engine == ENGINE_AUTO:
+            auto = AutoScheduler(db, warm_start=warm_start)
+            auto_run = auto.run()
+            result = CpSatAutoScheduler().evaluate(db)
+            result.solver_status = "AUTO"
+            result.timings = auto_run.timings
+            result.counters = auto_run.counters
+            result.churn = auto_run.churn
+        else:
+            scheduler = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=seed, num_workers=num_workers,
+                                           local_search=local_search, warm_start=warm_start)
+            result = scheduler.run(db, rebuild=True)
+        schedules, teacher_ids = read_schedule(db)
+        return PortfolioRun(engine=engine, seed=seed, result=result, schedules=schedules, teacher_ids=teacher_ids)
+    finally:
+        db.close()
+
+def run_portfolio(
+    db: Session,
+    seeds: int = 4,
+    include_auto: bool = False,
+    time_limit_seconds: float = 30.0,
+    max_processes: Optional[int] = None,
+    local_search: bool = False,
+    warm_start: Optional[Dict[int, Dict]] = None,
+) -> Tuple[PortfolioRun, List[PortfolioRun]]:
+    """
+    Solves the current inputs with `seeds` CP-SAT seeds (and optionally AutoScheduler) in a
+    process pool, then writes only the best result to the DB. Every entry gets the same
+    `warm_start` placements, if any. An entry whose engine finds the inputs infeasible is
+    dropped; ScheduleInfeasibleError is raised only when every entry is.
+    Returns (best, all completed runs). Raises ValueError for more than MAX_SEEDS seeds.
+    """
+    if seeds > MAX_SEEDS:
+        raise ValueError(f"At most {MAX_SEEDS} seeds per portfolio")
+    ensure_tba_teacher(db)
+    # Fail fast here rather than in every worker
+    capacity = CpSatAutoScheduler().capacity_report(db)
+    if not capacity.feasible:
+        raise ScheduleInfeasibleError(capacity)
+    snapshot = take_snapshot(db)
+
+    entries = [(ENGINE_CP_SAT, seed) for seed in range(1, seeds + 1)]
+    if include_auto:
+        entries.append((ENGINE_AUTO, 0))
+
+    cpu_count = os.cpu_count() or 1
+    processes = max(1, min(len(entries), max_processes or cpu_count))
+    # Split the cores between the concurrently running CP-SAT searches
+    num_workers = max(1, cpu_count // processes)
+
+    runs, infeasible = [], []
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_mp) as pool:
+        futures = [
+            (engine, seed, pool.submit(_run_entry, snapshot, engine, seed, time_limit_seconds, num_workers, local_search, warm_start))
+            for engine, seed in entries
+        ]
+        for engine, seed, future in futures:
+            try:
+                runs.append(future.result())
+            except ScheduleInfeasibleError as e:
+                logger.warning(f"Portfolio {engine} seed {seed} dropped: {e}")
+                infeasible.append(e)
+    if not runs:
+        raise infeasible[0]
+
+    for run in runs:
+        logger.info(f"Portfolio {run.engine} seed {run.seed}: quality {run.result.quality.overall_score}, TBA {run.result.assigned_tba}")
+
+    best = max(runs, key=lambda r: r.rank)
+    write_schedule(db, best.schedules, best.teacher_ids)
+    return best, runs
@@ -0,0 +1,324 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.time_slots import days_of
+from models.academic import Course, Room
+from models.schedule import ClassSchedule, Section
+from services.capacity_check import ScheduleInfeasibleError, dept_building, dept_of, normalize_type, section_size
+from services.cp_sat_scheduler import CpSatAutoScheduler, RunResult
+from services.occupancy import OccupancyGrid, sibling_key
+from services.schedule_snapshot import ScheduleSnapshot, read_schedule, take_snapshot, write_schedule
+from services.scheduler import ensure_tba_teacher
+
+logger = logging.getLogger("scheduler")
+
+BUILDINGS = ("SAC", "NAC")
+
+# Spawned (not forked) children: the API process has threads and open DB connections
+_mp = multiprocessing.get_context("spawn")
+
+@dataclass
+class Shard:
+    """
+    Departments solved together, with the rooms only they may use.
+    """
+    name: str
+    departments: Set[str] = field(default_factory=set)
+    room_ids: Set[int] = field(default_factory=set)
+    demand: Dict[str, int] = field(default_factory=lambda: defaultdict(int))   # room type -> section cells
+    rooms: Dict[str, int] = field(default_factory=lambda: defaultdict(int))    # room type -> room count
+
+    @property
+    def load(self) -> float:
+        return sum(self.demand.values()) / max(1, sum(self.rooms.values()))
+
+@dataclass
+class ShardRun:
+    shard: str
+    sections: int
+    result: Optional[RunResult]   # None when the shard failed; its sections go to the repair pass
+    error: Optional[str] = None   # why it failed
+    schedules: List[Dict] = field(default_factory=list)
+    teacher_ids: Dict[int, Optional[int]] = field(default_factory=dict)
+
+def plan_shards(db: Session, shards: int) -> List[Shard]:
+    """
+    Partitions departments and rooms into at most `shards` disjoint shards:
+    - one per building (SAC/NAC) that has rooms, with its departments and rooms
+    - departments without a building go to the least loaded shard, rooms without one to the
+      shard that needs them most
+    - a shard needing a room type it has none of is merged into the one with most such rooms
+      (the full solve would fall back to the type-wide pool)
+    - the remaining shard budget splits the busiest buildings further: departments by
+      largest demand first, each room type in proportion to the departments' demand
+    Rooms never cross shards, so only teachers can conflict between shard solutions.
+    """
+    demand = defaultdict(lambda: defaultdict(int))   # department -> room type -> section cells
+    rows = db.query(Course.code, Course.type, Course.duration_mode).join(Section, Section.course_id == Course.id)
+    for code, course_type, duration_mode in rows:
+        demand[dept_of(code)][normalize_type(course_type)] += section_size(course_type, duration_mode)[0]
+
+    rooms = [(room_id, number.upper(), normalize_type(room_type)) for room_id, number, room_type in db.query(Room.id, Room.room_number, Room.type)]
+    groups = {}
+    floating_rooms = []
+    for room_id, number, room_type in rooms:
+        building = next((b for b in BUILDINGS if number.startswith(b)), None)
+        if building is None:
+            floating_rooms.append((room_id, room_type))
+            continue
+        shard = groups.setdefault(building, Shard(name=building))
+        shard.room_ids.add(room_id)
+        shard.rooms[room_type] += 1
+    if not groups:
+        groups["ALL"] = Shard(name="ALL")
+
+    def add_department(shard: Shard, dept: str):
+        shard.departments.add(dept)
+        for room_type, cells in demand[dept].items():
+            shard.demand[room_type] += cells
+
+    floating = []
+    for dept in demand:
+        building = dept_building(dept)
+        if building in groups:
+            add_department(groups[building], dept)
+        else:
+            floating.append(dept)
+    for dept in sorted(floating, key=lambda d: -sum(demand[d].values())):
+        add_department(min(groups.values(), key=lambda s: s.load), dept)
+    for room_id, room_type in floating_rooms:
+        shard = max(groups.values(), key=lambda s: s.demand[room_type] / (s.rooms[room_type] + 1))
+        shard.room_ids.add(room_id)
+        shard.rooms[room_type] += 1
+
+    merged = True
+    while merged and len(groups) > 1:
+        merged = False
+        for name, shard in list(groups.items()):
+            missing = [t for t, cells in shard.demand.items() if cells and not shard.rooms[t]]
+            if not missing:
+                continue
+            target = max((s for n, s in groups.items() if n != name), key=lambda s: s.rooms[missing[0]])
+            target.name = f"{target.name}+{shard.name}"
+            target.room_ids |= shard.room_ids
+            for dept in shard.departments:
+                target.departments.add(dept)
+            for room_type in set(shard.demand) | set(shard.rooms):
+                target.demand[room_type] += shard.demand[room_type]
+                target.rooms[room_type] += shard.rooms[room_type]
+            del groups[name]
+            merged = True
+            break
+
+    # Shards left over split the groups with the most demand
+    parts = {name: 1 for name in groups}
+    for _ in range(max(0, shards - len(groups))):
+        name = max(groups, key=lambda n: sum(groups[n].demand.values()) / (parts[n] + 1))
+        if parts[name] >= len(groups[name].departments):
+            break
+        parts[name] += 1
+
+    result = []
+    for name, shard in groups.items():
+        result.extend(_split(shard, parts[name], demand, {room_id: room_type for room_id, _, room_type in rooms}))
+    return [s for s in result if s.departments]
+
+def _split(shard: Shard, parts: int, demand: Dict[str, Dict[str, int]], room_types: Dict[int, str]) -> List[Shard]:
+    """
+    Splits one shard into `parts` (fewer if a part would lack a room type it needs).
+    """
+    while parts > 1:
+        bins = [Shard(name=f"{shard.name}/{i + 1}") for i in range(parts)]
+        for dept in sorted(shard.departments, key=lambda d: -sum(demand[d].values())):
+            target = min(bins, key=lambda s: sum(s.demand.values()))
+            target.departments.add(dept)
+            for room_type, cells in demand[dept].items():
+                target.demand[room_type] += cells
+
+        by_type = defaultdict(list)
+        for room_id in sorted(shard.room_ids):
+            by_type[room_types[room_id]].append(room_id)
+        ok = True
+        for room_type, room_ids in by_type.items():
+            total = sum(b.demand[room_type] for b in bins)
+            needing = [b for b in bins if b.demand[room_type]]
+            if len(room_ids) < len(needing):
+                ok = False
+                break
+            # Largest remainder, at least one room for every part that needs the type
+            quotas = {id(b): (len(room_ids) * b.demand[room_type] / total if total else 0.0) for b in bins}
+            floors = {id(b): 1 if b.demand[room_type] else 0 for b in bins}
+            counts = {id(b): max(floors[id(b)], int(quotas[id(b)])) for b in bins}
+            while sum(counts.values()) > len(room_ids):
+                b = max((b for b in bins if counts[id(b)] > floors[id(b)]), key=lambda b: counts[id(b)] - quotas[id(b)])
+                counts[id(b)] -= 1
+            while sum(counts.values()) < len(room_ids):
+                b = max(bins, key=lambda b: quotas[id(b)] - counts[id(b)])
+                counts[id(b)] += 1
+            start = 0
+            for b in bins:
+                b.room_ids.update(room_ids[start:start + counts[id(b)]])
+                b.rooms[room_type] += counts[id(b)]
+                start += counts[id(b)]
+        if ok:
+            return bins
+        parts -= 1
+    return [shard]
+
+def _shard_snapshot(snapshot: ScheduleSnapshot, shard: Shard, course_depts: Dict[int, str]) -> ScheduleSnapshot:
+    """
+    The snapshot restricted to the shard's sections and rooms; teachers and preferences stay
+    whole so target loads match the full problem.
+    """
+    tables = dict(snapshot.tables)
+    tables[Section.__tablename__] = [s for s in snapshot.tables.get(Section.__tablename__, []) if course_depts.get(s["course_id"]) in shard.departments]
+    tables[Room.__tablename__] = [r for r in snapshot.tables.get(Room.__tablename__, []) if r["id"] in shard.room_ids]
+    section_ids = {s["id"] for s in tables[Section.__tablename__]}
+    tables[ClassSchedule.__tablename__] = [
+        row for row in snapshot.tables.get(ClassSchedule.__tablename__, [])
+        if row["section_id"] in section_ids and row["room_id"] in shard.room_ids
+    ]
+    return ScheduleSnapshot(tables=tables)
+
+def _solve_shard(snapshot: ScheduleSnapshot, name: str, time_limit_seconds: float, seed: int, num_workers: int, local_search: bool) -> ShardRun:
+    db = snapshot.open_session()
+    try:
+        sections = len(snapshot.tables.get(Section.__tablename__, []))
+        scheduler = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=seed, num_workers=num_workers, local_search=local_search)
+        try:
+            result = scheduler.run(db, rebuild=True)
+        except ScheduleInfeasibleError as e:
+            logger.warning(f"Shard {name}: {e}")
+            return ShardRun(shard=name, sections=sections, result=None, error="infeasible")
+        schedules, teacher_ids = read_schedule(db)
+        return ShardRun(shard=name, sections=sections, result=result, schedules=schedules, teacher_ids=teacher_ids)
+    finally:
+        db.close()
+
+def _reconcile(db: Session, tba_id: int, runs: List[ShardRun]) -> Tuple[List[Dict], Dict[int, Optional[int]], int]:
+    """
+    Merges the shard schedules. A teacher placed at the same time by two shards keeps the
+    groups of the first shard; the later groups are dropped (rows and teacher) for the repair
+    pass. Returns (rows, teacher per section, dropped groups).
+    """
+    codes = dict(db.query(Section.id, Course.code).join(Course, Section.course_id == Course.id).all())
+    numbers = dict(db.query(Section.id, Section.section_number).all())
+    teacher_ids = {}
+    for run in runs:
+        teacher_ids.update(run.teacher_ids)
+
+    grid = OccupancyGrid(t for t in set(teacher_ids.values()) if t is not None and t != tba_id)
+    rows = []
+    dropped = 0
+    for run in runs:
+        groups = defaultdict(list)
+        for row in run.schedules:
+            groups[sibling_key(codes[row["section_id"]], numbers[row["section_id"]])].append(row)
+        for key, group_rows in groups.items():
+            cells = defaultdict(int)
+            for row in group_rows:
+                tid = teacher_ids.get(row["section_id"])
+                if tid is not None and tid != tba_id:
+                    cells[(tid, row["day"])] |= 1 << row["time_slot_id"]
+            if any(not grid.is_free(tid, days_of(day), mask) for (tid, day), mask in cells.items()):
+                dropped += 1
+                for row in group_rows:
+                    teacher_ids[row["section_id"]] = None
+                continue
+            for (tid, day), mask in cells.items():
+                grid.mark(tid, days_of(day), mask)
+            rows.extend(group_rows)
+    return rows, teacher_ids, dropped
+
+def run_sharded(
+    db: Session,
+    shards: Optional[int] = None,
+    time_limit_seconds: float = 30.0,
+    seed: int = 1,
+    local_search: bool = False,
+) -> RunResult:
+    """
+    Solves department/building shards concurrently in worker processes, each on an in-memory
+    snapshot with its own rooms, then merges them into the DB. Groups whose teacher is double
+    booked across shards, groups a shard could not place, and every group of a shard that
+    failed (infeasible on its own rooms, or an error in its worker) are re-placed by a repair
+    pass against the merged schedule and all rooms; result.solver_status names failed shards.
+    With a single shard it solves in full.
+    """
+    started = time.perf_counter()
+    tba = ensure_tba_teacher(db)
+    capacity = CpSatAutoScheduler().capacity_report(db)
+    if not capacity.feasible:
+        raise ScheduleInfeasibleError(capacity)
+
+    cpu_count = os.cpu_count() or 1
+    plan = plan_shards(db, shards or cpu_count)
+    if len(plan) <= 1:
+        logger.info("Sharded run: one shard, solving in full")
+        result = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=seed, local_search=local_search).run(db, rebuild=True)
+        result.solver_status = f"SHARDED(1: solved in full, {result.solver_status})"
+        return result
+
+    course_depts = {course_id: dept_of(code) for course_id, code in db.query(Course.id, Course.code)}
+    snapshot = take_snapshot(db)
+    num_workers = max(1, cpu_count // len(plan))
+    planned = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=len(plan), mp_context=_mp) as pool:
+        futures = [
+            (shard, pool.submit(_solve_shard, _shard_snapshot(snapshot, shard, course_depts), shard.name, time_limit_seconds, seed, num_workers, local_search))
+            for shard in plan
+        ]
+        runs = []
+        for shard, future in futures:
+            try:
+                runs.append(future.result())
+            except Exception as e:
+                # A crashed worker loses only its shard: the repair pass places its sections
+                logger.exception(f"Shard {shard.name} failed")
+                runs.append(ShardRun(shard=shard.name, sections=0, result=None, error=type(e).__name__))
+    solved = time.perf_counter()
+
+    failed = [run for run in runs if run.result is None]
+    for run in runs:
+        if run.result is None:
+            logger.warning(f"Sharded run: shard {run.shard} failed ({run.error}), its sections go to the repair pass")
+        else:
+            logger.info(f"Shard {run.shard}: {run.sections} sections, quality {run.result.quality.overall_score}, TBA {run.result.assigned_tba}")
+
+    rows, teacher_ids, dropped = _reconcile(db, tba.id, runs)
+    # Sections of failed shards have no rows; their stored teacher goes too, for the repair pass
+    for (section_id,) in db.query(Section.id):
+        teacher_ids.setdefault(section_id, None)
+    write_schedule(db, rows, teacher_ids)
+    reconciled = time.perf_counter()
+
+    # Dropped groups and groups a shard left unplaced, against everything else and all rooms
+    CpSatAutoScheduler(seed=seed).repair(db)
+    result = CpSatAutoScheduler().evaluate(db)
+    result.solver_status = f"SHARDED({len(plan)})"
+    if failed:
+        result.solver_status += " repaired " + ", ".join(f"{run.shard}: {run.error}" for run in failed)
+    result.bottlenecks = [asdict(b) for b in capacity.warnings]
+    result.timings = {
+        "plan": round(planned - started, 4),
+        "shard_solve": round(solved - planned, 4),
+        "reconcile": round(reconciled - solved, 4),
+        "repair": round(time.perf_counter() - reconciled, 4),
+    }
+    result.counters = {
+        "shards": len(plan),
+        "failed_shards": len(failed),
+        "reconciled_groups": dropped,
+        "repaired_sections": sum(1 for tid in teacher_ids.values() if tid is None),
+    }
+    logger.info(f"Sharded run: {len(plan)} shards, {dropped} groups reconciled, quality {result.quality.overall_score}")
+    return result
@@ -0,0 +1,220 @@
+import copy
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models.academic import ClassType, Course, Room
+from models.schedule import ClassSchedule, Section
+from models.teacher import Teacher, TeacherPreference, TeacherTimingPreference
+from services.capacity_check import ScheduleInfeasibleError
+from services.cp_sat_scheduler import CpSatAutoScheduler, RunResult
+from services.schedule_snapshot import ScheduleSnapshot, take_snapshot
+from services.schedule_versions import load_placements
+from services.scheduler import AutoScheduler
+from services.scheduler_portfolio import ENGINE_AUTO, ENGINE_CP_SAT
+
+logger = logging.getLogger("scheduler")
+
+MAX_SCENARIOS = 8
+
+# Spawned (not forked) children: the API process has threads and open DB connections
+_mp = multiprocessing.get_context("spawn")
+
+@dataclass
+class WhatIfScenario:
+    """
+    Changes applied to a copy of the scheduler inputs; the real DB never sees them.
+
+    add_rooms: dicts with room_number, capacity, type ('THEORY'/'LAB').
+    add_teachers: dicts with initial, name, department, faculty_type and optionally
+        preferences [{course_id, section_count}] and timings [{day, start_time, end_time}].
+        Preferences of hypothetical teachers count as accepted.
+    """
+    name: str = "scenario"
+    engine: str = ENGINE_CP_SAT
+    seed: int = 1
+    remove_room_ids: List[int] = field(default_factory=list)
+    remove_teacher_ids: List[int] = field(default_factory=list)
+    add_rooms: List[Dict] = field(default_factory=list)
+    add_teachers: List[Dict] = field(default_factory=list)
+    warm_start: bool = False   # start from the current schedule (minus removed rooms) to keep churn low
+
+@dataclass
+class WhatIfOutcome:
+    scenario: str
+    engine: str
+    seed: int
+    result: Optional[RunResult]                      # None when the scenario is infeasible
+    plan: List[Dict] = field(default_factory=list)   # one entry per placed section
+    capacity: Optional[Dict] = None                  # capacity report of an infeasible scenario
+
+def apply_overrides(snapshot: ScheduleSnapshot, scenario: WhatIfScenario) -> ScheduleSnapshot:
+    """
+    A new snapshot with the scenario's rooms and teachers removed or added.
+    Raises ValueError for unknown ids, duplicate initials or room numbers.
+    """
+    tables = copy.deepcopy(snapshot.tables)
+    rooms = tables.setdefault(Room.__tablename__, [])
+    teachers = tables.setdefault(Teacher.__tablename__, [])
+    prefs = tables.setdefault(TeacherPreference.__tablename__, [])
+    timings = tables.setdefault(TeacherTimingPreference.__tablename__, [])
+    courses = {c["id"] for c in tables.get(Course.__tablename__, [])}
+
+    def next_id(rows: List[Dict]) -> int:
+        return max((r["id"] for r in rows), default=0) + 1
+
+    # --- Removals ---
+    removed_rooms = set(scenario.remove_room_ids)
+    unknown = removed_rooms - {r["id"] for r in rooms}
+    if unknown:
+        raise ValueError(f"Unknown room ids: {sorted(unknown)}")
+    removed_teachers = set(scenario.remove_teacher_ids)
+    unknown = removed_teachers - {t["id"] for t in teachers}
+    if unknown:
+        raise ValueError(f"Unknown teacher ids: {sorted(unknown)}")
+
+    tables[Room.__tablename__] = rooms = [r for r in rooms if r["id"] not in removed_rooms]
+    tables[Teacher.__tablename__] = teachers = [t for t in teachers if t["id"] not in removed_teachers]
+    tables[TeacherPreference.__tablename__] = prefs = [p for p in prefs if p["teacher_id"] not in removed_teachers]
+    tables[TeacherTimingPreference.__tablename__] = timings = [p for p in timings if p["teacher_id"] not in removed_teachers]
+    tables[ClassSchedule.__tablename__] = [
+        s for s in tables.get(ClassSchedule.__tablename__, []) if s["room_id"] not in removed_rooms
+    ]
+    for section in tables.get(Section.__tablename__, []):
+        if section["teacher_id"] in removed_teachers:
+            section["teacher_id"] = None
+
+    # --- Additions ---
+    room_numbers = {r["room_number"] for r in rooms}
+    for room in scenario.add_rooms:
+        if room["room_number"] in room_numbers:
+            raise ValueError(f"Room {room['room_number']} already exists")
+        room_numbers.add(room["room_number"])
+        rooms.append(_row(Room, id=next_id(rooms), room_number=room["room_number"], capacity=room["capacity"],
+                          type=ClassType(room["type"])))
+
+    initials = {t["initial"] for t in teachers}
+    for teacher in scenario.add_teachers:
+        if teacher["initial"] in initials:
+            raise ValueError(f"Teacher {teacher['initial']} already exists")
+        initials.add(teacher["initial"])
+        teacher_id = next_id(teachers)
+        # No users table in the snapshot and the in-memory DB does not enforce the foreign key;
+        # user_id only has to be unique
+        teachers.append(_row(Teacher, id=teacher_id, user_id=-teacher_id, initial=teacher["initial"], name=teacher.get("name") or teacher["initial"],
+                             faculty_type=teacher.get("faculty_type") or "Permanent", department=teacher.get("department")))
+        for pref in teacher.get("preferences", []):
+            if pref["course_id"] not in courses:
+                raise ValueError(f"Unknown course id: {pref['course_id']}")
+            prefs.append(_row(TeacherPreference, id=next_id(prefs), teacher_id=teacher_id, course_id=pref["course_id"],
+                              section_count=pref.get("section_count", 1), status="accepted"))
+        for timing in teacher.get("timings", []):
+            timings.append(_row(TeacherTimingPreference, id=next_id(timings), teacher_id=teacher_id, day=timing["day"],
+                                start_time=timing["start_time"], end_time=timing["end_time"]))
+
+    _ensure_tba_row(teachers)
+    return ScheduleSnapshot(tables=tables)
+
+def _ensure_tba_row(teachers: List[Dict]):
+    # ensure_tba_teacher() would create a User, and the snapshot has no users table
+    if not any(t["initial"] == "TBA" for t in teachers):
+        teacher_id = max((t["id"] for t in teachers), default=0) + 1
+        teachers.append(_row(Teacher, id=teacher_id, user_id=-teacher_id, initial="TBA",
+                             name="To Be Announced", faculty_type="Adjunct", department="General"))
+
+def _row(model, **values) -> Dict:
+    # Every column present: the snapshot's rows of a table are inserted as one executemany
+    row = {column.name: None for column in model.__table__.columns}
+    row.update(values)
+    return row
+
+def _plan(db: Session) -> List[Dict]:
+    """
+    The proposed schedule folded per section, with names so it reads without the ids.
+    """
+    plan = {}
+    rows = (
+        db.query(ClassSchedule.section_id, ClassSchedule.day, ClassSchedule.time_slot_id, Room.id, Room.room_number,
+                 Course.code, Section.section_number, Teacher.id, Teacher.initial)
+        .join(Section, ClassSchedule.section_id == Section.id)
+        .join(Course, Section.course_id == Course.id)
+        .join(Room, ClassSchedule.room_id == Room.id)
+        .outerjoin(Teacher, Section.teacher_id == Teacher.id)
+        .order_by(Course.code, Section.section_number, ClassSchedule.time_slot_id)
+    )
+    for section_id, day, slot, room_id, room_number, code, number, teacher_id, initial in rows:
+        entry = plan.setdefault(section_id, {
+            "section_id": section_id, "course_code": code, "section_number": number,
+            "teacher_id": teacher_id, "teacher_initial": initial or "TBA",
+            "room_id": room_id, "room_number": room_number, "day": day, "time_slots": [],
+        })
+        entry["time_slots"].append(slot)
+    return list(plan.values())
+
+def _run_scenario(snapshot: ScheduleSnapshot, scenario: WhatIfScenario, time_limit_seconds: float, num_workers: int) -> WhatIfOutcome:
+    db = snapshot.open_session()
+    try:
+        # The snapshot holds the current schedule, with rows in removed rooms already dropped
+        warm_start = load_placements(db) if scenario.warm_start else None
+        if scenario.engine == ENGINE_AUTO:
+            auto = AutoScheduler(db, warm_start=warm_start)
+            auto_run = auto.run()
+            result = CpSatAutoScheduler().evaluate(db)
+            result.solver_status = "AUTO"
+            result.timings = auto_run.timings
+            result.counters = auto_run.counters
+            result.churn = auto_run.churn
+        else:
+            scheduler = CpSatAutoScheduler(time_limit_seconds=time_limit_seconds, seed=scenario.seed, num_workers=num_workers,
+                                           warm_start=warm_start)
+            result = scheduler.run(db, rebuild=True)
+        return WhatIfOutcome(scenario=scenario.name, engine=scenario.engine, seed=scenario.seed, result=result, plan=_plan(db))
+    except ScheduleInfeasibleError as e:
+        # An infeasible scenario is an answer, not a failure of the whole request
+        return WhatIfOutcome(scenario=scenario.name, engine=scenario.engine, seed=scenario.seed, result=None, capacity=e.report.to_dict())
+    finally:
+        db.close()
+
+def run_what_if(
+    db: Session,
+    scenarios: List[WhatIfScenario],
+    time_limit_seconds: float = 30.0,
+    max_processes: Optional[int] = None,
+) -> List[WhatIfOutcome]:
+    """
+    Solves each scenario against one read-only snapshot of the current inputs, in parallel worker
+    processes with private in-memory databases. `db` is only read (one SELECT per table), so
+    production tables are never written or locked. Outcomes come back in scenario order.
+    """
+    if not scenarios:
+        return []
+    for scenario in scenarios:
+        if scenario.engine not in (ENGINE_CP_SAT, ENGINE_AUTO):
+            raise ValueError(f"Unknown engine: {scenario.engine}")
+
+    base = take_snapshot(db)
+    # Overrides are checked here, before any process starts
+    snapshots = [apply_overrides(base, scenario) for scenario in scenarios]
+
+    cpu_count = os.cpu_count() or 1
+    processes = max(1, min(len(scenarios), max_processes or cpu_count))
+    num_workers = max(1, cpu_count // processes)
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_mp) as pool:
+        futures = [
+            pool.submit(_run_scenario, snapshot, scenario, time_limit_seconds, num_workers)
+            for snapshot, scenario in zip(snapshots, scenarios)
+        ]
+        outcomes = [f.result() for f in futures]
+
+    for outcome in outcomes:
+        if outcome.result is None:
+            logger.info(f"What-if '{outcome.scenario}': infeasible")
+            continue
+        logger.info(f"What-if '{outcome.scenario}': quality {outcome.result.quality.overall_score}, TBA {outcome.result.assigned_tba}")
+    return outcomes
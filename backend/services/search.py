@@ -0,0 +1,138 @@
+"""
+Indexed substring search for the admin and public listings.
+
+On PostgreSQL the searched columns get pg_trgm GIN indexes, which serve the same ILIKE '%term%'
+and 'term%' filters the listings always used, so a search no longer scans the tables. On SQLite
+(tests, local runs) each searched table gets an FTS5 trigram table kept in sync by triggers.
+Either way the listings call search_filter / matching_ids and search_rank, never ilike directly.
+"""
+import weakref
+from typing import Sequence
+
+from sqlalchemy import case, column, func, literal_column, or_, select, table, true
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from models.academic import Course, Room
+from models.schedule import ScheduleView
+from models.student import Student
+from models.teacher import Teacher
+from models.user import User
+
+# Table -> the columns any listing searches on it
+SEARCHABLE = {
+    Course: ("code", "title"),
+    Room: ("room_number",),
+    Teacher: ("name", "initial"),
+    Student: ("name", "nsu_id"),
+    User: ("email",),
+    ScheduleView: ("course_code", "course_title", "room_number", "teacher_initial"),
+}
+
+# Trigrams need three characters; shorter terms fall back to a LIKE scan on SQLite
+MIN_INDEXED_LENGTH = 3
+
+# SQLite engines the FTS tables were installed on
+_fts_engines = weakref.WeakSet()
+
+def _fts_table(model) -> str:
+    return f"{model.__tablename__}_search"
+
+def install_search_indexes(engine: Engine):
+    """
+    Creates the search indexes for every SEARCHABLE table, if missing. Idempotent; run at
+    startup after create_all. Raises if pg_trgm cannot be enabled (it needs CREATE privilege
+    on the database): search keeps working, unindexed.
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for model, columns in SEARCHABLE.items():
+                name = model.__tablename__
+                for col in columns:
+                    conn.exec_driver_sql(
+                        f"CREATE INDEX IF NOT EXISTS ix_{name}_{col}_trgm ON {name} USING gin ({col} gin_trgm_ops)"
+                    )
+        elif dialect == "sqlite":
+            for model, columns in SEARCHABLE.items():
+                name, fts = model.__tablename__, _fts_table(model)
+                cols = ", ".join(columns)
+                new = ", ".join(f"new.{c}" for c in columns)
+                old = ", ".join(f"old.{c}" for c in columns)
+                # External content: the FTS table stores only the index, the rows stay in `name`
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{name}', "
+                    f"content_rowid='id', tokenize='trigram')"
+                )
+                conn.exec_driver_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {name} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+                )
+                conn.exec_driver_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {name} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+                )
+                conn.exec_driver_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE ON {name} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+                )
+                # Picks up rows written before the triggers existed
+                conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            _fts_engines.add(engine)
+
+def _uses_fts(db: Session) -> bool:
+    bind = db.get_bind()
+    return bind.dialect.name == "sqlite" and bind in _fts_engines
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _ilike_any(columns: Sequence, pattern: str):
+    return or_(*[c.ilike(pattern, escape="\\") for c in columns])
+
+def _fts_ids(model, columns: Sequence, term: str):
+    # `{code title} : "cse11"` - a trigram phrase is a substring match, restricted to the columns
+    fts = table(_fts_table(model), column("rowid"))
+    phrase = '"' + term.replace('"', '""') + '"'
+    query = "{" + " ".join(c.key for c in columns) + "} : " + phrase
+    return select(fts.c.rowid).where(literal_column(fts.name).op("MATCH")(query))
+
+def matching_ids(db: Session, columns: Sequence, term: str):
+    """
+    SELECT of the ids of rows whose columns (all of one SEARCHABLE model) contain `term`,
+    case-insensitively; for filtering a joined listing with `<fk>.in_(...)`.
+    """
+    model = columns[0].class_
+    term = term.strip()
+    if term and len(term) >= MIN_INDEXED_LENGTH and _uses_fts(db):
+        return _fts_ids(model, columns, term)
+    return select(model.id).where(search_filter(db, columns, term))
+
+def search_filter(db: Session, columns: Sequence, term: str):
+    """
+    Filter for rows whose columns (all of one SEARCHABLE model) contain `term`, case-insensitively.
+    An empty term matches everything.
+    """
+    term = term.strip()
+    if not term:
+        return true()
+    if len(term) >= MIN_INDEXED_LENGTH and _uses_fts(db):
+        return columns[0].class_.id.in_(_fts_ids(columns[0].class_, columns, term))
+    return _ilike_any(columns, f"%{_escape_like(term)}%")
+
+def search_rank(columns: Sequence, term: str):
+    """
+    Relevance of a matching row, lower first: 0 a column equals the term, 1 a column starts with it,
+    2 a word inside a column starts with it, 3 any other substring match. Integer, so it can
+    be a cursor sort key; ties keep the listing's own order.
+    """
+    term = term.strip()
+    escaped = _escape_like(term)
+    return case(
+        (or_(*[func.lower(c) == term.lower() for c in columns]), 0),
+        (_ilike_any(columns, f"{escaped}%"), 1),
+        (_ilike_any(columns, f"% {escaped}%"), 2),
+        else_=3,
+    )
@@ -0,0 +1,77 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from core.time_slots import THEORY_SLOTS, days_of
+from models.teacher import TeacherTimingPreference
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$")
+
+def parse_time_minutes(value: str) -> Optional[int]:
+    """
+    Minutes after midnight for "08:00", "13:00", "8:00 AM" or "01:00 PM"; None if unparseable.
+    """
+    match = _TIME_RE.match(value or "")
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.upper() == "PM" else 0)
+    return hour * 60 + minute
+
+# Theory slot -> start minute
+SLOT_START_MINUTES = {slot.id: slot.start for slot in THEORY_SLOTS.values()}
+
+class TimingMask:
+    """
+    A teacher's timing preferences compiled to one slot bitmask per day.
+
+    A theory slot is preferred on a day when its start time falls inside a preference
+    window [start, end) for that day. A lab block is preferred when every theory slot
+    it covers is.
+    """
+    def __init__(self):
+        self.day_masks: Dict[str, int] = defaultdict(int)
+
+    @property
+    def days(self) -> set:
+        return set(self.day_masks.keys())
+
+    def add(self, day: str, start_time: str, end_time: str):
+        start = parse_time_minutes(start_time)
+        end = parse_time_minutes(end_time)
+        for d in days_of(day):
+            mask = 0
+            for slot, slot_start in SLOT_START_MINUTES.items():
+                if start is None:
+                    break
+                if end is not None and end > start:
+                    if start <= slot_start < end:
+                        mask |= 1 << slot
+                elif slot_start == start:
+                    mask |= 1 << slot
+            self.day_masks[d] |= mask
+
+    def prefers_days(self, days: Iterable[str]) -> bool:
+        return all(d in self.day_masks for d in days)
+
+    def covers(self, days: Iterable[str], slots: int) -> bool:
+        """
+        True when every given day prefers every slot in the slot mask.
+        """
+        return all(self.day_masks.get(d, 0) & slots == slots for d in days)
+
+def compile_timing_preferences(prefs: Iterable[TeacherTimingPreference]) -> Dict[int, TimingMask]:
+    masks: Dict[int, TimingMask] = defaultdict(TimingMask)
+    for tp in prefs:
+        masks[tp.teacher_id].add(tp.day, tp.start_time, tp.end_time)
+    return masks
+
+def load_timing_masks(db: Session) -> Dict[int, TimingMask]:
+    """
+    Loads every teacher's timing preferences in one query. Teachers without
+    preferences get an empty mask on lookup.
+    """
+    return compile_timing_preferences(db.query(TeacherTimingPreference).all())